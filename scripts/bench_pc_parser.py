@@ -0,0 +1,220 @@
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from pc_parser import STREAM_TAIL_LINES, PcMarkdownParser, parse_pc_markdown
+from price_records import PriceRecord, sort_newest_first
+
+
+def _default_cache_dir():
+    return os.getenv("OPENCLAW_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "openclaw")
+
+
+# ── 舊版解析器 (market_report_vision._fetch_pc_prices_from_url 的解析部分，作為對照組) ──
+# 唯一的修改：TSV 日期樣式原本誤寫成 \d.2}，ISO 日期永遠比對不到；這裡與新解析器一樣改為 \d{2}。
+
+def legacy_parse(md_content):
+    def extract_price(price_str):
+        cleaned = re.sub(r'[^\d.]', '', price_str)
+        try:
+            return float(cleaned)
+        except ValueError:
+            return 0.0
+
+    lines = md_content.split('\n')
+    records = []
+
+    date_regex_md = r'\|\s*(\d{4}-\d{2}-\d{2}|[A-Z][a-z]{2}\s\d{1,2},\s\d{4})\s*\|'
+    for line in lines:
+        if re.search(date_regex_md, line):
+            parts = [p.strip() for p in line.split('|')]
+            if len(parts) >= 5:
+                date_str = parts[1]
+                all_prices = re.findall(r'\$([\d,]+\.\d{2})', line)
+                if not all_prices: continue
+                real_prices = [p for p in all_prices if p not in ('6.00',)]
+                if not real_prices: continue
+
+                price_usd = float(real_prices[-1].replace(',', ''))
+                title_clean = line.replace(" ", "").lower()
+
+                detected_grade = None
+                if re.search(r'(psa|cgc|bgs|grade|gem)10', title_clean) or ("psa" in title_clean and "10" in title_clean):
+                    detected_grade = "PSA 10"
+                elif re.search(r'bgs\s*9\.5', title_clean):
+                    detected_grade = "BGS 9.5"
+                elif re.search(r'(psa|cgc|bgs|grade|gem)9', title_clean) or ("psa" in title_clean and "9" in title_clean):
+                    detected_grade = "PSA 9"
+                elif re.search(r'(psa|cgc|bgs|grade|gem)8', title_clean) or ("psa" in title_clean and "8" in title_clean):
+                    detected_grade = "PSA 8"
+                elif not re.search(r'(psa|bgs|cgc|grade|gem)', title_clean):
+                    detected_grade = "Ungraded"
+
+                if detected_grade:
+                    records.append(PriceRecord(date_str, price_usd, detected_grade))
+
+    if not records:
+        current_date = None
+        date_regex_tsv = r'^(\d{4}-\d{2}-\d{2}|[A-Z][a-z]{2}\s\d{1,2},\s\d{4})'
+        for line in lines:
+            line = line.strip()
+            date_match = re.match(date_regex_tsv, line)
+            if date_match:
+                current_date = date_match.group(1)
+                continue
+            if current_date and "$" in line:
+                all_prices = re.findall(r'\$([\d,]+\.\d{2})', line)
+                if not all_prices: continue
+                real_prices = [p for p in all_prices if p not in ('6.00',)]
+                if not real_prices: continue
+                price_usd = float(real_prices[-1].replace(',', ''))
+                title_clean = line.replace(" ", "").lower()
+                detected_grade = None
+                if re.search(r'(psa|cgc|bgs|grade|gem)10', title_clean) or ("psa" in title_clean and "10" in title_clean):
+                    detected_grade = "PSA 10"
+                elif re.search(r'bgs\s*9\.5', title_clean):
+                    detected_grade = "BGS 9.5"
+                elif re.search(r'(psa|cgc|bgs|grade|gem)9', title_clean) or ("psa" in title_clean and "9" in title_clean):
+                    detected_grade = "PSA 9"
+                elif not re.search(r'(psa|bgs|cgc|grade|gem)', title_clean):
+                    detected_grade = "Ungraded"
+                if detected_grade:
+                    records.append(PriceRecord(current_date, price_usd, detected_grade))
+
+    today_str = datetime.now().strftime('%Y-%m-%d')
+    grade_summary_map = {'Ungraded': 'Ungraded', 'PSA 10': 'PSA 10', 'PSA 9': 'PSA 9', 'BGS 9.5': 'BGS 9.5'}
+    existing_grades = set(r.grade for r in records)
+    for line in lines:
+        for grade_label, grade_key in grade_summary_map.items():
+            label_nospace = grade_label.replace(' ', '')
+            if re.match(rf'^{re.escape(label_nospace)}\$[\d,]+\.\d{{2}}$', line.replace(' ', '')):
+                if grade_key not in existing_grades:
+                    price_match = re.search(r'\$[\d,]+\.\d{2}', line)
+                    if price_match:
+                        price_usd = extract_price(price_match.group(0))
+                        records.append(PriceRecord(today_str, price_usd, grade_key, note="PC avg price"))
+
+    sort_newest_first(records)
+
+    pc_img_url = None
+    img_patterns = [
+        r'!\[.*?\]\((https://storage\.googleapis\.com/images\.pricecharting\.com/[^/)]+/\d+\.jpg)\)',
+        r'!\[.*?\]\((https://product-images\.s3\.amazonaws\.com/[^\)]+)\)',
+        r'!\[.*?\]\((https://images\.pricecharting\.com/[^\)]+)\)',
+        r'!\[.*?\]\((https://[^)]+?pricecharting\.com/[^)]+?\.(?:jpg|png|webp)[^)]*)\)',
+        r'!\[.*?\]\((https://[^)]+?\.(?:jpg|png|webp)[^)]*)\)',
+    ]
+    for pat in img_patterns:
+        m = re.search(pat, md_content)
+        if m:
+            pc_img_url = m.group(1)
+            break
+    return records, pc_img_url
+
+
+# ── 載入已存的 Jina 頁面 ────────────────────────────────────────────────────
+
+def load_pages(cache_db=None, directories=()):
+    """
+    Jina 快取 (jina_cache.sqlite3) 中的 PriceCharting 商品頁，加上目錄內的 *.md。Returns [(name, markdown)].
+    串流提前結束存下的頁面前段 (URL 帶 # 標記) 不是完整頁面，不列入。
+    """
+    pages = []
+    if cache_db and os.path.exists(cache_db):
+        conn = sqlite3.connect(cache_db)
+        try:
+            pages.extend(conn.execute(
+                "SELECT url, body FROM jina_cache WHERE kind = 'product' AND url LIKE '%pricecharting.com/game/%' "
+                "AND instr(url, '#') = 0"
+            ).fetchall())
+        finally:
+            conn.close()
+    for directory in directories:
+        for path in sorted(glob.glob(os.path.join(directory, "**", "*.md"), recursive=True)):
+            with open(path, "r", encoding="utf-8") as f:
+                pages.append((path, f.read()))
+    return pages
+
+
+def _result_key(result):
+    records, img_url = result
+    return [(r.date, r.price, r.grade, r.note) for r in records], img_url
+
+
+def stream_parse(md, chunk_size, tail_lines):
+    """模擬串流下載：每次餵 chunk_size 字元，done 時停止讀取。Returns (result, 讀取的字元數)."""
+    parser = PcMarkdownParser(tail_lines=tail_lines)
+    read = 0
+    while read < len(md):
+        chunk = md[read:read + chunk_size]
+        read += len(chunk)
+        if parser.feed(chunk):
+            break
+    return parser.close(), read
+
+
+def _throughput(parse, pages, min_seconds):
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        for _, md in pages:
+            parse(md)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return rounds * len(pages) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PriceCharting markdown 解析器 benchmark (新 vs 舊)")
+    parser.add_argument("--cache", default=os.path.join(_default_cache_dir(), "jina_cache.sqlite3"),
+                        help="Jina 快取 SQLite (預設為快取目錄下的 jina_cache.sqlite3)")
+    parser.add_argument("--dir", action="append", default=[], help="額外的 *.md 頁面目錄 (可重複)")
+    parser.add_argument("--seconds", type=float, default=2.0, help="每個解析器至少執行的秒數")
+    parser.add_argument("--chunk", type=int, default=16 * 1024, help="串流比對時每次餵入的字元數")
+    parser.add_argument("--tail-lines", type=int, default=STREAM_TAIL_LINES,
+                        help="串流比對用的 tail_lines (對應 OPENCLAW_PC_STREAM_TAIL_LINES)")
+    args = parser.parse_args()
+
+    pages = load_pages(args.cache, args.dir)
+    if not pages:
+        print("❌ 找不到已存的 PriceCharting 頁面 (請指定 --cache 或 --dir)")
+        return 2
+
+    mismatches = [name for name, md in pages if _result_key(parse_pc_markdown(md)) != _result_key(legacy_parse(md))]
+    total_bytes = sum(len(md) for _, md in pages)
+    print(f"📄 頁面: {len(pages)} 頁 ({total_bytes / 1024:.0f} KB)")
+    print(f"🔍 輸出一致: {len(pages) - len(mismatches)}/{len(pages)}")
+    for name in mismatches[:10]:
+        print(f"   ✗ {name}")
+
+    # 串流提前結束的結果必須與整頁解析相同
+    stream_mismatches = []
+    stopped_early = 0
+    read_fraction = 0.0
+    for name, md in pages:
+        result, read = stream_parse(md, args.chunk, args.tail_lines)
+        if _result_key(result) != _result_key(parse_pc_markdown(md)):
+            stream_mismatches.append(name)
+        if read < len(md):
+            stopped_early += 1
+        read_fraction += read / max(len(md), 1)
+    print(f"🌊 串流一致: {len(pages) - len(stream_mismatches)}/{len(pages)} "
+          f"(提前結束 {stopped_early} 頁，平均讀取 {read_fraction / len(pages):.0%})")
+    for name in stream_mismatches[:10]:
+        print(f"   ✗ {name}")
+
+    legacy_pps = _throughput(legacy_parse, pages, args.seconds)
+    new_pps = _throughput(parse_pc_markdown, pages, args.seconds)
+    print(f"🐢 舊解析器: {legacy_pps:,.1f} pages/s")
+    print(f"🚀 新解析器: {new_pps:,.1f} pages/s ({new_pps / legacy_pps:.2f}x)")
+    return 1 if mismatches or stream_mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,471 @@
+import argparse
+import contextlib
+import difflib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# ── 名稱 / 編號正規化 ────────────────────────────────────────────────────────
+
+def compact_name(text):
+    """小寫並移除空白與標點 (保留 CJK)，"Monkey D. Luffy" -> "monkeydluffy"。"""
+    return re.sub(r'[\W_]+', '', str(text or '').lower())
+
+def clean_number(text):
+    """"ST01-001" / "025/165" / "No.25" -> 去前導 0 的編號 ("1" / "25")。"""
+    text = str(text or '')
+    if '-' in text and re.search(r'[A-Za-z]+\d+-\d+', text):
+        text = text.split('-')[-1]
+    m = re.search(r'\d+', text.split('/')[0])
+    if not m:
+        return ""
+    return m.group(0).lstrip('0') or '0'
+
+def compact_set_code(text):
+    return re.sub(r'[^a-z0-9]', '', str(text or '').lower())
+
+
+# 商品名 / slug 中代表異圖、漫畫、平行、旗艦賽等特殊版本的標記
+_VARIANT_RE = re.compile(
+    r'manga|alternate[-\s]?art|parallel|flagship|パラレル|コミパラ|コミック|フラッグシップ|フラシ'
+    r'|(?:^|[-\s\[(])(?:sp|l-p|sr-p|sec-p|sar-p|r-p|uc-p|c-p)(?=$|[-\s\])])',
+    re.IGNORECASE,
+)
+
+def is_variant_title(title):
+    """"monkey-d-luffy-manga-op05-119" / "ルフィ SEC-P [OP05-119]" -> True。"""
+    return bool(_VARIANT_RE.search(str(title or '')))
+
+
+def parse_pc_url(url):
+    """
+    PriceCharting 商品 URL -> catalog 欄位。
+    例: /game/one-piece-starter-deck-1-straw-hat-crew/monkeydluffy-st01-001
+        -> name="monkeydluffy", set_code="st01", number="1"
+    """
+    m = re.search(r'pricecharting\.com/game/([^/?#\s]+)/([^/?#\s]+)', str(url or ''))
+    if not m:
+        return None
+    set_slug, card_slug = m.group(1).lower(), m.group(2).lower()
+    tokens = card_slug.split('-')
+    num_idx = max((i for i, t in enumerate(tokens) if t.isdigit()), default=None)
+    if num_idx is None:
+        return None
+    set_code = ""
+    name_end = num_idx
+    if num_idx > 0 and re.fullmatch(r'[a-z]{1,4}\d{1,3}[a-z]?', tokens[num_idx - 1]):
+        set_code = tokens[num_idx - 1]
+        name_end = num_idx - 1
+    name = " ".join(t for t in tokens[:name_end] if t and '[' not in t and ']' not in t)
+    if set_slug.startswith("one-piece"):
+        category = "one piece"
+    elif set_slug.startswith("pokemon"):
+        category = "pokemon"
+    else:
+        category = ""
+    return {
+        "product_ref": f"{set_slug}/{card_slug}",
+        "product_url": f"https://www.pricecharting.com/game/{set_slug}/{card_slug}",
+        "title": card_slug,
+        "set_slug": set_slug,
+        "name": name,
+        "set_code": set_code,
+        "number": tokens[num_idx].lstrip('0') or '0',
+        "category": category,
+    }
+
+
+def parse_snkr_title(title):
+    """
+    SNKRDUNK 商品名 -> catalog 欄位。
+    例: "モンキー・D・ルフィ L [ST01-001] (スタートデッキ 麦わらの一味)"
+        -> jp_name="モンキー・D・ルフィ", set_code="st01", number="1"
+    """
+    title = str(title or '').strip()
+    bracket = re.search(r'\[([^\]]+)\]', title)
+    inner = bracket.group(1) if bracket else title
+    set_code, number, denominator = "", "", ""
+
+    m = re.search(r'([A-Za-z]+\d+[A-Za-z]?)-(\d+)', inner)
+    if m:
+        set_code, number = m.group(1), m.group(2)
+    else:
+        m = re.search(r'(?:([A-Za-z][A-Za-z0-9-]*)\s+)?(\d+)\s*/\s*(\d+)', inner)
+        if m:
+            set_code, number, denominator = m.group(1) or "", m.group(2), m.group(3)
+        elif bracket:
+            m = re.search(r'([A-Za-z][A-Za-z0-9-]*)\s+(\d+)', inner)
+            if m:
+                set_code, number = m.group(1), m.group(2)
+    if not number:
+        return None
+
+    name = title[:bracket.start()] if bracket else title[:m.start()]
+    # 去掉名稱後的稀有度 (L / SR / SAR ...)
+    name = re.sub(r'\s+[A-Z]{1,4}$', '', name.strip()).strip()
+    return {
+        "title": title,
+        "jp_name": name,
+        "set_code": compact_set_code(set_code),
+        "number": number.lstrip('0') or '0',
+        "denominator": denominator.lstrip('0') if denominator else "",
+    }
+
+
+def _trigram_query(names):
+    grams = set()
+    for name in names:
+        text = compact_name(name)
+        grams.update(text[i:i + 3] for i in range(len(text) - 2))
+    return " OR ".join('"' + g.replace('"', '""') + '"' for g in sorted(grams))
+
+
+_COLUMNS = ("category", "name", "jp_name", "c_name", "title", "set_code", "set_slug", "number", "denominator",
+            "img_url")
+
+
+class CardCatalog:
+    """
+    Local SQLite catalog of known card products.
+
+    每一列是一個來源商品 (source='pc' 時 product_ref 為 PriceCharting slug
+    "set-slug/card-slug"，source='snkr' 時為 SNKRDUNK product id)，帶有
+    name / jp_name / c_name / set_code / number / denominator，PriceCharting 另存
+    set_slug (商品所屬系列)。名稱另外存進 FTS5 trigram 索引做模糊比對；編號、set_code 必須精確相符。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cards ("
+                " id INTEGER PRIMARY KEY, source TEXT NOT NULL, product_ref TEXT NOT NULL,"
+                " product_url TEXT NOT NULL, category TEXT NOT NULL DEFAULT '',"
+                " name TEXT NOT NULL DEFAULT '', jp_name TEXT NOT NULL DEFAULT '', c_name TEXT NOT NULL DEFAULT '',"
+                " title TEXT NOT NULL DEFAULT '', set_code TEXT NOT NULL DEFAULT '', number TEXT NOT NULL DEFAULT '',"
+                " denominator TEXT NOT NULL DEFAULT '', img_url TEXT NOT NULL DEFAULT '',"
+                " selected INTEGER NOT NULL DEFAULT 0, seen_at REAL NOT NULL,"
+                " set_slug TEXT NOT NULL DEFAULT '',"
+                " UNIQUE (source, product_ref))"
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(cards)")}
+            if "set_slug" not in columns:
+                # 舊版目錄：補上欄位並從 PriceCharting slug 回填
+                conn.execute("ALTER TABLE cards ADD COLUMN set_slug TEXT NOT NULL DEFAULT ''")
+                conn.execute(
+                    "UPDATE cards SET set_slug = substr(product_ref, 1, instr(product_ref, '/') - 1)"
+                    " WHERE source = 'pc' AND instr(product_ref, '/') > 0"
+                )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_number ON cards (source, number)")
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(names, tokenize='trigram')"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def upsert(self, source, product_ref, product_url, selected=False, **fields):
+        """新增或合併一筆商品；空字串欄位不會覆蓋既有值。"""
+        return self.upsert_many([dict(fields, source=source, product_ref=product_ref,
+                                      product_url=product_url, selected=selected)])
+
+    def upsert_many(self, entries):
+        """在單一 transaction 內寫入多筆 (pc_product_entry / snkr_product_entry 的結果)。Returns rows written."""
+        entries = [e for e in entries if e]
+        if not entries:
+            return 0
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            for entry in entries:
+                values = {c: str(entry.get(c) or "") for c in _COLUMNS}
+                values["category"] = values["category"].lower()
+                values["set_code"] = compact_set_code(values["set_code"])
+                if values["number"]:
+                    values["number"] = clean_number(values["number"])
+                source, product_ref = entry["source"], str(entry["product_ref"])
+                conn.execute(
+                    "INSERT INTO cards (source, product_ref, product_url, " + ", ".join(_COLUMNS) + ", selected, seen_at)"
+                    " VALUES (?, ?, ?, " + ", ".join("?" for _ in _COLUMNS) + ", ?, ?)"
+                    " ON CONFLICT (source, product_ref) DO UPDATE SET"
+                    " product_url = excluded.product_url, "
+                    + ", ".join(f"{c} = COALESCE(NULLIF(excluded.{c}, ''), cards.{c})" for c in _COLUMNS)
+                    + ", selected = MAX(cards.selected, excluded.selected), seen_at = excluded.seen_at",
+                    (source, product_ref, entry["product_url"], *(values[c] for c in _COLUMNS),
+                     int(bool(entry.get("selected"))), now),
+                )
+                row = conn.execute(
+                    "SELECT id, name, jp_name, c_name, title FROM cards WHERE source = ? AND product_ref = ?",
+                    (source, product_ref),
+                ).fetchone()
+                names = " ".join(compact_name(row[k]) for k in ("name", "jp_name", "c_name", "title") if row[k])
+                conn.execute("DELETE FROM cards_fts WHERE rowid = ?", (row["id"],))
+                conn.execute("INSERT INTO cards_fts (rowid, names) VALUES (?, ?)", (row["id"], names))
+        return len(entries)
+
+    def candidates(self, source, number, names, set_code="", denominator="", category="", limit=50):
+        """
+        編號精確相符 (set_code / denominator / category 有值時也需相符) 的商品，
+        依名稱相似度 (0~1) 由高到低排序。Returns list of (similarity, row dict).
+        """
+        number = clean_number(number)
+        if not number:
+            return []
+        query_names = [compact_name(n) for n in names if compact_name(n)]
+        fts_query = _trigram_query(query_names)
+        with self._lock, self._connect() as conn:
+            if fts_query:
+                rows = conn.execute(
+                    "SELECT cards.* FROM cards_fts JOIN cards ON cards.id = cards_fts.rowid"
+                    " WHERE cards_fts MATCH ? AND cards.source = ? AND cards.number = ?"
+                    " ORDER BY cards_fts.rank LIMIT ?", (fts_query, source, number, limit)
+                ).fetchall()
+            else:
+                rows = []
+            if not rows:
+                # 名稱太短 (< 3 字) 沒有 trigram 可比對時，退回只用編號
+                rows = conn.execute(
+                    "SELECT * FROM cards WHERE source = ? AND number = ? LIMIT ?", (source, number, limit)
+                ).fetchall()
+
+        set_code = compact_set_code(set_code)
+        denominator = str(denominator or '').lstrip('0')
+        category = str(category or '').lower()
+        results = []
+        for row in rows:
+            row = dict(row)
+            if set_code and row["set_code"] and row["set_code"] != set_code:
+                continue
+            if denominator and row["denominator"] and row["denominator"] != denominator:
+                continue
+            if category and row["category"] and row["category"] != category:
+                continue
+            row_names = [compact_name(row[k]) for k in ("name", "jp_name", "c_name") if row[k]]
+            similarity = max(
+                (difflib.SequenceMatcher(None, q, r).ratio() for q in query_names for r in row_names),
+                default=0.0,
+            )
+            results.append((similarity, row))
+        results.sort(key=lambda x: x[0], reverse=True)
+        return results
+
+    def resolve(self, source, number, names, set_code="", denominator="", category="",
+                title_filter=None, min_similarity=0.75, allow_variants=False):
+        """
+        只在結果不含糊時回傳單一商品 (row dict)：名稱相似度達標且通過 title_filter
+        的商品恰好一個；有多個同一張卡 (同系列、同編號) 的商品時，若其中恰好一個曾被
+        完整搜尋選中 (selected) 則用它。
+
+        比 candidates() 嚴格：查詢帶有 set_code / denominator 時，商品必須確實相符
+        (欄位相同，或 set_code 出現在 set_slug 中)，欄位空白的商品視為無法確認而排除；
+        allow_variants=False 時排除標題帶有異圖 / 漫畫 / 平行等標記的商品。
+        其餘情況 (例如跨系列同名同號) 或完全沒有時回傳 None，交給網路搜尋。
+        """
+        set_code = compact_set_code(set_code)
+        denominator = str(denominator or '').lstrip('0')
+        matches = [
+            row for similarity, row in self.candidates(source, number, names, set_code, denominator, category)
+            if similarity >= min_similarity
+            and _confirms_set(row, set_code, denominator)
+            and (allow_variants or not is_variant_title(row["title"]) and not is_variant_title(row["product_ref"]))
+            and (title_filter is None or title_filter(row["title"]))
+        ]
+        if len(matches) > 1 and len({_card_key(row) for row in matches}) == 1:
+            selected = [row for row in matches if row["selected"]]
+            if len(selected) == 1:
+                matches = selected
+        if len(matches) != 1:
+            return None
+        return matches[0]
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT source, COUNT(*), SUM(selected) FROM cards GROUP BY source"
+            ).fetchall()
+        return {source: {"products": count, "selected": selected or 0} for source, count, selected in rows}
+
+
+def _confirms_set(row, set_code, denominator):
+    if set_code and row["set_code"] != set_code and set_code not in row["set_slug"].split('-'):
+        return False
+    if denominator and row["denominator"] != denominator and not (set_code and row["set_code"] == set_code):
+        return False
+    return True
+
+
+def _card_key(row):
+    """同系列、同編號的商品列 (例如一般版與 holo 版) 有相同的 key；selected 只在這些列之間決勝。"""
+    return row["set_slug"] or row["set_code"], row["denominator"], row["number"]
+
+
+# ── Seeding ──────────────────────────────────────────────────────────────────
+
+def pc_product_entry(url, selected=False, **identity):
+    """PriceCharting 商品 URL (+ 已知卡片資料) -> upsert_many 用的 entry；無法解析時為 None。"""
+    parsed = parse_pc_url(url)
+    if not parsed:
+        return None
+    entry = dict(parsed, source="pc", selected=selected)
+    # 選定商品帶有 vision 的卡片資料，比 slug 解析出的名稱更完整
+    entry.update({k: v for k, v in identity.items() if v})
+    return entry
+
+
+def snkr_product_entry(product_id, title, img_url="", selected=False, **identity):
+    """SNKRDUNK 商品 (+ 已知卡片資料) -> upsert_many 用的 entry；沒有編號時為 None。"""
+    entry = dict(parse_snkr_title(title) or {"title": str(title or '')})
+    entry.update({k: v for k, v in identity.items() if v})
+    if not entry.get("number"):
+        return None
+    entry.update(source="snkr", product_ref=str(product_id), img_url=img_url, selected=selected,
+                 product_url=f"https://snkrdunk.com/apparels/{product_id}")
+    return entry
+
+
+def _split_candidate(candidate):
+    """debug trace 的候選字串 "url — title" -> (url, title, img_url)。"""
+    url, _, rest = str(candidate).partition(" — ")
+    m = re.search(r'!\[Image\s*\d+:\s*(.*?)\]\((https?://[^\s)]+)\)', rest)
+    if m:
+        return url.strip(), m.group(1).strip(), m.group(2)
+    return url.strip(), rest.strip(), ""
+
+
+def _load_trace_meta(trace_dir):
+    for name in ("step1_meta.json", "openclaw_meta.json"):
+        path = os.path.join(trace_dir, name)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                continue
+    return {}
+
+
+def seed_from_trace(catalog, trace_path):
+    """匯入一個 debug_trace.jsonl 的搜尋結果與選定商品。Returns products recorded."""
+    meta = _load_trace_meta(os.path.dirname(os.path.abspath(trace_path)))
+    identity = {
+        "name": meta.get("name", ""),
+        "jp_name": meta.get("jp_name", ""),
+        "c_name": meta.get("c_name", ""),
+        "set_code": meta.get("set_code", ""),
+        "number": meta.get("number", ""),
+        "category": meta.get("category", ""),
+    }
+    entries = []
+    with open(trace_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                step = json.loads(line)
+            except ValueError:
+                continue
+            source = step.get("source")
+            selected_url = step.get("selected_url") or ""
+            for candidate in step.get("candidate_urls") or []:
+                url, title, img_url = _split_candidate(candidate)
+                if source == "PriceCharting":
+                    entries.append(pc_product_entry(url))
+                elif source == "SNKRDUNK":
+                    m = re.search(r'apparels/(\d+)', url)
+                    if m:
+                        entries.append(snkr_product_entry(m.group(1), title, img_url))
+            if selected_url and step.get("status") == "OK" and meta:
+                if source == "PriceCharting":
+                    entries.append(pc_product_entry(selected_url, selected=True, **identity))
+                elif source == "SNKRDUNK":
+                    m = re.search(r'apparels/(\d+)', selected_url)
+                    if m:
+                        entries.append(snkr_product_entry(m.group(1), "", selected=True, **identity))
+    return catalog.upsert_many(entries)
+
+
+def seed_from_debug_dirs(catalog, roots):
+    """遞迴尋找 debug_trace.jsonl 並匯入。Returns products recorded."""
+    count = 0
+    for root in roots:
+        if os.path.isfile(root):
+            count += seed_from_trace(catalog, root)
+            continue
+        for dirpath, _, files in os.walk(root):
+            if "debug_trace.jsonl" in files:
+                count += seed_from_trace(catalog, os.path.join(dirpath, "debug_trace.jsonl"))
+    return count
+
+
+def seed_from_resolved_index(catalog, index):
+    """匯入 ResolvedProductIndex 中所有已選定的商品。Returns products recorded."""
+    entries = []
+    for entry in index.entries(limit=1_000_000):
+        try:
+            name, number, set_code = json.loads(entry["card_key"])[:3]
+        except (ValueError, TypeError):
+            continue
+        identity = {"name": name, "number": number, "set_code": set_code}
+        if entry["source"] == "pc":
+            entries.append(pc_product_entry(entry["product_url"], selected=True, **identity))
+        elif entry["source"] == "snkr" and entry["product_id"]:
+            entries.append(snkr_product_entry(entry["product_id"], "", img_url=entry["img_url"],
+                                              selected=True, **identity))
+    return catalog.upsert_many(entries)
+
+
+def _default_cache_dir():
+    return os.getenv("OPENCLAW_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "openclaw")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenClaw 本機卡片目錄 (seed / lookup / stats)")
+    parser.add_argument("--db", default=os.path.join(_default_cache_dir(), "card_catalog.sqlite3"),
+                        help="catalog SQLite 路徑 (預設為快取目錄下的 card_catalog.sqlite3)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed = sub.add_parser("seed", help="從 debug 目錄與商品對應索引匯入")
+    seed.add_argument("paths", nargs="*", help="debug 目錄或 debug_trace.jsonl (遞迴搜尋)")
+    seed.add_argument("--resolved-index", default=os.path.join(_default_cache_dir(), "resolved_products.sqlite3"),
+                      help="ResolvedProductIndex 路徑 (不存在時略過)")
+
+    lookup = sub.add_parser("lookup", help="查詢目錄")
+    lookup.add_argument("--source", choices=("pc", "snkr"), required=True)
+    lookup.add_argument("--name", action="append", required=True, help="卡片名稱 (可重複: 英/日/中)")
+    lookup.add_argument("--number", required=True)
+    lookup.add_argument("--set_code", default="")
+
+    sub.add_parser("stats", help="顯示目錄統計")
+    args = parser.parse_args()
+
+    catalog = CardCatalog(args.db)
+    if args.command == "seed":
+        count = seed_from_debug_dirs(catalog, args.paths)
+        if os.path.exists(args.resolved_index):
+            from product_index import ResolvedProductIndex
+            count += seed_from_resolved_index(catalog, ResolvedProductIndex(args.resolved_index, max_age=0))
+        print(f"✅ 已匯入 {count} 筆商品")
+        print(json.dumps(catalog.stats(), ensure_ascii=False))
+    elif args.command == "lookup":
+        start = time.perf_counter()
+        results = catalog.candidates(args.source, args.number, args.name, set_code=args.set_code)
+        elapsed = (time.perf_counter() - start) * 1000
+        for similarity, row in results[:10]:
+            print(f"{similarity:.2f}  {row['product_url']}  {row['name'] or row['jp_name']}  [{row['set_code']} {row['number']}]")
+        print(f"({len(results)} 筆, {elapsed:.2f} ms)")
+    else:
+        print(json.dumps(catalog.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+
+import http_client
+
+# 匯率 API 無法使用且沒有快取，或呼叫端未傳入匯率快照時的 USD→JPY 備援值
+DEFAULT_JPY_RATE = 150.0
+
+
+class ExchangeRateService:
+    """
+    USD→JPY 匯率服務：記憶體 + 磁碟快取 (TTL)，過期時先回傳舊值並在背景更新，
+    只有完全沒有快取時才同步呼叫 API (有 timeout)，失敗則退回 DEFAULT_JPY_RATE。
+    log (可選) 接收更新 / 快取寫入失敗的訊息。
+    """
+
+    API_URL = "https://open.er-api.com/v6/latest/USD"
+
+    def __init__(self, path, ttl=6 * 3600, timeout=5, log=None):
+        self.path = path
+        self._log = log or (lambda message: None)
+        self.ttl = float(ttl)
+        self.timeout = float(timeout)
+        self._lock = threading.Lock()
+        self._rate = None
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._failed_at = 0.0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._rate = float(data["JPY"])
+            self._fetched_at = float(data["fetched_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _fetch(self):
+        resp = http_client.request("GET", self.API_URL, timeout=self.timeout)
+        resp.raise_for_status()
+        return float(resp.json()['rates']['JPY'])
+
+    def refresh(self):
+        try:
+            rate = self._fetch()
+        except Exception as e:
+            self._log(f"匯率更新失敗 (沿用舊值): {e}")
+            self._failed_at = time.time()
+            return None
+        now = time.time()
+        with self._lock:
+            self._rate = rate
+            self._fetched_at = now
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"JPY": rate, "fetched_at": now}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._log(f"匯率快取寫入失敗 (忽略): {e}")
+        return rate
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _worker():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=_worker, name="fx-refresh", daemon=True).start()
+
+    def get(self):
+        with self._lock:
+            rate, fetched_at = self._rate, self._fetched_at
+        if rate:
+            if time.time() - fetched_at > self.ttl:
+                self._refresh_in_background()
+            return rate
+        # 沒有任何快取：同步抓一次；若剛失敗過就直接用預設值，避免每個請求都卡在 timeout
+        if time.time() - self._failed_at < 300:
+            return DEFAULT_JPY_RATE
+        return self.refresh() or DEFAULT_JPY_RATE
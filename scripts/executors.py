@@ -0,0 +1,195 @@
+import asyncio
+import collections
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+
+# 每種工作負載各自的執行緒池，避免單一上游變慢時佔滿其他工作的執行緒。
+# (workers, queue)：queue 為 workers 全忙時最多可排隊的工作數，超過即 back-pressure (呼叫端等待)
+WORKLOADS = {
+    "scrape": (int(os.getenv("OPENCLAW_SCRAPE_WORKERS", 8)), int(os.getenv("OPENCLAW_SCRAPE_QUEUE", 32))),
+    "llm": (int(os.getenv("OPENCLAW_LLM_WORKERS", 4)), int(os.getenv("OPENCLAW_LLM_QUEUE", 16))),
+    "image": (int(os.getenv("OPENCLAW_IMAGE_WORKERS", 2)), int(os.getenv("OPENCLAW_IMAGE_QUEUE", 16))),
+    # 經過 Jina 的 PriceCharting 抓取：限流時執行緒會在 _jina_dispatcher.acquire 等 token，
+    # 獨立成一個池，等待中的請求不會佔滿 SNKRDUNK 等其他 scrape 工作的執行緒
+    "jina": (int(os.getenv("OPENCLAW_JINA_WORKERS", 4)), int(os.getenv("OPENCLAW_JINA_QUEUE", 32))),
+    # 單次搜尋內的並行查詢 (PriceCharting speculative 查詢、SNKRDUNK 查詢詞 fan-out)，由 "jina" /
+    # "scrape" 池中的搜尋送出。獨立成一個池，搜尋等待子查詢時不會與自己搶同一池的執行緒而 deadlock；
+    # 這裡的工作不可再送出 "fanout" 工作
+    "fanout": (int(os.getenv("OPENCLAW_FANOUT_WORKERS", 6)), int(os.getenv("OPENCLAW_FANOUT_QUEUE", 24))),
+}
+
+
+class BoundedExecutor:
+    """
+    命名、固定大小的執行緒池。進行中 (執行 + 排隊) 的工作數上限為 workers + queue；
+    達到上限時 run() 會 await、submit() 會阻塞，直到有工作完成 (back-pressure)。
+    stats() 提供 queue depth / active / 等待次數等指標。
+    """
+
+    def __init__(self, name, workers, queue):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.capacity = self.workers + max(0, int(queue))
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"openclaw-{name}")
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._async_waiters = collections.deque()
+        self._in_flight = 0
+        self._active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.saturated = 0
+        self.max_queue_depth = 0
+        self.queue_wait_total = 0.0
+
+    # ── 容量 ──
+    def _take_locked(self):
+        self._in_flight += 1
+        self.submitted += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._in_flight - self._active)
+
+    def _reserve(self):
+        with self._not_full:
+            if self._in_flight >= self.capacity:
+                self.saturated += 1
+                while self._in_flight >= self.capacity:
+                    self._not_full.wait()
+            self._take_locked()
+
+    async def _reserve_async(self):
+        loop = asyncio.get_running_loop()
+        counted = False
+        while True:
+            with self._lock:
+                if self._in_flight < self.capacity:
+                    self._take_locked()
+                    return
+                if not counted:
+                    self.saturated += 1
+                    counted = True
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # 被取消前若已被喚醒，把名額讓給下一位
+                if waiter.done() and not waiter.cancelled():
+                    self._wake_next()
+                raise
+
+    def _wake_next(self):
+        with self._lock:
+            self._not_full.notify()
+            while self._async_waiters:
+                loop, waiter = self._async_waiters.popleft()
+                if not waiter.done():
+                    loop.call_soon_threadsafe(self._deliver, waiter)
+                    break
+
+    def _deliver(self, waiter):
+        if waiter.done():  # 等待中的 coroutine 已被取消，改喚醒下一位
+            self._wake_next()
+        else:
+            waiter.set_result(None)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._wake_next()
+
+    def _on_done(self, future):
+        # 還在排隊時就被取消 (例如 await 端的 task 被 cancel) 的工作不會執行 _call，在這裡歸還名額
+        if future.cancelled():
+            with self._lock:
+                self.cancelled += 1
+            self._release()
+
+    # ── 執行 ──
+    def _wrap(self, fn, args, queued_at):
+        def _call():
+            with self._lock:
+                self._active += 1
+                self.queue_wait_total += time.monotonic() - queued_at
+            try:
+                return fn(*args)
+            except BaseException:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self.completed += 1
+                self._release()
+        return _call
+
+    def submit(self, fn, *args):
+        """同步呼叫端使用；滿載時阻塞。contextvars 會帶到工作執行緒。"""
+        self._reserve()
+        ctx = contextvars.copy_context()
+        try:
+            future = self._pool.submit(ctx.run, self._wrap(fn, args, time.monotonic()))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    async def run(self, fn, *args):
+        """在此池中執行 fn(*args) 並 await 結果；滿載時先 await 名額。contextvars 會帶到工作執行緒。"""
+        await self._reserve_async()
+        ctx = contextvars.copy_context()
+        try:
+            future = self._pool.submit(ctx.run, self._wrap(fn, args, time.monotonic()))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "active": self._active,
+                "queue_depth": self._in_flight - self._active,
+                "max_queue_depth": self.max_queue_depth,
+                "waiting": len(self._async_waiters),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "saturated": self.saturated,
+                "avg_queue_wait": self.queue_wait_total / self.completed if self.completed else 0.0,
+            }
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get(workload):
+    """取得 (必要時建立) 指定工作負載的 BoundedExecutor。"""
+    with _executors_lock:
+        executor = _executors.get(workload)
+        if executor is None:
+            workers, queue = WORKLOADS[workload]
+            executor = _executors[workload] = BoundedExecutor(workload, workers, queue)
+        return executor
+
+
+async def run(workload, fn, *args):
+    return await get(workload).run(fn, *args)
+
+
+def stats():
+    with _executors_lock:
+        executors = list(_executors.values())
+    return {e.name: e.stats() for e in executors}
@@ -0,0 +1,262 @@
+import asyncio
+import functools
+import os
+import random
+import threading
+import time
+import urllib.parse
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import executors
+
+try:
+    import httpx
+except ImportError:  # 沒有 httpx 時 async 請求改在執行緒中使用共用的 requests session
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (httpx 的 HTTP/2 支援需要 h2)
+    HTTP2_AVAILABLE = httpx is not None
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 每個 host 同時進行中的請求上限 (OPENCLAW_HTTP_PER_HOST 為預設值)；個別 host 可覆寫
+PER_HOST_LIMIT = max(1, int(os.getenv("OPENCLAW_HTTP_PER_HOST", 6)))
+HOST_LIMITS = {
+    "r.jina.ai": 4,
+    "api.minimax.io": 4,
+    "api.openai.com": 8,
+}
+# 沒有 httpx 時 async 請求改在執行緒中執行：LLM API 使用 llm 執行緒池，其餘使用 scrape
+LLM_HOSTS = frozenset({"api.openai.com", "api.minimax.io"})
+POOL_SIZE = max(PER_HOST_LIMIT, int(os.getenv("OPENCLAW_HTTP_POOL", 20)))
+KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 30.0
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
+
+if httpx is not None:
+    TRANSPORT_ERRORS = (httpx.TransportError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    HTTP_ERRORS = (httpx.HTTPError, requests.exceptions.RequestException)
+else:
+    TRANSPORT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    HTTP_ERRORS = (requests.exceptions.RequestException,)
+
+
+class RetryPolicy:
+    """
+    統一的重試規則：連線錯誤 / timeout 與 statuses 中的狀態碼會重試，
+    等待時間為指數退避加上 jitter，回應有 Retry-After 時以它為準 (不超過 max_backoff)。
+    最後一次嘗試的回應原樣回傳，由呼叫端決定 raise_for_status。
+
+    transport=False 時連線錯誤 / timeout 直接 raise，只依狀態碼重試：用於不冪等或
+    計費的 POST (例如 LLM API)，read timeout 時伺服器可能已經在處理，重送會重複計費。
+    """
+
+    __slots__ = ("attempts", "backoff", "max_backoff", "statuses", "transport")
+
+    def __init__(self, attempts=3, backoff=0.5, max_backoff=10.0, statuses=(429, 500, 502, 503, 504),
+                 transport=True):
+        self.attempts = max(1, int(attempts))
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self.statuses = frozenset(statuses)
+        self.transport = bool(transport)
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(self.max_backoff, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        base = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return base * (0.5 + random.random() / 2)
+
+
+DEFAULT_RETRY = RetryPolicy()
+NO_RETRY = RetryPolicy(attempts=1)
+# LLM 等計費的 POST：只重試 429 / 5xx (伺服器明確拒絕或失敗)，不重試連線錯誤與 timeout
+STATUS_ONLY_RETRY = RetryPolicy(attempts=3, backoff=2.0, transport=False)
+
+
+def _host(url):
+    return urllib.parse.urlsplit(url).hostname or ""
+
+
+def host_limit(host):
+    return HOST_LIMITS.get(host, PER_HOST_LIMIT)
+
+
+def _fallback_workload(url):
+    return "llm" if _host(url) in LLM_HOSTS else "scrape"
+
+
+# ── 同步：行程共用的 requests session (per-host keep-alive 連線池) ─────────────
+
+_session = None
+_session_lock = threading.Lock()
+_sync_host_slots = {}
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _session = session
+        return _session
+
+
+def _sync_slot(host):
+    with _session_lock:
+        slot = _sync_host_slots.get(host)
+        if slot is None:
+            slot = _sync_host_slots[host] = threading.BoundedSemaphore(host_limit(host))
+        return slot
+
+
+def request(method, url, retry=DEFAULT_RETRY, **kwargs):
+    """同步請求 (共用連線池 + per-host 併發上限 + 重試)。stream=True 時呼叫端負責關閉回應。"""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    session = get_session()
+    slot = _sync_slot(_host(url))
+    for attempt in range(retry.attempts):
+        last = attempt == retry.attempts - 1
+        try:
+            with slot:
+                response = session.request(method, url, **kwargs)
+        except TRANSPORT_ERRORS:
+            if last or not retry.transport:
+                raise
+            time.sleep(retry.delay(attempt))
+            continue
+        if response.status_code in retry.statuses and not last:
+            retry_after = response.headers.get("Retry-After")
+            response.close()
+            time.sleep(retry.delay(attempt, retry_after))
+            continue
+        return response
+
+
+# ── 非同步：每個 event loop 一個 AsyncHttpClient ─────────────────────────────
+
+class AsyncHttpClient:
+    """
+    asyncio HTTP client：httpx.AsyncClient 的 keep-alive 連線池 (有 h2 時使用 HTTP/2)，
+    per-host asyncio.Semaphore 限制併發，重試規則同 RetryPolicy。
+    沒有安裝 httpx 時退化為在 executors 的執行緒池中呼叫 request() (功能相同，但會佔用執行緒)。
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._client = None
+        if httpx is not None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                headers=DEFAULT_HEADERS,
+                timeout=DEFAULT_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=POOL_SIZE * 4, max_keepalive_connections=POOL_SIZE,
+                                    keepalive_expiry=KEEPALIVE_EXPIRY),
+            )
+
+    def _slot(self, host):
+        slot = self._slots.get(host)
+        if slot is None:
+            slot = self._slots[host] = asyncio.Semaphore(host_limit(host))
+        return slot
+
+    async def request(self, method, url, retry=DEFAULT_RETRY, **kwargs):
+        if self._client is None:
+            return await executors.run(_fallback_workload(url), functools.partial(request, method, url, retry, **kwargs))
+        slot = self._slot(_host(url))
+        for attempt in range(retry.attempts):
+            last = attempt == retry.attempts - 1
+            try:
+                async with slot:
+                    response = await self._client.request(method, url, **kwargs)
+            except TRANSPORT_ERRORS:
+                if last or not retry.transport:
+                    raise
+                await asyncio.sleep(retry.delay(attempt))
+                continue
+            if response.status_code in retry.statuses and not last:
+                await asyncio.sleep(retry.delay(attempt, response.headers.get("Retry-After")))
+                continue
+            return response
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def stream_text(self, url, on_chunk, chunk_size=16 * 1024, retry=DEFAULT_RETRY, **kwargs):
+        """
+        GET 並以串流方式讀取 body：每個文字片段交給 on_chunk，on_chunk 回傳 True 時
+        提前關閉連線。Returns (status_code, text)，text 為已讀取的部分 (非 2xx 時為空字串)。
+        on_chunk 通常帶有狀態 (例如串流 parser)，所以已經交出片段後的連線錯誤不重試，直接 raise。
+        """
+        if self._client is None:
+            return await executors.run("scrape", _stream_text_sync, url, on_chunk, chunk_size, retry, kwargs)
+        slot = self._slot(_host(url))
+        for attempt in range(retry.attempts):
+            last = attempt == retry.attempts - 1
+            delivered = False
+            try:
+                async with slot, self._client.stream("GET", url, **kwargs) as response:
+                    if response.status_code in retry.statuses and not last:
+                        retry_after = response.headers.get("Retry-After")
+                    elif response.status_code >= 400:
+                        return response.status_code, ""
+                    else:
+                        chunks = []
+                        async for chunk in response.aiter_text(chunk_size):
+                            chunks.append(chunk)
+                            delivered = True
+                            if on_chunk(chunk):
+                                break
+                        return response.status_code, "".join(chunks)
+            except TRANSPORT_ERRORS:
+                if last or delivered or not retry.transport:
+                    raise
+                retry_after = None
+            await asyncio.sleep(retry.delay(attempt, retry_after))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+
+def _stream_text_sync(url, on_chunk, chunk_size, retry, kwargs):
+    with request("GET", url, retry=retry, stream=True, **kwargs) as response:
+        if response.status_code >= 400:
+            return response.status_code, ""
+        response.encoding = response.encoding or "utf-8"
+        chunks = []
+        for chunk in response.iter_content(chunk_size=chunk_size, decode_unicode=True):
+            chunks.append(chunk)
+            if on_chunk(chunk):
+                break
+        return response.status_code, "".join(chunks)
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """目前 event loop 的共用 AsyncHttpClient (連線池綁定在 loop 上，loop 結束後一併釋放)。"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncHttpClient()
+    return client
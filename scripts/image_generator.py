@@ -1,5 +1,4 @@
 import os
-import urllib.request
 from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 import base64
 import io
@@ -10,6 +9,12 @@ from datetime import datetime
 from playwright.async_api import async_playwright
 import re
 import asyncio
+from singleflight import AsyncSingleFlight, SingleFlight
+import http_client
+import price_store
+from exchange_rate import DEFAULT_JPY_RATE
+import price_stats
+from price_records import RecordSet, canonical_grade, day_to_date, grade_slice
 
 # Font loading for different environments
 font_path_mac = '/System/Library/Fonts/Supplemental/Arial Unicode.ttf'
@@ -108,32 +113,63 @@ def _candidate_image_urls(url):
     return deduped
 
 
+# 多張海報同時使用同一張卡圖時，只下載一次
+_image_flights = SingleFlight("image")
+_image_flights_async = AsyncSingleFlight("image")
+
+_IMAGE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "image/avif,image/webp,image/apng,image/*,*/*;q=0.8",
+}
+
+
 def get_image_base64_from_url(url):
     if not url:
         return ""
+    return _image_flights.do(url, _download_image_base64, url)
+
+
+async def get_image_base64_from_url_async(url):
+    """asyncio 版：走共用的 AsyncHttpClient，不佔用執行緒。"""
+    if not url:
+        return ""
+    return await _image_flights_async.do(url, _download_image_base64_async, url)
+
+
+def _image_data_uri(img_data, content_type, candidate):
+    b64 = base64.b64encode(img_data).decode("utf-8")
+    mime = (content_type or "").split(";")[0].strip() or "application/octet-stream"
+    if mime == "application/octet-stream":
+        lower_url = candidate.lower()
+        if lower_url.endswith(".jpg") or lower_url.endswith(".jpeg"):
+            mime = "image/jpeg"
+        elif lower_url.endswith(".webp"):
+            mime = "image/webp"
+        else:
+            mime = "image/png"
+    return f"data:{mime};base64,{b64}"
 
+
+def _download_image_base64(url):
     for candidate in _candidate_image_urls(url):
         try:
-            req = urllib.request.Request(
-                candidate,
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "image/avif,image/webp,image/apng,image/*,*/*;q=0.8",
-                },
-            )
-            with urllib.request.urlopen(req, timeout=20) as response:
-                img_data = response.read()
-                b64 = base64.b64encode(img_data).decode("utf-8")
-                mime = response.headers.get_content_type() or "image/png"
-                if mime == "application/octet-stream":
-                    lower_url = candidate.lower()
-                    if lower_url.endswith(".jpg") or lower_url.endswith(".jpeg"):
-                        mime = "image/jpeg"
-                    elif lower_url.endswith(".webp"):
-                        mime = "image/webp"
-                    else:
-                        mime = "image/png"
-                return f"data:{mime};base64,{b64}"
+            response = http_client.request("GET", candidate, headers=_IMAGE_HEADERS, timeout=20)
+            response.raise_for_status()
+            return _image_data_uri(response.content, response.headers.get("Content-Type"), candidate)
+        except Exception:
+            continue
+
+    print(f"Failed to fetch image from {url}")
+    return ""
+
+
+async def _download_image_base64_async(url):
+    client = http_client.get_async_client()
+    for candidate in _candidate_image_urls(url):
+        try:
+            response = await client.get(candidate, headers=_IMAGE_HEADERS, timeout=20)
+            response.raise_for_status()
+            return _image_data_uri(response.content, response.headers.get("Content-Type"), candidate)
         except Exception:
             continue
 
@@ -302,7 +338,7 @@ def generate_features_html(features_text, theme="dark"):
 """
     return html
 
-def generate_table_rows(records, is_jpy=False, target_grade=None, theme="dark"):
+def generate_table_rows(records, is_jpy=False, target_grade=None, theme="dark", jpy_rate=DEFAULT_JPY_RATE):
     is_light = (theme == "light")
     if is_light:
         empty_cls = "text-slate-500"
@@ -320,19 +356,10 @@ def generate_table_rows(records, is_jpy=False, target_grade=None, theme="dark"):
     if not records:
         return f'<tr><td colspan="3" class="p-3 pl-4 {empty_cls} text-center">No transactions found</td></tr>'
         
-    filtered_records = []
-    if target_grade:
-        for r in records:
-            if is_jpy:
-                filtered_records.append(r)
-            else:
-                if r.get('grade') == target_grade:
-                    filtered_records.append(r)
-        
-        if not filtered_records:
-            filtered_records = records
-    else:
-        filtered_records = records
+    records = RecordSet.of(records)
+    filtered_records = records.records
+    if target_grade and not is_jpy:
+        filtered_records = records.slice(target_grade, "pc") or records.records
 
     html = ""
     for r in filtered_records[:10]:
@@ -340,7 +367,7 @@ def generate_table_rows(records, is_jpy=False, target_grade=None, theme="dark"):
         grade = r.get('grade', 'Ungraded')
         if is_jpy:
             jpy = int(r['price'])
-            usd = int(jpy / 150) # Rough exchange reference
+            usd = int(jpy / jpy_rate)
             price_str = f"¥{jpy:,} (~${usd})"
         else:
             price_str = f"${float(r['price']):.2f}"
@@ -383,63 +410,28 @@ def get_badge_html(grade):
 </div>"""
 
 
-def create_premium_matplotlib_chart_b64(records, color_line='#f4d125', target_grade="PSA 10", is_jpy=False, theme="dark"):
-    import re
-    from datetime import datetime, timedelta
+def create_premium_matplotlib_chart_b64(records, color_line='#f4d125', target_grade="PSA 10", is_jpy=False, theme="dark", jpy_rate=DEFAULT_JPY_RATE):
+    from datetime import timedelta
     import matplotlib.dates as mdates
-    from collections import defaultdict
+    import numpy as np
     import matplotlib.pyplot as plt
     import io, base64
 
-    if records is None: records = []
-
-    def parse_d(d_str):
-        try:
-            if '日前' in d_str: return datetime.now() - timedelta(days=int(re.search(r'\d+', d_str).group()))
-            if '小時前' in d_str or '時間前' in d_str: return datetime.now() - timedelta(hours=int(re.search(r'\d+', d_str).group()))
-            if '分前' in d_str: return datetime.now() - timedelta(minutes=int(re.search(r'\d+', d_str).group()))
-            if '-' in d_str: return datetime.strptime(d_str.strip(), '%Y-%m-%d')
-            if '/' in d_str: return datetime.strptime(d_str.strip(), '%Y/%m/%d')
-            if ',' in d_str: return datetime.strptime(d_str.strip(), '%b %d, %Y')
-        except: pass
-        return datetime.now()
-
+    # 每日均價 / 成交量由 price_stats 向量化計算 (SNKRDUNK 先換成 USD)
+    arrays = price_stats.PriceArrays(records, scale=(1 / jpy_rate) if is_jpy else 1.0)
     if is_jpy:
-        if '10' in str(target_grade) or str(target_grade).upper() == 'S': valid_grades = ['S', 'PSA10', 'PSA 10']
-        elif str(target_grade).lower() in ['ungraded', 'a']: valid_grades = ['A']
-        else: valid_grades = [target_grade, target_grade.replace(' ', '')]
-
+        day_arr, mean_arr, count_arr = arrays.daily(grades=grade_slice(target_grade, "snkr"))
+    elif canonical_grade(target_grade) == 'PSA 10':
+        day_arr, mean_arr, count_arr = arrays.daily(grades=('PSA 10',))
     else:
-        if '10' in str(target_grade): valid_grades = ['PSA 10']
-        else: valid_grades = None  # None means: show all non-PSA10 records
-
-
-    if valid_grades is None:
         # Show all non-PSA10 records (PSA 9, Raw, Ungraded, etc.)
-        filt = [r for r in records if r.get('grade', 'Ungraded') != 'PSA 10']
-    else:
-        filt = [r for r in records if r.get('grade', 'Ungraded') in valid_grades]
-
-    
-    date_to_prices = defaultdict(list)
-    for r in filt:
-        d = parse_d(r['date']).date() 
-        price_val = float(r['price'])
-        if is_jpy:
-            price_val = price_val / 150.0
-        date_to_prices[d].append(price_val)
-        
-    sorted_dates = sorted(list(date_to_prices.keys()))
+        day_arr, mean_arr, count_arr = arrays.daily(exclude=('PSA 10',))
 
     # Trim leading gap: if consecutive data points have a gap >= 60 days (2 months),
     # only show data from after the last such gap (avoids ugly blank stretches)
-    if len(sorted_dates) > 1:
-        cutoff_idx = 0
-        for i in range(1, len(sorted_dates)):
-            if (sorted_dates[i] - sorted_dates[i - 1]).days >= 60:
-                cutoff_idx = i
-        if cutoff_idx > 0:
-            sorted_dates = sorted_dates[cutoff_idx:]
+    gaps = np.flatnonzero(np.diff(day_arr) >= 60)
+    cutoff_idx = int(gaps[-1]) + 1 if len(gaps) else 0
+    sorted_dates = [day_to_date(int(d)) for d in day_arr[cutoff_idx:]]
 
     if theme == "light":
         axis_text = '#28425c'
@@ -482,8 +474,8 @@ def create_premium_matplotlib_chart_b64(records, color_line='#f4d125', target_gr
         plt.close(fig)
         return f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode('utf-8')}"
         
-    prices = [sum(date_to_prices[d])/len(date_to_prices[d]) for d in sorted_dates]
-    volumes = [len(date_to_prices[d]) for d in sorted_dates]
+    prices = mean_arr[cutoff_idx:].tolist()
+    volumes = count_arr[cutoff_idx:].tolist()
     
     # Legend labels
     price_label = "Price (Daily Avg)" if not is_jpy else "Price (Daily Avg, USD)"
@@ -569,35 +561,31 @@ def create_premium_matplotlib_chart_b64(records, color_line='#f4d125', target_gr
     plt.close(fig)
     return f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode('utf-8')}"
 
-def calculate_arbitrage_stats(pc_records, snkr_records):
-    pc_safe = pc_records or []
-    snkr_safe = snkr_records or []
-    
-    # Calculate stats for the bottom section
-    prices_10 = [float(r['price']) for r in pc_safe if '10' in str(r.get('grade', ''))]
-    prices_raw = [float(r['price']) for r in pc_safe if 'Ungraded' in str(r.get('grade', ''))]
-    prices_9 = [float(r['price']) for r in pc_safe if '9' in str(r.get('grade', ''))]
-    
-    avg_10 = sum(prices_10)/len(prices_10) if len(prices_10) > 0 else 0
-    max_10 = max(prices_10) if len(prices_10) > 0 else 0
-    avg_raw = sum(prices_raw)/len(prices_raw) if len(prices_raw) > 0 else 0
-    avg_9 = sum(prices_9)/len(prices_9) if len(prices_9) > 0 else 0
-    
-    snkr_10 = [float(r['price']) for r in snkr_safe if r.get('grade', '') in ['S', 'PSA10', 'PSA 10']]
-    snkr_raw = [float(r['price']) for r in snkr_safe if 'A' in str(r.get('grade', ''))]
-    
-    # Arbitrage Profit estimation for Raw -> PSA 10 (Targeting Max Price)
-    # Grading fee estimated around 1100 TWD (~$35 USD) + 10% value upcharge
-    profit = 0
-    if max_10 > 0 and avg_raw > 0:
-        grading_cost = 35.0 + (max_10 * 0.10)
-        profit = max_10 - (avg_raw + grading_cost)
-        
-    return avg_10, avg_9, avg_raw, profit, max_10
+def calculate_arbitrage_stats(pc_records, snkr_records, pc_stats=None):
+    # Calculate stats for the bottom section (price store aggregates, or PriceCharting's per-grade arrays)
+    # Arbitrage Profit estimation for Raw -> PSA 10 (Targeting Max Price), see price_stats.grading_profit
+    if pc_stats is None:
+        pc_stats = price_stats.PriceArrays(pc_records)
+    return price_stats.arbitrage_stats(pc_stats)
 
-async def generate_report(card_data, snkr_records, pc_records, out_dir=None, template_version="v3"):
+async def generate_report(card_data, snkr_records, pc_records, out_dir=None, template_version="v3", jpy_rate=None,
+                          pc_url=None, snkr_url=None):
     if not out_dir:
         out_dir = BASE_DIR
+    jpy_rate = jpy_rate or DEFAULT_JPY_RATE
+
+    # records 傳 None 但有商品 URL 時，改從本機價格資料庫讀取累積的成交紀錄；
+    # 有商品 URL 時統計也直接讀資料庫的彙總表
+    store = price_store.default_store() if (pc_url or snkr_url) else None
+    if (pc_records is None and pc_url) or (snkr_records is None and snkr_url):
+        if store:
+            if pc_records is None and pc_url:
+                pc_records = store.records("pc", pc_url)
+            if snkr_records is None and snkr_url:
+                snkr_records = store.records("snkr", snkr_url)
+    # 日期 / 等級只解析一次 (外部傳入的 dict 也在這裡轉成 PriceRecord)，並依 canonical 等級分桶
+    pc_records = RecordSet(pc_records) if pc_records is not None else None
+    snkr_records = RecordSet(snkr_records) if snkr_records is not None else None
 
     selected_version, template_dir, template1_path, template2_path = _resolve_template_bundle(template_version)
     print(f"🖼️ Poster template version: {selected_version} | profile={os.path.basename(template1_path)} | market={os.path.basename(template2_path)}")
@@ -641,12 +629,16 @@ async def generate_report(card_data, snkr_records, pc_records, out_dir=None, tem
     cv_level, cv_desc = parse_level_and_desc(card_data.get('collection_value', 'Medium'))
     cf_level, cf_desc = parse_level_and_desc(card_data.get('competitive_freq', 'Low'))
     
-    card_img_b64 = get_image_base64_from_url(card_data.get('img_url', ''))
+    # 走共用的 async client 下載，不阻塞 event loop，並行的相同圖片請求會合併
+    card_img_b64 = await get_image_base64_from_url_async(card_data.get('img_url', ''))
     
-    p_prices = [r['price'] for r in pc_records] if pc_records else [0]
     total_entries = (len(snkr_records) if snkr_records else 0) + (len(pc_records) if pc_records else 0)
-    
-    avg_10, avg_9, avg_raw, profit, max_10 = calculate_arbitrage_stats(pc_records, snkr_records) if pc_records else (0,0,0,0,0)
+
+    # 各等級 / 時間窗的統計 (SNKRDUNK 價格換成 USD)：資料庫有該商品時讀彙總表，否則在 numpy 陣列上計算
+    pc_stats = price_stats.report_stats(pc_records, store, "pc", pc_url)
+    snkr_stats = price_stats.report_stats(snkr_records, store, "snkr", snkr_url, jpy_rate=jpy_rate, scale=1 / jpy_rate)
+
+    avg_10, avg_9, avg_raw, profit, max_10 = calculate_arbitrage_stats(pc_records, snkr_records, pc_stats=pc_stats) if pc_records else (0,0,0,0,0)
     
     market_grade = str(card_data.get('grade', 'Ungraded')).upper()
     if market_grade in ['UNGRADED', 'A']:
@@ -656,42 +648,14 @@ async def generate_report(card_data, snkr_records, pc_records, out_dir=None, tem
     else:
         badge_mode = 'both'
         
-    from datetime import datetime, timedelta
-    import re
-    
-    def parse_d(d_str):
-        try:
-            if '日前' in d_str: return datetime.now() - timedelta(days=int(re.search(r'\d+', d_str).group()))
-            if '小時前' in d_str or '時間前' in d_str: return datetime.now() - timedelta(hours=int(re.search(r'\d+', d_str).group()))
-            if '分前' in d_str: return datetime.now() - timedelta(minutes=int(re.search(r'\d+', d_str).group()))
-            if '-' in d_str: return datetime.strptime(d_str.strip(), '%Y-%m-%d')
-            if '/' in d_str: return datetime.strptime(d_str.strip(), '%Y/%m/%d')
-            if ',' in d_str: return datetime.strptime(d_str.strip(), '%b %d, %Y')
-        except: pass
-        return datetime.now()
-
-    def count_30_days(records_list, tgt_grade):
-        cutoff = datetime.now() - timedelta(days=30)
-        return len([r for r in (records_list or []) if r.get('grade') == tgt_grade and parse_d(r['date']) > cutoff])
+    def count_30_days(stats, grades=None, exclude=None):
+        return stats.stats(grades, 30, exclude)["count"]
 
     target_grade_1 = card_data.get('grade', 'Ungraded')
-    recent_prices = []
-    sixty_days_ago = datetime.now() - timedelta(days=60)
-    
-    if pc_records:
-        recent_prices.extend([float(r['price']) for r in pc_records if r.get('grade') == target_grade_1 and parse_d(r['date']) >= sixty_days_ago])
-        
-    if snkr_records:
-        if '10' in target_grade_1:
-            valid_snkr_grades = ['S', 'PSA10', 'PSA 10']
-        elif target_grade_1.lower() == 'ungraded':
-            valid_snkr_grades = ['A']
-        else:
-            valid_snkr_grades = [target_grade_1, target_grade_1.replace(' ', '')]
-            
-        recent_prices.extend([float(r['price']) / 150.0 for r in snkr_records if r.get('grade') in valid_snkr_grades and parse_d(r['date']) >= sixty_days_ago])
-        
-    recent_avg = sum(recent_prices) / len(recent_prices) if recent_prices else 0
+    recent_avg = price_stats.merge_stats([
+        pc_stats.stats(grade_slice(target_grade_1, "pc"), 60),
+        snkr_stats.stats(grade_slice(target_grade_1, "snkr"), 60),
+    ])["mean"]
     recent_avg_str = f"${recent_avg:.2f}" if recent_avg > 0 else "N/A"
 
     replacements_1 = {
@@ -731,13 +695,11 @@ async def generate_report(card_data, snkr_records, pc_records, out_dir=None, tem
     target_grade = card_data.get('grade', 'Ungraded')
 
     # Calculate time span for Total Entries
-    all_dates = []
-    for r in (pc_records or []) + (snkr_records or []):
-        all_dates.append(parse_d(r['date']))
-        
+    first_days = [stats["first_day"] for stats in (pc_stats.stats(), snkr_stats.stats()) if stats["count"]]
+
     days_span = ""
-    if all_dates:
-        min_date = min(all_dates)
+    if first_days:
+        min_date = datetime.combine(day_to_date(min(first_days)), datetime.min.time())
         delta_days = (datetime.now() - min_date).days
         if delta_days == 0:
             days_span = " (24h內)"
@@ -755,17 +717,15 @@ async def generate_report(card_data, snkr_records, pc_records, out_dir=None, tem
         # Generate 4 Charts (2 per column) with 30-day volume metrics overlaid
         c_pc_10 = create_premium_matplotlib_chart_b64(pc_records, color_line=chart_line_color, target_grade='PSA 10', is_jpy=False, theme=market_theme)
         c_pc_raw = create_premium_matplotlib_chart_b64(pc_records, color_line=chart_line_color, target_grade='Ungraded', is_jpy=False, theme=market_theme)
-        c_sk_10 = create_premium_matplotlib_chart_b64(snkr_records, color_line=chart_line_color, target_grade='S', is_jpy=True, theme=market_theme)
-        c_sk_raw = create_premium_matplotlib_chart_b64(snkr_records, color_line=chart_line_color, target_grade='A', is_jpy=True, theme=market_theme)
-        
-        v_pc_10 = count_30_days(pc_records, 'PSA 10')
-        v_pc_raw_cutoff = datetime.now() - timedelta(days=30)
-        v_pc_raw = len([r for r in (pc_records or []) if r.get('grade') != 'PSA 10' and parse_d(r['date']) > v_pc_raw_cutoff])
+        c_sk_10 = create_premium_matplotlib_chart_b64(snkr_records, color_line=chart_line_color, target_grade='S', is_jpy=True, theme=market_theme, jpy_rate=jpy_rate)
+        c_sk_raw = create_premium_matplotlib_chart_b64(snkr_records, color_line=chart_line_color, target_grade='A', is_jpy=True, theme=market_theme, jpy_rate=jpy_rate)
         
+        v_pc_10 = count_30_days(pc_stats, grades=('PSA 10',))
+        v_pc_raw = count_30_days(pc_stats, exclude=('PSA 10',))
+
         # SNKRDUNK volume metrics (Synced with chart filters)
-        v_sk_10_cutoff = datetime.now() - timedelta(days=30)
-        v_sk_10 = len([r for r in (snkr_records or []) if r.get('grade') in ['S', 'PSA10', 'PSA 10'] and parse_d(r['date']) > v_sk_10_cutoff])
-        v_sk_raw = count_30_days(snkr_records, 'A')
+        v_sk_10 = count_30_days(snkr_stats, grades=('PSA 10',))
+        v_sk_raw = count_30_days(snkr_stats, grades=grade_slice('A', "snkr"))
 
         pc_charts_html = f"""
         <div class="w-full flex flex-col gap-6 mb-2 mt-4">
@@ -816,20 +776,10 @@ async def generate_report(card_data, snkr_records, pc_records, out_dir=None, tem
             table_head_text = "text-primary-dark"
             table_body_divider = "divide-border-gold/10"
 
-        if snkr_records:
-            if '10' in target_grade:
-                valid_snkr_grades = ['S', 'PSA10', 'PSA 10']
-            elif target_grade.lower() == 'ungraded':
-                valid_snkr_grades = ['A']
-            else:
-                valid_snkr_grades = [target_grade, target_grade.replace(' ', '')]
-            
-            snkr_target_records = [r for r in snkr_records if r['grade'] in valid_snkr_grades]
-        else:
-            snkr_target_records = []
+        snkr_target_records = snkr_records.slice(target_grade, "snkr") if snkr_records else []
 
         c_pc = create_premium_matplotlib_chart_b64(pc_records, color_line=chart_line_color, target_grade=target_grade, is_jpy=False, theme=market_theme)
-        c_sk = create_premium_matplotlib_chart_b64(snkr_target_records, color_line=chart_line_color, target_grade=target_grade, is_jpy=True, theme=market_theme)
+        c_sk = create_premium_matplotlib_chart_b64(snkr_target_records, color_line=chart_line_color, target_grade=target_grade, is_jpy=True, theme=market_theme, jpy_rate=jpy_rate)
         
         pc_charts_html = f"""
         <div class="w-full h-[220px] mt-2 mb-1 flex items-end justify-center relative overflow-hidden">
@@ -868,7 +818,7 @@ async def generate_report(card_data, snkr_records, pc_records, out_dir=None, tem
                             </tr>
                         </thead>
                         <tbody class="text-sm divide-y {table_body_divider}">
-                            {generate_table_rows(snkr_target_records, is_jpy=True, theme=market_theme)}
+                            {generate_table_rows(snkr_target_records, is_jpy=True, theme=market_theme, jpy_rate=jpy_rate)}
                         </tbody>
                     </table>
                 </div>"""
@@ -882,17 +832,16 @@ async def generate_report(card_data, snkr_records, pc_records, out_dir=None, tem
                     <p class="text-slate-500 text-sm font-semibold">No SNKRDUNK transactions found for {target_grade}</p>
                 </div>"""
                 
-        tgt_prices = []
-        if pc_records:
-            tgt_prices.extend([float(r['price']) for r in pc_records if r.get('grade') == target_grade])
-        if snkr_target_records:
-            tgt_prices.extend([float(r['price']) / 150.0 for r in snkr_target_records])
-            
-        avg_tgt = sum(tgt_prices)/len(tgt_prices) if tgt_prices else 0
+        tgt_stats = price_stats.merge_stats([
+            pc_stats.stats(grade_slice(target_grade, "pc")),
+            snkr_stats.stats(grade_slice(target_grade, "snkr")),
+        ])
+
+        avg_tgt = tgt_stats['mean']
         stat_1_t, stat_1_v = f"{target_grade} Avg (均價)", f"${avg_tgt:.2f}" if avg_tgt > 0 else "N/A"
         # SAFETY CHECK for empty sequences
-        stat_2_t, stat_2_v = f"{target_grade} Min (最低)", f"${min(tgt_prices):.2f}" if tgt_prices else "N/A"
-        stat_3_t, stat_3_v = f"{target_grade} Max (最高)", f"${max(tgt_prices):.2f}" if tgt_prices else "N/A"
+        stat_2_t, stat_2_v = f"{target_grade} Min (最低)", f"${tgt_stats['min']:.2f}" if tgt_stats['count'] else "N/A"
+        stat_3_t, stat_3_v = f"{target_grade} Max (最高)", f"${tgt_stats['max']:.2f}" if tgt_stats['count'] else "N/A"
         
         stat_4_t, stat_4_v = f"Total Entries{days_span}", str(total_entries)
 
@@ -0,0 +1,189 @@
+import base64
+import io
+import math
+import os
+import threading
+
+try:
+    import numpy as np
+    from PIL import Image, ImageOps
+except ImportError:  # 沒有 Pillow / numpy 時不做前處理，直接上傳原檔
+    np = None
+    Image = None
+
+# GPT-4o-mini (detail=high) 會把圖片縮到短邊 768px (長邊不超過 2048px) 再切 tile，
+# 上傳更大的解析度只會增加傳輸量，不會增加辨識細節
+VISION_SHORT_SIDE = int(os.getenv("OPENCLAW_VISION_SHORT_SIDE", 768))
+VISION_LONG_SIDE = 2048
+JPEG_QUALITY = int(os.getenv("OPENCLAW_VISION_JPEG_QUALITY", 85))
+
+# 卡片偵測：前景需佔畫面的比例與長寬比 (卡片約 0.72，鑑定卡盒約 0.6) 落在合理範圍才裁切
+_DETECT_SIDE = 256
+_MIN_CARD_AREA = 0.15
+_ASPECT_RANGE = (0.45, 0.9)
+_MAX_DESKEW_DEG = 15.0
+_MIN_DESKEW_DEG = 0.5
+_CROP_MARGIN = 0.02
+# 確認偵測到的是整張卡片 (而不是卡片填滿畫面時、與卡框同色的「背景」中間的圖案)：
+# 裁切範圍外的前景不得超過 _MAX_OUTSIDE，且範圍內緣四邊 (_EDGE_BAND 寬) 都要是連續的卡片邊框
+_MAX_OUTSIDE = 0.02
+_EDGE_BAND = 0.03
+_MIN_EDGE_FILL = 0.6
+
+_MIME_BY_EXT = {"png": "image/png", "webp": "image/webp"}
+
+_totals_lock = threading.Lock()
+_totals = {"images": 0, "original_bytes": 0, "sent_bytes": 0}
+
+
+def _mime_for(image_path):
+    return _MIME_BY_EXT.get(image_path.lower().rsplit(".", 1)[-1], "image/jpeg")
+
+
+def _border(gray):
+    return np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+
+
+def _foreground_mask(gray):
+    """與畫面邊緣 (背景) 亮度差異大的像素視為卡片。"""
+    border = _border(gray)
+    background = np.median(border)
+    spread = max(float(np.percentile(np.abs(border - background), 90)), 8.0)
+    return np.abs(gray - background) > spread * 2
+
+
+def _skew_angle(mask):
+    """前景像素的主軸角度 (度)；矩形卡片的主軸與長邊平行，直立時為 0。"""
+    ys, xs = np.nonzero(mask)
+    if len(xs) < 100:
+        return 0.0
+    xs = xs - xs.mean()
+    ys = ys - ys.mean()
+    mu20, mu02, mu11 = (xs * xs).mean(), (ys * ys).mean(), (xs * ys).mean()
+    angle = 0.5 * math.degrees(math.atan2(2 * mu11, mu20 - mu02))
+    # 主軸相對於垂直方向的偏移
+    deviation = angle - 90 if angle > 0 else angle + 90
+    return deviation
+
+
+def _bounding_box(mask, frac=0.2):
+    """前景比例超過 frac 的行 / 列範圍 (排除零星雜訊)。"""
+    rows = np.nonzero(mask.mean(axis=1) > frac)[0]
+    cols = np.nonzero(mask.mean(axis=0) > frac)[0]
+    if not len(rows) or not len(cols):
+        return None
+    return cols[0], rows[0], cols[-1] + 1, rows[-1] + 1
+
+
+def _is_card_outline(mask, box, margin):
+    """box 是否框住了全部前景，且四邊內緣都是連續的前景 (背景上的一張卡片)。"""
+    left, top, right, bottom = box
+    height, width = mask.shape
+    outside = mask.copy()
+    outside[max(0, int(top - margin)):int(bottom + margin), max(0, int(left - margin)):int(right + margin)] = False
+    if outside.sum() > _MAX_OUTSIDE * max(1, mask.sum()):
+        return False
+    band = max(1, round(_EDGE_BAND * max(right - left, bottom - top)))
+    sides = (
+        mask[top:top + band, left:right],
+        mask[bottom - band:bottom, left:right],
+        mask[top:bottom, left:left + band],
+        mask[top:bottom, right - band:right],
+    )
+    return all(side.mean() >= _MIN_EDGE_FILL for side in sides)
+
+
+def detect_card(image):
+    """
+    偵測卡片位置。Returns (angle, box)：angle 為需要旋轉的角度 (度，0 代表不需要)，
+    box 為旋轉後影像上的裁切範圍 (left, top, right, bottom)。
+    畫面中找不到「背景上一張完整卡片」時 (例如卡片填滿畫面) 回傳 (0.0, None)，只做縮圖。
+    """
+    scale = _DETECT_SIDE / max(image.size)
+    small = image.convert("L").resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))))
+    gray = np.asarray(small, dtype=np.float32)
+    mask = _foreground_mask(gray)
+
+    angle = _skew_angle(mask)
+    if not (_MIN_DESKEW_DEG <= abs(angle) <= _MAX_DESKEW_DEG):
+        angle = 0.0
+    if angle:
+        background = int(np.median(_border(gray)))
+        small = small.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=background)
+        mask = _foreground_mask(np.asarray(small, dtype=np.float32))
+
+    box = _bounding_box(mask)
+    if box is None:
+        return 0.0, None
+    left, top, right, bottom = box
+    width, height = right - left, bottom - top
+    if width * height < _MIN_CARD_AREA * small.width * small.height:
+        return 0.0, None
+    if not (_ASPECT_RANGE[0] <= min(width, height) / max(width, height) <= _ASPECT_RANGE[1]):
+        return 0.0, None
+    margin = _CROP_MARGIN * max(width, height)
+    if not _is_card_outline(mask, box, margin):
+        return 0.0, None
+    inv = 1 / scale
+    return angle, (
+        max(0, int((left - margin) * inv)),
+        max(0, int((top - margin) * inv)),
+        int((right + margin) * inv),
+        int((bottom + margin) * inv),
+    )
+
+
+def _downscale(image):
+    ratio = min(1.0, VISION_SHORT_SIDE / min(image.size), VISION_LONG_SIDE / max(image.size))
+    if ratio >= 1.0:
+        return image
+    return image.resize((max(1, round(image.width * ratio)), max(1, round(image.height * ratio))), Image.LANCZOS)
+
+
+def prepare_card_image(image_path):
+    """
+    上傳給 vision 模型前的前處理：依 EXIF 轉正 → 偵測卡片並裁切 / 校正傾斜 →
+    縮到模型實際使用的解析度 → 重新以 JPEG 編碼。
+
+    Returns (mime, base64 字串, info)。info 含 original_bytes / sent_bytes / saved_bytes /
+    size / cropped / angle。前處理失敗或結果沒有比原檔小時直接使用原檔。
+    """
+    with open(image_path, "rb") as f:
+        original = f.read()
+    info = {"original_bytes": len(original), "sent_bytes": len(original), "saved_bytes": 0,
+            "size": None, "cropped": False, "angle": 0.0}
+    mime, payload = _mime_for(image_path), original
+
+    if Image is not None:
+        try:
+            with Image.open(io.BytesIO(original)) as src:
+                image = ImageOps.exif_transpose(src).convert("RGB")
+            angle, box = detect_card(image)
+            if angle:
+                image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=(255, 255, 255))
+            if box is not None:
+                image = image.crop(box)
+            image = _downscale(image)
+            out = io.BytesIO()
+            image.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+            if out.tell() < len(original):
+                mime, payload = "image/jpeg", out.getvalue()
+                info.update(size=image.size, cropped=box is not None, angle=round(angle, 1))
+        except Exception:
+            pass
+
+    info["sent_bytes"] = len(payload)
+    info["saved_bytes"] = len(original) - len(payload)
+    with _totals_lock:
+        _totals["images"] += 1
+        _totals["original_bytes"] += info["original_bytes"]
+        _totals["sent_bytes"] += info["sent_bytes"]
+    return mime, base64.b64encode(payload).decode("utf-8"), info
+
+
+def stats():
+    """本行程累計的前處理效果。"""
+    with _totals_lock:
+        totals = dict(_totals)
+    totals["saved_bytes"] = totals["original_bytes"] - totals["sent_bytes"]
+    return totals
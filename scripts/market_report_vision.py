@@ -1,4 +1,5 @@
 import argparse
+import collections
 import asyncio
 import subprocess
 import re
@@ -6,16 +7,40 @@ import requests
 import json
 import time
 import urllib.parse
-import concurrent.futures
+import functools
 import os
-import base64
 import threading
 import tempfile
+import sqlite3
 import image_generator
-from collections import deque
-from datetime import datetime, timedelta
+import http_client
+import executors
+import image_prep
+from snkr_history import (
+    SnkrHistoryStore,
+    SNKR_HISTORY_URL,
+    sync_trading_histories,
+    backfill_trading_histories,
+)
+from rate_limiter import (
+    SharedTokenBucket,
+    PriorityDispatcher,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BATCH,
+    PRIORITY_PREFETCH,
+)
+from singleflight import SingleFlight
+from product_index import ResolvedProductIndex, card_identity
+from vision_cache import VisionResultCache, image_fingerprint
+from card_catalog import CardCatalog, pc_product_entry, snkr_product_entry
+from price_store import PriceStore
+from price_records import PriceRecord, RecordSet, as_dicts, grade_slice, is_relative_date, to_records
+from pc_parser import PcMarkdownParser, parse_pc_search_prices
+from price_stats import PriceArrays, report_stats, window_median
+from exchange_rate import ExchangeRateService
 from dotenv import load_dotenv
 import contextvars
+import contextlib
 
 load_dotenv()
 
@@ -114,70 +139,408 @@ def print(*args, **kwargs):
         del kwargs['force']
     _original_print(*args, **kwargs)
 
-_jina_requests_queue = deque()
-_jina_lock = threading.Lock()
+# ── 本機快取目錄 (Jina 回應快取等) ────────────────────────────────────────
+OPENCLAW_CACHE_DIR = os.getenv("OPENCLAW_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "openclaw")
 
-def fetch_jina_markdown(target_url):
-    global _jina_requests_queue
-    
-    # Rate Limiter: 18 requests per 60 seconds (1 minute)
-    MAX_REQUESTS = 18
-    WINDOW_SIZE = 60.0
-    
-    sleep_time = 0
-    with _jina_lock:
+def _cache_path(filename):
+    os.makedirs(OPENCLAW_CACHE_DIR, exist_ok=True)
+    return os.path.join(OPENCLAW_CACHE_DIR, filename)
+
+class JinaResponseCache:
+    """
+    Disk-backed (SQLite) cache of r.jina.ai markdown, keyed by target URL.
+
+    - 搜尋頁 / 商品頁各自有 TTL；過期但仍在 stale 視窗內的內容會先回傳，再於背景重抓。
+    - 總大小超過 max_bytes 時，依 last_access 做 LRU 淘汰。
+    - hits / stale_hits / misses / evictions 計數僅統計本行程。
+    """
+
+    def __init__(self, path, search_ttl=6 * 3600, product_ttl=12 * 3600,
+                 stale_ttl=3 * 86400, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.search_ttl = search_ttl
+        self.product_ttl = product_ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jina_cache ("
+                " url TEXT PRIMARY KEY, kind TEXT NOT NULL, body TEXT NOT NULL,"
+                " size INTEGER NOT NULL, fetched_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jina_cache_access ON jina_cache(last_access)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def page_kind(target_url):
+        url_l = str(target_url).lower()
+        if "/search-products" in url_l or "/search?" in url_l:
+            return "search"
+        return "product"
+
+    def ttl_for(self, kind):
+        return self.search_ttl if kind == "search" else self.product_ttl
+
+    def get(self, target_url):
+        """Returns (body, state) where state is "fresh", "stale" or None (miss)."""
         now = time.time()
-        # Remove requests older than 60 seconds
-        while _jina_requests_queue and now - _jina_requests_queue[0] > WINDOW_SIZE:
-            _jina_requests_queue.popleft()
-            
-        if len(_jina_requests_queue) >= MAX_REQUESTS:
-            # Calculate sleep time required to let the oldest request expire
-            sleep_time = WINDOW_SIZE - (now - _jina_requests_queue[0])
-            
-    if sleep_time > 0:
-        print(f"⏳ Jina API rate limit approaching ({MAX_REQUESTS}/min). Pausing for {sleep_time:.1f} seconds to cool down...")
-        time.sleep(sleep_time)
-        
-    with _jina_lock:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT kind, body, fetched_at FROM jina_cache WHERE url = ?", (target_url,)
+            ).fetchone()
+            if not row:
+                self.misses += 1
+                return None, None
+            kind, body, fetched_at = row
+            age = now - fetched_at
+            ttl = self.ttl_for(kind)
+            if age > ttl + self.stale_ttl:
+                self.misses += 1
+                return None, None
+            conn.execute("UPDATE jina_cache SET last_access = ? WHERE url = ?", (now, target_url))
+            if age <= ttl:
+                self.hits += 1
+                return body, "fresh"
+            self.stale_hits += 1
+            return body, "stale"
+
+    def put(self, target_url, body):
+        if not body:
+            return
         now = time.time()
-        # Clean up again
-        while _jina_requests_queue and now - _jina_requests_queue[0] > WINDOW_SIZE:
-            _jina_requests_queue.popleft()
-        _jina_requests_queue.append(now)
+        size = len(body.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jina_cache (url, kind, body, size, fetched_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (target_url, self.page_kind(target_url), body, size, now, now),
+            )
+            self._evict(conn)
+
+    def invalidate(self, target_url):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM jina_cache WHERE url = ?", (target_url,))
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM jina_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in conn.execute(
+            "SELECT url, size FROM jina_cache ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM jina_cache WHERE url = ?", (url,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM jina_cache"
+            ).fetchone()
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+        }
 
-    print(f"Fetching: {target_url}...")
-    jina_url = f"https://r.jina.ai/{target_url}"
-    
-    for attempt in range(3):
+def _init_jina_cache():
+    if os.getenv("OPENCLAW_JINA_CACHE", "1").strip().lower() in ("0", "false", "off"):
+        return None
+    try:
+        return JinaResponseCache(
+            _cache_path("jina_cache.sqlite3"),
+            search_ttl=float(os.getenv("OPENCLAW_JINA_SEARCH_TTL", 6 * 3600)),
+            product_ttl=float(os.getenv("OPENCLAW_JINA_PRODUCT_TTL", 12 * 3600)),
+            stale_ttl=float(os.getenv("OPENCLAW_JINA_STALE_TTL", 3 * 86400)),
+            max_bytes=int(float(os.getenv("OPENCLAW_JINA_CACHE_MAX_MB", 200)) * 1024 * 1024),
+        )
+    except Exception as e:
+        _original_print(f"⚠️ Jina 快取初始化失敗，改為不使用快取: {e}")
+        return None
+
+_jina_cache = _init_jina_cache()
+_jina_revalidating = set()
+_jina_revalidating_lock = threading.Lock()
+
+def get_jina_cache_stats():
+    return _jina_cache.stats() if _jina_cache else {}
+
+def _revalidate_jina_in_background(target_url):
+    """stale-while-revalidate：舊內容已回傳給呼叫端，這裡在背景更新快取。"""
+    with _jina_revalidating_lock:
+        if target_url in _jina_revalidating:
+            return
+        _jina_revalidating.add(target_url)
+
+    def _worker():
         try:
-            response = requests.get(jina_url, timeout=60)
+            md = _fetch_jina_markdown_uncached(target_url, priority=PRIORITY_PREFETCH)
+            if md and _jina_cache:
+                _jina_cache.put(target_url, md)
+        finally:
+            with _jina_revalidating_lock:
+                _jina_revalidating.discard(target_url)
+
+    threading.Thread(target=_worker, name="jina-revalidate", daemon=True).start()
+
+# 商品頁以串流方式下載，解析器拿到所需內容後即關閉連線 (OPENCLAW_JINA_STREAM=0 關閉)
+JINA_STREAM = os.getenv("OPENCLAW_JINA_STREAM", "1").strip().lower() not in ("0", "false", "off")
+JINA_STREAM_CHUNK = 16 * 1024
+# 429 由 _on_jina_429 處理 (同時清空共用的限流額度)，這裡只重試暫時性的 5xx
+JINA_RETRY = http_client.RetryPolicy(attempts=2, statuses=(502, 503, 504))
+PC_STREAM_TAIL_LINES = int(os.getenv("OPENCLAW_PC_STREAM_TAIL_LINES", 150))
+# 串流提前結束時只讀到頁面前段：快取在「URL + 這個標記」下，只有帶 parser 的呼叫端會讀取，
+# 一般呼叫端 (要完整頁面) 不會拿到截斷的內容
+JINA_PARTIAL_MARKER = "#openclaw-stream-partial"
+
+# Rate Limiter: 18 requests per 60 seconds，由同一台主機上所有 OpenClaw 行程共用
+JINA_MAX_REQUESTS = 18
+JINA_WINDOW_SIZE = 60.0
+
+def _init_jina_limiter():
+    try:
+        return SharedTokenBucket(_cache_path("rate_limit.sqlite3"), "jina", JINA_MAX_REQUESTS, JINA_WINDOW_SIZE)
+    except Exception as e:
+        _original_print(f"⚠️ 共用 rate limiter 初始化失敗，改用單行程限流: {e}")
+        return SharedTokenBucket(None, "jina", JINA_MAX_REQUESTS, JINA_WINDOW_SIZE)
+
+_jina_limiter = _init_jina_limiter()
+# 同一行程內的 Jina 請求依優先等級排隊 (interactive > batch > prefetch)
+_jina_dispatcher = PriorityDispatcher(
+    _jina_limiter,
+    starvation_bound=float(os.getenv("OPENCLAW_JINA_STARVATION_S", 90)),
+)
+_jina_priority_var = contextvars.ContextVar('JINA_PRIORITY', default=PRIORITY_INTERACTIVE)
+
+def set_jina_priority(priority):
+    """設定目前 task / context 的 Jina 請求優先等級 (PRIORITY_*)。"""
+    _jina_priority_var.set(priority)
+
+def get_jina_budget():
+    """目前 Jina 可用額度 (跨行程)，讓呼叫端在發出請求前就能規劃。"""
+    return _jina_limiter.budget()
+
+def _on_jina_rate_wait(sleep_time):
+    print(f"⏳ Jina API rate limit approaching ({JINA_MAX_REQUESTS}/min). Pausing for {sleep_time:.1f} seconds to cool down...")
+
+def _jina_get_once(target_url, parser=None, cancel=None):
+    """
+    單次 HTTP 嘗試。回傳 (text, retry)；遇到 429 時 retry=True。
+    有 parser (PcMarkdownParser) 時以串流方式邊下載邊解析，parser.done 後
+    提前關閉連線，text 為已讀取的部分。
+    有 cancel (threading.Event) 時同樣以串流方式讀取，被設定後關閉連線並回傳空字串。
+    """
+    jina_url = f"https://r.jina.ai/{target_url}"
+    try:
+        if parser is None and cancel is None:
+            response = http_client.request("GET", jina_url, retry=JINA_RETRY, timeout=60)
             if response.status_code == 429:
-                print(f"⚠️ Jina 發生 429 頻率限制 (嘗試 {attempt+1}/3). 暫停 1 秒後重試...")
-                time.sleep(1)
-                continue
-                
+                return "", True
             response.raise_for_status()
-            return response.text
-            
-        except requests.exceptions.RequestException as e:
-            if hasattr(e, 'response') and e.response is not None and e.response.status_code == 429:
-                print(f"⚠️ Jina 發生 429 頻率限制 (嘗試 {attempt+1}/3). 暫停 1 秒後重試...")
-                time.sleep(1)
-                continue
-                
-            print(f"Fetch error for {target_url}: {e}")
+            return response.text, False
+        with http_client.request("GET", jina_url, retry=JINA_RETRY, timeout=60, stream=True) as response:
+            if response.status_code == 429:
+                return "", True
+            response.raise_for_status()
+            return _read_jina_stream(response, target_url, parser, cancel), False
+    except requests.exceptions.RequestException as e:
+        if hasattr(e, 'response') and e.response is not None and e.response.status_code == 429:
+            return "", True
+        print(f"Fetch error for {target_url}: {e}")
+        return "", False
+
+async def _jina_get_once_async(target_url, parser=None):
+    """_jina_get_once 的 asyncio 版 (共用的 AsyncHttpClient，不經過執行緒)。"""
+    jina_url = f"https://r.jina.ai/{target_url}"
+    client = http_client.get_async_client()
+    try:
+        if parser is None:
+            response = await client.get(jina_url, retry=JINA_RETRY, timeout=60)
+            status, text = response.status_code, response.text
+        else:
+            status, text = await client.stream_text(jina_url, parser.feed, chunk_size=JINA_STREAM_CHUNK,
+                                                    retry=JINA_RETRY, timeout=60)
+            if parser.done:
+                _debug_log(f"Jina 串流提前結束: {target_url} (讀取 {parser.lines} 行, {len(text) // 1024} KB)")
+    except http_client.HTTP_ERRORS as e:
+        print(f"Fetch error for {target_url}: {e}")
+        return "", False
+    if status == 429:
+        return "", True
+    if status >= 400:
+        print(f"Fetch error for {target_url}: HTTP {status}")
+        return "", False
+    return text, False
+
+def _read_jina_stream(response, target_url, parser, cancel=None):
+    response.encoding = response.encoding or "utf-8"
+    chunks = []
+    for chunk in response.iter_content(chunk_size=JINA_STREAM_CHUNK, decode_unicode=True):
+        if cancel is not None and cancel.is_set():
+            _debug_log(f"Jina 請求已取消，關閉連線: {target_url}")
             return ""
-            
+        chunks.append(chunk)
+        if parser is not None and parser.feed(chunk):
+            _debug_log(f"Jina 串流提前結束: {target_url} (讀取 {parser.lines} 行, {sum(map(len, chunks)) // 1024} KB)")
+            break
+    return "".join(chunks)
+
+def _on_jina_429(attempt):
+    print(f"⚠️ Jina 發生 429 頻率限制 (嘗試 {attempt+1}/3). 暫停 1 秒後重試...")
+    _jina_limiter.drain()
+
+def _fetch_jina_markdown_uncached(target_url, priority=None, parser=None, cancel=None):
+    if priority is None:
+        priority = _jina_priority_var.get()
+    if not _jina_dispatcher.acquire(priority, on_wait=_on_jina_rate_wait, cancel=cancel):
+        _debug_log(f"Jina 請求在排隊時取消: {target_url}")
+        return ""
+
+    print(f"Fetching: {target_url}...")
+    for attempt in range(3):
+        if cancel is not None and cancel.is_set():
+            return ""
+        text, retry = _jina_get_once(target_url, parser, cancel)
+        if not retry:
+            return text
+        _on_jina_429(attempt)
+        time.sleep(1)
     return ""
 
+def _jina_cache_lookup(target_url):
+    if not _jina_cache:
+        return None
+    try:
+        cached, state = _jina_cache.get(target_url)
+    except sqlite3.Error as e:
+        _debug_log(f"Jina 快取讀取失敗 (忽略): {e}")
+        return None
+    if state == "fresh":
+        _debug_log(f"Jina 快取命中: {target_url}")
+        return cached
+    if state == "stale":
+        _debug_log(f"Jina 快取過期，先回傳舊內容並於背景更新: {target_url}")
+        _revalidate_jina_in_background(target_url)
+        return cached
+    return None
+
+def _jina_partial_lookup(target_url):
+    """串流提前結束時存下的頁面前段 (只接受未過期的內容，過期時由呼叫端重新串流)。"""
+    if not _jina_cache:
+        return None
+    try:
+        cached, state = _jina_cache.get(target_url + JINA_PARTIAL_MARKER)
+    except sqlite3.Error as e:
+        _debug_log(f"Jina 快取讀取失敗 (忽略): {e}")
+        return None
+    if state == "fresh":
+        _debug_log(f"Jina 快取命中 (串流片段): {target_url}")
+        return cached
+    return None
+
+def _jina_cache_lookup_for(target_url, parser):
+    """完整頁面優先；帶 parser 時另外接受串流片段。命中時把內容餵給 parser。"""
+    cached = _jina_cache_lookup(target_url)
+    if cached is None and parser is not None:
+        cached = _jina_partial_lookup(target_url)
+    if cached is not None and parser is not None:
+        parser.feed(cached)
+    return cached
+
+def _jina_cache_store(target_url, md, parser=None):
+    if not (md and _jina_cache):
+        return
+    if parser is not None and parser.done:
+        target_url += JINA_PARTIAL_MARKER
+    try:
+        _jina_cache.put(target_url, md)
+    except sqlite3.Error as e:
+        _debug_log(f"Jina 快取寫入失敗 (忽略): {e}")
+
+def fetch_jina_markdown(target_url, use_cache=True, parser=None, cancel=None):
+    """
+    parser (PcMarkdownParser) 可選：下載時邊讀邊解析並在 parser.done 後提前結束；
+    快取命中時則把快取內容整份餵給 parser，呼叫端一律以 parser.close() 取結果。
+    提前結束時讀到的前段以 JINA_PARTIAL_MARKER 另外快取，不會被當成完整頁面。
+    cancel (threading.Event) 可選：被設定後不再排隊取 token、關閉進行中的連線，回傳空字串 (不寫入快取)。
+    """
+    if parser is not None and not JINA_STREAM:
+        md = fetch_jina_markdown(target_url, use_cache, cancel=cancel)
+        parser.feed(md or "")
+        return md
+    if use_cache:
+        cached = _jina_cache_lookup_for(target_url, parser)
+        if cached is not None:
+            return cached
+
+    md = _fetch_jina_markdown_uncached(target_url, parser=parser, cancel=cancel)
+    if use_cache:
+        _jina_cache_store(target_url, md, parser)
+    return md
+
+async def fetch_jina_markdown_async(target_url, use_cache=True, parser=None):
+    """
+    asyncio 版 fetch_jina_markdown：等待限流額度時使用 asyncio.sleep，HTTP 請求走
+    共用的 AsyncHttpClient，全程不佔用 executor 執行緒，且可被呼叫端 cancel。
+    parser 的用法同 fetch_jina_markdown。
+    """
+    if parser is not None and not JINA_STREAM:
+        md = await fetch_jina_markdown_async(target_url, use_cache)
+        parser.feed(md or "")
+        return md
+    if use_cache:
+        cached = _jina_cache_lookup_for(target_url, parser)
+        if cached is not None:
+            return cached
+
+    await _jina_dispatcher.acquire_async(_jina_priority_var.get(), on_wait=_on_jina_rate_wait)
+
+    print(f"Fetching: {target_url}...")
+    md = ""
+    for attempt in range(3):
+        text, retry = await _jina_get_once_async(target_url, parser)
+        if not retry:
+            md = text
+            break
+        _on_jina_429(attempt)
+        await asyncio.sleep(1)
+
+    if use_cache:
+        _jina_cache_store(target_url, md, parser)
+    return md
+
 # v1.1 變更註解:
 # 1) SNKRDUNK 搜尋從 Jina HTML 解析改為原生 API (/en/v1/search)。
 # 2) 成交歷史從 sales-histories 頁面解析改為原生 API (/en/v1/streetwears/{id}/trading-histories)。
 # 3) 新增 session warmup + retry，降低 terminal 直接呼叫 API 時的 403 機率。
 # 4) 維持既有搜尋決策流程: 先候選搜尋 -> 編號/Variant/語言過濾 -> 再抓價格。
 # 5) SNKRDUNK API 價格來源為 USD 時，先轉回 JPY，維持舊報表顯示格式。
-def _create_snkr_api_session():
+SNKR_HOME_URL = "https://snkrdunk.com/"
+
+def _create_snkr_api_session(warm=True):
     session = requests.Session()
     session.headers.update({
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
@@ -186,23 +549,225 @@ def _create_snkr_api_session():
         "Origin": "https://snkrdunk.com",
         "Accept-Language": "ja,en-US;q=0.9,en;q=0.8",
     })
-    # Warm up cookies to reduce 403 on direct API endpoints.
-    try:
-        session.get("https://snkrdunk.com/", timeout=20)
-    except Exception as e:
-        _debug_log(f"SNKRDUNK API warmup failed (will continue): {e}")
+    if warm:
+        # Warm up cookies to reduce 403 on direct API endpoints.
+        try:
+            session.get(SNKR_HOME_URL, timeout=20)
+        except Exception as e:
+            _debug_log(f"SNKRDUNK API warmup failed (will continue): {e}")
     return session
 
-def _snkr_api_get_json(session, url, retries=3):
+class _PooledSnkrSession:
+    __slots__ = ("session", "warmed_at", "healthy", "failures", "in_use")
+
+    def __init__(self, session, warmed_at):
+        self.session = session
+        self.warmed_at = warmed_at
+        self.healthy = True
+        self.failures = 0
+        self.in_use = False
+
+class SnkrSessionPool:
+    """
+    行程共用的 SNKRDUNK API session pool。
+
+    - session 建立時優先載入磁碟上的 cookies (跨次執行重用)，只有 cookies 不存在或過期才打首頁 warmup。
+    - 每次借出獨佔一個 session；回報 403 的 session 標記為 unhealthy，交給背景執行緒重新 warmup，
+      下一次重試會借到其他健康的 session。
+    - 背景執行緒定期重新 warmup 超過 max_age 的閒置 session，並把最新 cookies 寫回磁碟。
+    """
+
+    def __init__(self, cookie_path, size=3, max_age=1800, maintenance_interval=60):
+        self.cookie_path = cookie_path
+        self.size = max(1, int(size))
+        self.max_age = float(max_age)
+        self.maintenance_interval = float(maintenance_interval)
+        self._cond = threading.Condition()
+        self._entries = []
+        self._creating = 0
+        self._maintainer = None
+
+    # ── cookies 持久化 ──
+    def _load_cookies(self, session):
+        try:
+            with open(self.cookie_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        saved_at = float(data.get("saved_at", 0))
+        if time.time() - saved_at > self.max_age:
+            return None
+        for c in data.get("cookies", []):
+            session.cookies.set(
+                c["name"], c["value"],
+                domain=c.get("domain", ""), path=c.get("path", "/"),
+                expires=c.get("expires"), secure=bool(c.get("secure")),
+            )
+        return saved_at if data.get("cookies") else None
+
+    def _save_cookies(self, session):
+        cookies = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+             "expires": c.expires, "secure": c.secure}
+            for c in session.cookies
+        ]
+        if not cookies:
+            return
+        tmp_path = f"{self.cookie_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"saved_at": time.time(), "cookies": cookies}, f)
+            os.replace(tmp_path, self.cookie_path)
+        except OSError as e:
+            _debug_log(f"SNKRDUNK cookies 儲存失敗 (忽略): {e}")
+
+    def _warm(self, entry):
+        try:
+            entry.session.get(SNKR_HOME_URL, timeout=20)
+            entry.healthy = True
+            entry.failures = 0
+            entry.warmed_at = time.time()
+            self._save_cookies(entry.session)
+        except Exception as e:
+            entry.failures += 1
+            _debug_log(f"SNKRDUNK session warmup failed (will continue): {e}")
+
+    def _new_entry(self):
+        session = _create_snkr_api_session(warm=False)
+        saved_at = self._load_cookies(session)
+        entry = _PooledSnkrSession(session, saved_at or 0.0)
+        if saved_at is None:
+            self._warm(entry)
+        return entry
+
+    # ── 借出 / 歸還 ──
+    @contextlib.contextmanager
+    def checkout(self):
+        entry = None
+        create = False
+        with self._cond:
+            self._ensure_maintainer()
+            while entry is None:
+                idle = [e for e in self._entries if not e.in_use]
+                healthy_idle = [e for e in idle if e.healthy]
+                if healthy_idle:
+                    entry = max(healthy_idle, key=lambda e: e.warmed_at)
+                elif len(self._entries) + self._creating < self.size:
+                    create = True
+                    self._creating += 1
+                    break
+                elif idle:
+                    entry = idle[0]
+                else:
+                    self._cond.wait()
+            if entry is not None:
+                entry.in_use = True
+
+        if create:
+            try:
+                entry = self._new_entry()
+                entry.in_use = True
+            finally:
+                with self._cond:
+                    self._creating -= 1
+                    if entry is not None:
+                        self._entries.append(entry)
+                    self._cond.notify()
+        elif not entry.healthy:
+            # 沒有健康的 session 可用，只好同步重新 warmup。
+            self._warm(entry)
+
+        try:
+            yield entry.session
+        finally:
+            with self._cond:
+                entry.in_use = False
+                self._cond.notify()
+
+    def _find(self, session):
+        with self._cond:
+            for e in self._entries:
+                if e.session is session:
+                    return e
+        return None
+
+    def report_forbidden(self, session):
+        entry = self._find(session)
+        if entry:
+            entry.healthy = False
+            entry.failures += 1
+            with self._cond:
+                self._cond.notify_all()
+
+    def report_ok(self, session):
+        entry = self._find(session)
+        if entry:
+            entry.failures = 0
+
+    # ── 背景維護 ──
+    def _ensure_maintainer(self):
+        if self._maintainer is None or not self._maintainer.is_alive():
+            self._maintainer = threading.Thread(target=self._maintain_loop, name="snkr-session-pool", daemon=True)
+            self._maintainer.start()
+
+    def _maintain_loop(self):
+        while True:
+            time.sleep(self.maintenance_interval)
+            now = time.time()
+            with self._cond:
+                due = [e for e in self._entries
+                       if not e.in_use and (not e.healthy or now - e.warmed_at > self.max_age)]
+                for e in due:
+                    e.in_use = True
+            for e in due:
+                self._warm(e)
+                with self._cond:
+                    e.in_use = False
+                    self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": len(self._entries),
+                "in_use": sum(1 for e in self._entries if e.in_use),
+                "unhealthy": sum(1 for e in self._entries if not e.healthy),
+            }
+
+_snkr_session_pool = SnkrSessionPool(
+    _cache_path("snkr_cookies.json"),
+    size=int(os.getenv("OPENCLAW_SNKR_POOL_SIZE", 3)),
+    max_age=float(os.getenv("OPENCLAW_SNKR_SESSION_MAX_AGE", 1800)),
+)
+
+# SNKRDUNK 同時進行中的 API 請求上限 (per-host，所有呼叫端共用)；查詢 fan-out 也以此為上限
+SNKR_MAX_CONCURRENCY = max(1, int(os.getenv("OPENCLAW_SNKR_MAX_CONCURRENCY", 3)))
+SNKR_FANOUT = os.getenv("OPENCLAW_SNKR_FANOUT", "1").strip().lower() not in ("0", "false", "off")
+_snkr_host_semaphore = threading.BoundedSemaphore(SNKR_MAX_CONCURRENCY)
+
+def _snkr_api_get_json(url, session=None, retries=3):
+    """SNKRDUNK API GET。未指定 session 時從 _snkr_session_pool 借用，403 時換另一個 session 重試。"""
     last_error = None
     for attempt in range(retries):
         try:
-            resp = session.get(url, timeout=20)
-            if resp.status_code == 403:
-                # Re-warm homepage cookies and retry.
-                session.get("https://snkrdunk.com/", timeout=20)
-                time.sleep(0.5 * (attempt + 1))
-                continue
+            if session is not None:
+                with _snkr_host_semaphore:
+                    resp = session.get(url, timeout=20)
+                if resp.status_code == 403:
+                    # Re-warm homepage cookies and retry.
+                    session.get(SNKR_HOME_URL, timeout=20)
+                    time.sleep(0.5 * (attempt + 1))
+                    continue
+            else:
+                with _snkr_host_semaphore, _snkr_session_pool.checkout() as pooled:
+                    resp = pooled.get(url, timeout=20)
+                    if resp.status_code == 403:
+                        _snkr_session_pool.report_forbidden(pooled)
+                    else:
+                        _snkr_session_pool.report_ok(pooled)
+                if resp.status_code == 403:
+                    last_error = "HTTP 403"
+                    time.sleep(0.5 * (attempt + 1))
+                    continue
             resp.raise_for_status()
             return resp.json()
         except Exception as e:
@@ -211,27 +776,34 @@ def _snkr_api_get_json(session, url, retries=3):
     _debug_log(f"SNKRDUNK API request failed after retries: {url} | err={last_error}")
     return {}
 
-def _snkr_history_to_jpy(history, jpy_rate):
+def _snkr_history_price(history):
+    """成交的原始價格與幣別 -> (price, "JPY" / "USD")；價格無效時為 (0, "")。"""
     price = history.get("price", 0)
     price_fmt = str(history.get("priceFormat", ""))
     try:
         p = float(price)
     except Exception:
-        return 0
+        return 0, ""
 
     if p <= 0:
-        return 0
+        return 0, ""
 
     fmt_upper = price_fmt.upper()
     if "¥" in price_fmt or "JPY" in fmt_upper:
-        return int(round(p))
+        return p, "JPY"
     if "$" in price_fmt or "USD" in fmt_upper:
-        return int(round(p * jpy_rate))
+        return p, "USD"
 
     # Fallback heuristic when currency symbol is missing.
     if p >= 1000:
-        return int(round(p))
-    return int(round(p * jpy_rate))
+        return p, "JPY"
+    return p, "USD"
+
+def _snkr_history_to_jpy(history, jpy_rate):
+    p, currency = _snkr_history_price(history)
+    if not currency:
+        return 0
+    return int(round(p if currency == "JPY" else p * jpy_rate))
 
 def _snkr_traded_date(traded_at):
     if not traded_at:
@@ -240,21 +812,246 @@ def _snkr_traded_date(traded_at):
         traded_at = traded_at.split("T", 1)[0]
     return traded_at.replace("-", "/")
 
-def get_exchange_rate():
+def _snkr_histories_to_records(histories, jpy_rate):
+    records = []
+    for h in histories:
+        date_found = _snkr_traded_date(h.get("tradedAt", ""))
+        grade_found = str(h.get("condition", "")).strip() or "Unknown"
+        price_jpy = _snkr_history_to_jpy(h, jpy_rate)
+        if date_found and price_jpy > 0:
+            # 不過濾等級，直接收集所有成交紀錄（含實際等級）
+            # generate_report 的顯示邏輯會按需選取正確等級
+            # 航海王 BGS 卡需要同時看到 A/PSA10/BGS 等紀錄
+            records.append(PriceRecord(date_found, price_jpy, grade_found))
+    return records
+
+def _snkr_history_trades(histories):
+    """原始成交 -> PriceStore.ingest_trades 的格式 (絕對成交時間 tradedAt + 原幣別價格)。"""
+    trades = []
+    for h in histories:
+        traded_at = str(h.get("tradedAt", "") or "")
+        price, currency = _snkr_history_price(h)
+        if traded_at and currency:
+            trades.append({"traded_at": traded_at, "grade": str(h.get("condition", "")).strip() or "Unknown",
+                           "price": price, "currency": currency, "date": _snkr_traded_date(traded_at)})
+    return trades
+
+def _snkr_product_records(product_id, product_url, jpy_rate):
+    """
+    商品的成交紀錄 (日圓)；原始成交同時寫入價格資料庫 (原幣別，不受匯率影響)。
+    有成交歷史庫時只寫入它尚未匯出的新成交；價格資料庫還沒有這個商品 (例如換了商品 URL) 時寫入全部。
+    """
+    histories = _fetch_snkr_histories(product_id)
+    if _price_store and product_url:
+        def _ingest(new_histories):
+            added = _price_store.ingest_trades("snkr", product_url, _snkr_history_trades(new_histories))
+            _debug_log(f"價格資料庫 [snkr]: 新增 {added} 筆")
+
+        try:
+            if _snkr_history_store:
+                _snkr_history_store.export_new(product_id, _ingest,
+                                               everything=not _price_store.has_product("snkr", product_url))
+            else:
+                _ingest(histories)
+        except sqlite3.Error as e:
+            _debug_log(f"價格資料庫寫入失敗 (忽略): {e}")
+    return _snkr_histories_to_records(histories, jpy_rate)
+
+def _init_snkr_history_store():
     try:
-        resp = requests.get("https://open.er-api.com/v6/latest/USD")
-        data = resp.json()
-        return data['rates']['JPY']
-    except:
-        return 150.0
+        return SnkrHistoryStore(_cache_path("snkr_history.sqlite3"))
+    except Exception as e:
+        _original_print(f"⚠️ SNKRDUNK 成交歷史庫初始化失敗，改為每次重抓: {e}")
+        return None
+
+_snkr_history_store = _init_snkr_history_store()
+SNKR_BACKFILL_PAGES = int(os.getenv("OPENCLAW_SNKR_BACKFILL_PAGES", 0))
+_snkr_backfilling = set()
+_snkr_backfilling_lock = threading.Lock()
+
+def _backfill_snkr_in_background(product_id):
+    with _snkr_backfilling_lock:
+        if product_id in _snkr_backfilling:
+            return
+        _snkr_backfilling.add(product_id)
+
+    def _worker():
+        try:
+            added = backfill_trading_histories(
+                _snkr_history_store, product_id, _snkr_api_get_json, max_pages=SNKR_BACKFILL_PAGES
+            )
+            _debug_log(f"SNKRDUNK 背景回補 [{product_id}]: 新增 {added} 筆")
+        except Exception as e:
+            _debug_log(f"SNKRDUNK 背景回補失敗 [{product_id}]: {e}")
+        finally:
+            with _snkr_backfilling_lock:
+                _snkr_backfilling.discard(product_id)
+
+    threading.Thread(target=_worker, name="snkr-backfill", daemon=True).start()
 
-def _fetch_pc_prices_from_url(product_url, md_content=None, skip_hi_res=False, target_grade="PSA 10"):
+# 同時有多位使用者查同一張卡時，相同的查詢 / 商品頁只實際抓一次，其餘呼叫端共用結果
+_card_flights = SingleFlight("card")
+_url_flights = SingleFlight("product_url")
+
+def _flight_norm(value):
+    return re.sub(r'\s+', ' ', str(value or '')).strip().lower()
+
+def _card_flight_key(source, name, number, set_code, grade, *variant):
+    """正規化的 (name, number, set_code, grade, variant...) 查詢 key。"""
+    return (source, _flight_norm(name), _flight_norm(number), _flight_norm(set_code), _flight_norm(grade)) + variant
+
+def get_singleflight_stats():
+    return {"card": _card_flights.stats(), "product_url": _url_flights.stats()}
+
+def _init_product_index():
+    if os.getenv("OPENCLAW_RESOLVED_INDEX", "1").strip().lower() in ("0", "false", "off"):
+        return None
+    try:
+        return ResolvedProductIndex(
+            _cache_path("resolved_products.sqlite3"),
+            max_age=float(os.getenv("OPENCLAW_RESOLVED_MAX_AGE", 30 * 86400)),
+        )
+    except Exception as e:
+        _original_print(f"⚠️ 商品對應索引初始化失敗，每次都重新搜尋: {e}")
+        return None
+
+# 卡片識別 → 已選定商品 (PC product URL / SNKRDUNK product id)，跳過搜尋頁與候選評分
+_product_index = _init_product_index()
+
+def _resolved_lookup(source, card_key):
+    if not _product_index:
+        return None
+    try:
+        return _product_index.get(source, card_key)
+    except sqlite3.Error as e:
+        _debug_log(f"商品對應索引讀取失敗: {e}")
+        return None
+
+def _resolved_store(source, card_key, product_url, **fields):
+    if not _product_index:
+        return
+    try:
+        _product_index.put(source, card_key, product_url, **fields)
+    except sqlite3.Error as e:
+        _debug_log(f"商品對應索引寫入失敗: {e}")
+
+def _init_card_catalog():
+    if os.getenv("OPENCLAW_CARD_CATALOG", "1").strip().lower() in ("0", "false", "off"):
+        return None
+    try:
+        return CardCatalog(_cache_path("card_catalog.sqlite3"))
+    except Exception as e:
+        _original_print(f"⚠️ 本機卡片目錄初始化失敗，改為只用網路搜尋: {e}")
+        return None
+
+# 本機卡片目錄 (FTS5 trigram)：搜尋結果與選定商品都會寫入，命中且不含糊時跳過網路搜尋
+_card_catalog = _init_card_catalog()
+
+def _catalog_resolve(source, number, names, **kwargs):
+    if not _card_catalog:
+        return None
+    try:
+        return _card_catalog.resolve(source, number, [n for n in names if n], **kwargs)
+    except sqlite3.Error as e:
+        _debug_log(f"本機卡片目錄查詢失敗: {e}")
+        return None
+
+def _catalog_record(entries):
+    if not _card_catalog:
+        return
+    try:
+        _card_catalog.upsert_many(entries)
+    except sqlite3.Error as e:
+        _debug_log(f"本機卡片目錄寫入失敗: {e}")
+
+def _init_price_store():
+    if os.getenv("OPENCLAW_PRICE_STORE", "1").strip().lower() in ("0", "false", "off"):
+        return None
+    try:
+        return PriceStore(_cache_path("price_store.sqlite3"))
+    except Exception as e:
+        _original_print(f"⚠️ 價格資料庫初始化失敗，報告只使用本次抓取的紀錄: {e}")
+        return None
+
+# 本機價格時間序列：每次抓取只寫入新成交，報告讀取累積的完整歷史
+_price_store = _init_price_store()
+
+def _price_store_sync(source, product_url, records, currency="USD", jpy_rate=None, ingest=True):
+    """
+    寫入本次抓取的新成交，回傳 store 內該商品的全部成交 (由新到舊，價格換算成 currency)，
+    再加上本次的摘要價 (note) 與不寫入 store 的相對日期紀錄。store 不可用或沒有商品 URL 時回傳本次的紀錄。
+    ingest=False 時只讀取 (SNKRDUNK 的原始成交已由 _snkr_product_records 寫入)。
+    一律回傳 PriceRecord (呼叫端傳入 dict 時在這裡轉換)。
+    """
+    records = to_records(records)
+    if not _price_store or not product_url:
+        return records
+    try:
+        added = _price_store.ingest(source, product_url, records, currency=currency) if ingest else 0
+        stored = _price_store.records(source, product_url, currency=currency, jpy_rate=jpy_rate)
+    except (sqlite3.Error, ValueError) as e:
+        _debug_log(f"價格資料庫錯誤，使用本次抓取的紀錄: {e}")
+        return records
+    _debug_log(f"價格資料庫 [{source}]: 新增 {added} 筆，累積 {len(stored)} 筆")
+    if not stored:
+        return records
+    return stored + [r for r in (records or []) if r.get("note") or is_relative_date(r.date)]
+
+def invalidate_resolved_product(source=None, card_key=None, product_url=None):
+    """移除選錯 / 已失效的商品對應 (例如使用者回報價格對不上)。Returns rows removed."""
+    if not _product_index:
+        return 0
+    return _product_index.invalidate(source=source, card_key=card_key, product_url=product_url)
+
+def _fetch_snkr_histories(product_id):
+    """同一商品的成交歷史同步在行程內只會同時進行一次。"""
+    return _url_flights.do(("snkr", str(product_id)), _sync_snkr_histories, product_id)
+
+def _sync_snkr_histories(product_id):
+    """
+    取得商品的成交歷史。有本機歷史庫時做增量同步 (只抓比已儲存 tradedAt 更新的頁面)，
+    回傳累積的全部歷史；否則退回單頁請求。
+    """
+    if _snkr_history_store:
+        try:
+            histories = sync_trading_histories(_snkr_history_store, product_id, _snkr_api_get_json)
+            if SNKR_BACKFILL_PAGES > 0:
+                _backfill_snkr_in_background(product_id)
+            return histories
+        except sqlite3.Error as e:
+            _debug_log(f"SNKRDUNK 成交歷史庫錯誤，改為單頁請求: {e}")
+    hist_url = SNKR_HISTORY_URL.format(product_id=product_id, per_page=100, page=1)
+    hist_data = _snkr_api_get_json(hist_url)
+    return hist_data.get("histories", []) if isinstance(hist_data, dict) else []
+
+_exchange_rate_service = ExchangeRateService(
+    _cache_path("exchange_rate.json"),
+    ttl=float(os.getenv("OPENCLAW_FX_TTL", 6 * 3600)),
+    log=_debug_log,
+)
+
+def get_exchange_rate():
+    """取得一次匯率快照；每個請求應在開頭呼叫一次並沿路傳遞，讓所有數字一致。"""
+    return _exchange_rate_service.get()
+
+def _fetch_pc_prices_shared(product_url, md_content=None, skip_hi_res=False, target_grade="PSA 10", parser=None):
+    """_fetch_pc_prices_from_url with concurrent calls for the same URL/grade coalesced."""
+    key = ("pc", product_url.split('?')[0].rstrip('/'), _flight_norm(target_grade), bool(skip_hi_res))
+    return _url_flights.do(key, _fetch_pc_prices_from_url, product_url, md_content, skip_hi_res, target_grade, parser)
+
+def _fetch_pc_prices_from_url(product_url, md_content=None, skip_hi_res=False, target_grade="PSA 10", parser=None):
     """
     Given a PriceCharting product URL, fetch (if md_content is None) and parse it.
+    parser: 已經餵過 md_content 的 PcMarkdownParser (例如 fetch_jina_markdown_async 串流時用的)，
+    直接取它的結果，不再重新解析。
     Returns (records, resolved_url, pc_img_url).
     """
+    if parser is None:
+        parser = PcMarkdownParser(tail_lines=PC_STREAM_TAIL_LINES)
+        if md_content:
+            parser.feed(md_content)
     if not md_content:
-        md_content = fetch_jina_markdown(product_url)
+        md_content = fetch_jina_markdown(product_url, parser=parser)
     
     if not md_content:
         print(f"DEBUG: Failed to get markdown for {product_url}")
@@ -262,122 +1059,14 @@ def _fetch_pc_prices_from_url(product_url, md_content=None, skip_hi_res=False, t
 
     print(f"DEBUG: Parsing PriceCharting page: {product_url} (length: {len(md_content)})")
 
-    lines = md_content.split('\n')
-    records = []
-    
-    # Parser 1: 嘗試原本的 Markdown Table 格式 (每行有 | 分隔)
-    date_regex_md = r'\|\s*(\d{4}-\d{2}-\d{2}|[A-Z][a-z]{2}\s\d{1,2},\s\d{4})\s*\|'
-    for line in lines:
-        if re.search(date_regex_md, line):
-            parts = [p.strip() for p in line.split('|')]
-            if len(parts) >= 5:
-                date_str = parts[1]
-                all_prices = re.findall(r'\$([\d,]+\.\d{2})', line)
-                if not all_prices: continue
-                real_prices = [p for p in all_prices if p not in ('6.00',)]
-                if not real_prices: continue
-                
-                price_usd = float(real_prices[-1].replace(',', ''))
-                title_clean = line.replace(" ", "").lower()
-                
-                detected_grade = None
-                if re.search(r'(psa|cgc|bgs|grade|gem)10', title_clean) or ("psa" in title_clean and "10" in title_clean):
-                    detected_grade = "PSA 10"
-                elif re.search(r'bgs\s*9\.5', title_clean):
-                    detected_grade = "BGS 9.5"
-                elif re.search(r'(psa|cgc|bgs|grade|gem)9', title_clean) or ("psa" in title_clean and "9" in title_clean):
-                    detected_grade = "PSA 9"
-                elif re.search(r'(psa|cgc|bgs|grade|gem)8', title_clean) or ("psa" in title_clean and "8" in title_clean):
-                    detected_grade = "PSA 8"
-                elif not re.search(r'(psa|bgs|cgc|grade|gem)', title_clean):
-                    detected_grade = "Ungraded"
-                        
-                if detected_grade:
-                    records.append({
-                        "date": date_str,
-                        "price": price_usd,
-                        "grade": detected_grade
-                    })
-
-    # Parser 2: 嘗試 Jina 新版的 TSV 格式 (日期獨立一行，標題與價格在下一行)
-    if not records: 
-        current_date = None
-        date_regex_tsv = r'^(\d{4}-\d{2}-\d.2}|[A-Z][a-z]{2}\s\d{1,2},\s\d{4})'
-        for line in lines:
-            line = line.strip()
-            date_match = re.match(date_regex_tsv, line)
-            if date_match:
-                current_date = date_match.group(1)
-                continue
-            if current_date and "$" in line:
-                all_prices = re.findall(r'\$([\d,]+\.\d{2})', line)
-                if not all_prices: continue
-                real_prices = [p for p in all_prices if p not in ('6.00',)]
-                if not real_prices: continue
-                price_usd = float(real_prices[-1].replace(',', ''))
-                title_clean = line.replace(" ", "").lower()
-                detected_grade = None
-                if re.search(r'(psa|cgc|bgs|grade|gem)10', title_clean) or ("psa" in title_clean and "10" in title_clean):
-                    detected_grade = "PSA 10"
-                elif re.search(r'bgs\s*9\.5', title_clean):
-                    detected_grade = "BGS 9.5"
-                elif re.search(r'(psa|cgc|bgs|grade|gem)9', title_clean) or ("psa" in title_clean and "9" in title_clean):
-                    detected_grade = "PSA 9"
-                elif not re.search(r'(psa|bgs|cgc|grade|gem)', title_clean):
-                    detected_grade = "Ungraded"
-                if detected_grade:
-                    records.append({
-                        "date": current_date,
-                        "price": price_usd,
-                        "grade": detected_grade
-                    })
-
-    # Summary: if no per-item records, try summary table
-    today_str = datetime.now().strftime('%Y-%m-%d')
-    grade_summary_map = {'Ungraded': 'Ungraded', 'PSA 10': 'PSA 10', 'PSA 9': 'PSA 9', 'BGS 9.5': 'BGS 9.5'}
-    existing_grades = set(r['grade'] for r in records)
-    for line in lines:
-        for grade_label, grade_key in grade_summary_map.items():
-            label_nospace = grade_label.replace(' ', '')
-            if re.match(rf'^{re.escape(label_nospace)}\$[\d,]+\.\d{{2}}$', line.replace(' ', '')):
-                if grade_key not in existing_grades:
-                    price_match = re.search(r'\$[\d,]+\.\d{2}', line)
-                    if price_match:
-                        price_usd = extract_price(price_match.group(0))
-                        records.append({"date": today_str, "price": price_usd, "grade": grade_key, "note": "PC avg price"})
-
-    records.sort(key=lambda x: x['date'], reverse=True)
-    
-    pc_img_url = None
-    img_patterns = [
-        r'!\[.*?\]\((https://storage\.googleapis\.com/images\.pricecharting\.com/[^/)]+/\d+\.jpg)\)',
-        r'!\[.*?\]\((https://product-images\.s3\.amazonaws\.com/[^\)]+)\)',
-        r'!\[.*?\]\((https://images\.pricecharting\.com/[^\)]+)\)',
-        r'!\[.*?\]\((https://[^)]+?pricecharting\.com/[^)]+?\.(?:jpg|png|webp)[^)]*)\)',
-        r'!\[.*?\]\((https://[^)]+?\.(?:jpg|png|webp)[^)]*)\)',
-    ]
-    for pat in img_patterns:
-        m = re.search(pat, md_content)
-        if m:
-            pc_img_url = m.group(1)
-            if not skip_hi_res:
-                hiRes_url = re.sub(r'/([\d]+)\.jpg$', '/1600.jpg', pc_img_url)
-                if hiRes_url != pc_img_url:
-                    try:
-                        if requests.head(hiRes_url, timeout=5).status_code == 200:
-                            pc_img_url = hiRes_url
-                    except: pass
-            break
+    # 單次掃描解析 (table / TSV 成交、摘要價、卡圖)，見 pc_parser.py
+    records, pc_img_url = parser.close()
+    if not skip_hi_res:
+        pc_img_url = _pc_hi_res_image(pc_img_url)
 
     _debug_log(f"PriceCharting: 成功提取 {len(records)} 筆價格紀錄 (包含全等級)")
     
-    snkr_target = target_grade.replace(" ", "")
-    matched_records = []
-    for r in records:
-        r_grade = r.get('grade', '')
-        if r_grade == target_grade: matched_records.append(r)
-        elif target_grade == "Unknown" and r_grade in ("Ungraded", "裸卡", "A"): matched_records.append(r)
-        elif r_grade == snkr_target: matched_records.append(r)
+    matched_records = RecordSet(records).slice(target_grade, "pc")
         
     _debug_log(f"PriceCharting: 其中符合 '{target_grade}' 的紀錄有 {len(matched_records)} 筆")
     for r in matched_records[:5]:
@@ -387,6 +1076,18 @@ def _fetch_pc_prices_from_url(product_url, md_content=None, skip_hi_res=False, t
 
     return records, product_url, pc_img_url
 
+def _pc_hi_res_image(img_url):
+    """PriceCharting 卡圖 (.../240.jpg) 換成 1600px 版本 (存在時)。"""
+    if not img_url:
+        return img_url
+    hiRes_url = re.sub(r'/([\d]+)\.jpg$', '/1600.jpg', img_url)
+    if hiRes_url != img_url:
+        try:
+            if http_client.request("HEAD", hiRes_url, retry=http_client.NO_RETRY, timeout=5).status_code == 200:
+                return hiRes_url
+        except: pass
+    return img_url
+
 def extract_price(price_str):
     cleaned = re.sub(r'[^\d.]', '', price_str)
     try:
@@ -518,7 +1219,143 @@ def filter_pricecharting_candidates(candidates):
         filtered.append(c)
     return filtered
 
-def search_pricecharting(name, number, set_code, target_grade, is_alt_art, category="Pokemon", is_flagship=False, return_candidates=False, set_name="", jp_name=""):
+# Jina 額度充足時，PriceCharting 前 N 個查詢同時送出 (speculative)；
+# 可用 token 至少要有 N + reserve 個，保留額度給其他即時查詢，否則維持逐一查詢。
+# 第一個查詢通常就會被採用，所以只有同類型卡片 (見 _pc_query_shape) 近期第一個查詢落空的比例
+# 達到 OPENCLAW_PC_SPECULATIVE_MISS_RATE 時才 speculative，否則多送的查詢只是浪費額度。
+PC_SPECULATIVE_QUERIES = max(1, int(os.getenv("OPENCLAW_PC_SPECULATIVE", 3)))
+PC_SPECULATIVE_RESERVE = max(0, int(os.getenv("OPENCLAW_PC_SPECULATIVE_RESERVE", 4)))
+PC_SPECULATIVE_MISS_RATE = float(os.getenv("OPENCLAW_PC_SPECULATIVE_MISS_RATE", 0.5))
+PC_SPECULATIVE_MIN_SAMPLES = 5
+_pc_first_query_misses = {}
+_pc_first_query_lock = threading.Lock()
+
+def _pc_query_shape(category, set_code, set_name):
+    """查詢方案的組成 (類別、有無 set code / 系列名稱)；同一 shape 的卡片第一個查詢的命中率相近。"""
+    return _flight_norm(category), bool(set_code), bool(set_name)
+
+def _pc_record_first_query(shape, missed):
+    with _pc_first_query_lock:
+        _pc_first_query_misses.setdefault(shape, collections.deque(maxlen=50)).append(bool(missed))
+
+def _pc_first_query_miss_rate(shape):
+    """近期第一個查詢落空的比例；樣本不足時 None。"""
+    with _pc_first_query_lock:
+        history = list(_pc_first_query_misses.get(shape, ()))
+    if len(history) < PC_SPECULATIVE_MIN_SAMPLES:
+        return None
+    return sum(history) / len(history)
+
+def _pc_speculative_width(n_queries, shape=None):
+    """依第一個查詢的歷史命中率與目前 Jina 預算決定要同時送出幾個查詢 (1 = 逐一查詢)。"""
+    width = min(n_queries, PC_SPECULATIVE_QUERIES)
+    if width <= 1:
+        return 1
+    miss_rate = _pc_first_query_miss_rate(shape)
+    if miss_rate is None or miss_rate < PC_SPECULATIVE_MISS_RATE:
+        return 1
+    try:
+        available = get_jina_budget()["available"]
+    except Exception:
+        return 1
+    return width if available >= width + PC_SPECULATIVE_RESERVE else 1
+
+# 快速模式：高信心候選直接採用搜尋頁上的各等級指南價，不再抓商品頁 (每張卡的 Jina 用量減半)。
+# 成交紀錄只使用價格資料庫中已累積的部分 (報告讀取時由 _price_store_sync 合併)。
+PC_FAST_MODE = os.getenv("OPENCLAW_PC_FAST_MODE", "0").strip().lower() in ("1", "true", "on")
+# 常駐服務可另外開啟背景補抓完整成交 (以 prefetch 優先等級寫入價格資料庫，供之後的報告使用)；
+# 這會把省下的 Jina 用量花回去，預設關閉，一次性的 CLI 執行一律不啟用 (行程結束時背景抓取會被中斷)
+PC_FAST_PREFETCH = os.getenv("OPENCLAW_PC_FAST_PREFETCH", "0").strip().lower() in ("1", "true", "on")
+# 高信心 = 第一名的編號與名稱皆完全符合，且分數領先第二名至少這麼多
+PC_FAST_MIN_MARGIN = int(os.getenv("OPENCLAW_PC_FAST_MARGIN", 50))
+_pc_prefetching = set()
+_pc_prefetching_lock = threading.Lock()
+
+def _prefetch_pc_product(product_url, target_grade):
+    """背景抓取商品頁的完整成交並寫入價格資料庫 (同一商品同時只跑一個)。"""
+    with _pc_prefetching_lock:
+        if product_url in _pc_prefetching:
+            return
+        _pc_prefetching.add(product_url)
+
+    def _worker():
+        try:
+            set_jina_priority(PRIORITY_PREFETCH)
+            records, _, _ = _fetch_pc_prices_shared(product_url, skip_hi_res=True, target_grade=target_grade)
+            _price_store_sync("pc", product_url, records)
+        except Exception as e:
+            _debug_log(f"PriceCharting 背景抓取失敗 (忽略): {e}")
+        finally:
+            with _pc_prefetching_lock:
+                _pc_prefetching.discard(product_url)
+
+    threading.Thread(target=_worker, name="pc-prefetch", daemon=True).start()
+
+def _pc_fast_result(md_content, product_url, scored_urls, target_grade):
+    """
+    快速模式：選中的商品是高信心候選，且搜尋頁上有目標等級的指南價時，
+    回傳 (records, product_url, img_url)；否則 None (改走一般的商品頁抓取)。
+    """
+    top_url, top_score, top_why = scored_urls[0]
+    if product_url != top_url:
+        return None
+    if not ({"number_exact", "number_padded"} & set(top_why) and {"name_exact", "name_alt_exact"} & set(top_why)):
+        return None
+    if len(scored_urls) > 1 and top_score - scored_urls[1][1] < PC_FAST_MIN_MARGIN:
+        return None
+    records, img_url = parse_pc_search_prices(md_content).get(product_url, ([], None))
+    if not RecordSet(records).slice(target_grade, "pc"):
+        return None
+    _debug_log(f"PriceCharting 快速模式: 使用搜尋頁指南價 {[(r.grade, r.price) for r in records]}")
+    if PC_FAST_PREFETCH:
+        _prefetch_pc_product(product_url, target_grade)
+    return records, product_url, _pc_hi_res_image(img_url)
+
+def _pc_query_results(queries, shape=None):
+    """
+    依優先順序產出 (step, query, search_url, md)。
+
+    shape 的第一個查詢近期常落空且預算充足時，前 N 個查詢並行抓取，仍依原順序交給
+    呼叫端判斷；呼叫端命中後關閉 generator，落選的查詢會被取消：還在排隊的不再取
+    Jina token，下載中的關閉連線 (不寫入快取)。其餘查詢 (或不 speculative 時的全部查詢) 逐一抓取。
+    """
+    def _fetch(step, query, cancel=None):
+        search_url = f"https://www.pricecharting.com/search-products?q={query}&type=prices"
+        _debug_log(f"PriceCharting Step {step}: 查詢={query!r}  URL={search_url}")
+        return search_url, fetch_jina_markdown(search_url, cancel=cancel)
+
+    width = _pc_speculative_width(len(queries), shape)
+    if width > 1:
+        _debug_log(f"PriceCharting: 第一個查詢近期常落空且 Jina 額度充足，前 {width} 個查詢同時送出")
+        cancelled = threading.Event()
+
+        def _guarded(step, query):
+            if cancelled.is_set():
+                return "", ""
+            return _fetch(step, query, cancelled)
+
+        futures = []
+        try:
+            fanout = executors.get("fanout")
+            for step, query in enumerate(queries[:width], start=1):
+                futures.append(fanout.submit(_guarded, step, query))
+            for step, (query, future) in enumerate(zip(queries, futures), start=1):
+                search_url, md = future.result()
+                yield step, query, search_url, md
+        finally:
+            cancelled.set()
+            for future in futures:
+                future.cancel()
+
+    done = width if width > 1 else 0
+    for step, query in enumerate(queries[done:], start=done + 1):
+        search_url, md = _fetch(step, query)
+        yield step, query, search_url, md
+
+def search_pricecharting(name, number, set_code, target_grade, is_alt_art, category="Pokemon", is_flagship=False, return_candidates=False, set_name="", jp_name="", card_language="", fast=None):
+    """fast: 快速模式 (見 PC_FAST_MODE)，None 時依環境變數 OPENCLAW_PC_FAST_MODE。"""
+    if fast is None:
+        fast = PC_FAST_MODE
     # Basic Name cleaning (strip parentheses like "Queen (Flagship Battle Top 8 Prize)")
     name_query = re.sub(r'\(.*?\)', '', name).strip()
     
@@ -543,6 +1380,31 @@ def search_pricecharting(name, number, set_code, target_grade, is_alt_art, categ
         if re.search(r'(SM-P|S-P|SV-P|SV-G|S8a-G)', potential_suffix, re.IGNORECASE):
             suffix = potential_suffix
     
+    pc_card_key = card_identity(name, number, set_code, is_alt_art, is_flagship, card_language, _flight_norm(category))
+    if not return_candidates:
+        resolved = _resolved_lookup("pc", pc_card_key)
+        if resolved:
+            _debug_step("PriceCharting", 1, "resolved-index", resolved["product_url"], "OK",
+                        selected_url=resolved["product_url"],
+                        reason=f"使用已解析商品，跳過搜尋 ({resolved['reason']}, score={resolved['score']})")
+            records, resolved_url, pc_img_url = _fetch_pc_prices_shared(resolved["product_url"], target_grade=target_grade)
+            if records:
+                return records, resolved_url, pc_img_url
+            _debug_log("PriceCharting: 已解析商品頁沒有價格紀錄，移除對應並重新搜尋")
+            invalidate_resolved_product("pc", pc_card_key)
+
+        # 異圖 / 旗艦賽版本需要完整的候選過濾，不走目錄
+        if not is_alt_art and not is_flagship:
+            hit = _catalog_resolve("pc", number, [name_query, jp_name], set_code=set_code or suffix,
+                                   denominator=number_denominator, category=category)
+            if hit:
+                _debug_step("PriceCharting", 1, "card-catalog", hit["product_url"], "OK",
+                            selected_url=hit["product_url"], reason="本機卡片目錄唯一命中，跳過搜尋")
+                records, resolved_url, pc_img_url = _fetch_pc_prices_shared(hit["product_url"], target_grade=target_grade)
+                if records:
+                    _resolved_store("pc", pc_card_key, hit["product_url"], reason="Card catalog (unique match)")
+                    return records, resolved_url, pc_img_url
+
     # Try with set code or suffix first
     queries_to_try = []
     final_set_code = set_code if set_code else suffix
@@ -562,22 +1424,22 @@ def search_pricecharting(name, number, set_code, target_grade, is_alt_art, categ
     search_url = ""
     pc_step = 0
 
-    for query in queries_to_try:
-        pc_step += 1
-        search_url = f"https://www.pricecharting.com/search-products?q={query}&type=prices"
-        _debug_log(f"PriceCharting Step {pc_step}: 查詢={query!r}  URL={search_url}")
-        md_content = fetch_jina_markdown(search_url)
-        if md_content and ("Search Results" in md_content or "Your search for" in md_content):
-            _debug_step("PriceCharting", pc_step, query, search_url,
-                        "OK", reason="搜尋頁面有多筆結果，繼續解析")
-            break
-        elif md_content and "PriceCharting" in md_content:
-            _debug_step("PriceCharting", pc_step, query, search_url,
-                        "OK", reason="直接落在商品頁面")
-            break
-        else:
-            _debug_step("PriceCharting", pc_step, query, search_url,
-                        "NO_RESULTS", reason="頁面為空或無法識別，嘗試下一個查詢")
+    query_shape = _pc_query_shape(category, final_set_code, set_name)
+    with contextlib.closing(_pc_query_results(queries_to_try, query_shape)) as query_results:
+        for pc_step, query, search_url, md_content in query_results:
+            if md_content and ("Search Results" in md_content or "Your search for" in md_content):
+                _debug_step("PriceCharting", pc_step, query, search_url,
+                            "OK", reason="搜尋頁面有多筆結果，繼續解析")
+                break
+            elif md_content and "PriceCharting" in md_content:
+                _debug_step("PriceCharting", pc_step, query, search_url,
+                            "OK", reason="直接落在商品頁面")
+                break
+            else:
+                _debug_step("PriceCharting", pc_step, query, search_url,
+                            "NO_RESULTS", reason="頁面為空或無法識別，嘗試下一個查詢")
+    if len(queries_to_try) > 1:
+        _pc_record_first_query(query_shape, pc_step > 1 or not md_content)
             
     if not md_content:
         _debug_step("PriceCharting", pc_step, "", "",
@@ -591,6 +1453,7 @@ def search_pricecharting(name, number, set_code, target_grade, is_alt_art, categ
         urls = list(dict.fromkeys(urls))
         
         _debug_log(f"PriceCharting: 從搜尋頁面提取到 {len(urls)} 個候選 URL")
+        _catalog_record(pc_product_entry(u) for u in urls)
         
         valid_urls = []
         # 「名稱 slug」用純角色名（去掉括號內的版本描述，如 Leader Parallel / SP Foil 等）
@@ -737,7 +1600,19 @@ def search_pricecharting(name, number, set_code, target_grade, is_alt_art, categ
                            "matching_number": matching_number,
                            "scored_top3": [(u, s) for u, s, _ in scored_urls[:3]]})
         print(f"DEBUG: Selected PC product URL: {product_url} ({selection_reason})")
-        records, resolved_url, pc_img_url = _fetch_pc_prices_from_url(product_url, target_grade=target_grade)
+        fast_hit = None
+        if fast and not (is_flagship or is_alt_art):
+            fast_hit = _pc_fast_result(md_content, product_url, scored_urls, target_grade)
+        if fast_hit:
+            records, resolved_url, pc_img_url = fast_hit
+        else:
+            records, resolved_url, pc_img_url = _fetch_pc_prices_shared(product_url, target_grade=target_grade)
+        if records:
+            selected_score = next((sc for u, sc, _ in scored_urls if u == product_url), None)
+            _resolved_store("pc", pc_card_key, product_url, reason=selection_reason, score=selected_score)
+            _catalog_record([pc_product_entry(product_url, selected=True, name=name_query, jp_name=jp_name,
+                                              set_code=final_set_code, number=number, category=category,
+                                              denominator=number_denominator)])
     else:
         print(f"DEBUG: Landed directly on PC product page")
         product_url = search_url
@@ -748,11 +1623,109 @@ def search_pricecharting(name, number, set_code, target_grade, is_alt_art, categ
             # If the main app expects candidate URLs, wrap the direct match as a candidate
             return filter_pricecharting_candidates([f"{product_url} — {name}"]), None, None
             
-        records, resolved_url, pc_img_url = _fetch_pc_prices_from_url(product_url, md_content=md_content, target_grade=target_grade)
+        records, resolved_url, pc_img_url = _fetch_pc_prices_shared(product_url, md_content=md_content, target_grade=target_grade)
+        if records:
+            _resolved_store("pc", pc_card_key, product_url, reason="直接落在商品頁面")
+            _catalog_record([pc_product_entry(product_url, selected=True, name=name_query, jp_name=jp_name,
+                                              set_code=final_set_code, number=number, category=category,
+                                              denominator=number_denominator)])
     
     return records, resolved_url, pc_img_url
 
-def search_snkrdunk(en_name, jp_name, number, set_code, target_grade, is_alt_art=False, card_language="JP", snkr_variant_kws=None, return_candidates=False, set_name=""):
+def _snkr_search_term(snkr_step, term, number_clean, number_padded):
+    """
+    單一查詢詞：呼叫 SNKRDUNK 搜尋 API，回傳 (search_url, unique_matches, filtered_by_number)。
+    unique_matches / filtered_by_number 皆為 (title, pid, thumb) list。
+    """
+    q = urllib.parse.quote_plus(term)
+    search_url = f"https://snkrdunk.com/en/v1/search?keyword={q}&perPage=40&page=1"
+    _debug_log(f"SNKRDUNK Step {snkr_step}: 查詢={term!r}  URL={search_url}")
+    data = _snkr_api_get_json(search_url)
+
+    items = []
+    for key in ("streetwears", "products"):
+        arr = data.get(key, [])
+        if isinstance(arr, list):
+            items.extend(arr)
+
+    _debug_log(f"SNKRDUNK Step {snkr_step}: API 原始匹配 {len(items)} 筆")
+
+    seen = set()
+    unique_matches = []
+    for item in items:
+        pid = str(item.get("id", "")).strip()
+        if not pid:
+            continue
+        title = str(item.get("name", "")).strip()
+        if not title:
+            continue
+        # Keep only trading cards when the flag exists.
+        if item.get("isTradingCard") is False:
+            continue
+        thumb = item.get("thumbnailUrl") or item.get("imageUrl") or item.get("image") or ""
+        if pid not in seen:
+            seen.add(pid)
+            unique_matches.append((title, pid, thumb))
+
+    if not unique_matches:
+        return search_url, [], []
+
+    filtered_by_number = []
+    skipped = []
+    for title, pid, thumb in unique_matches:
+        # Drop Jina image prefixes
+        title_clean = re.sub(r'(?i)image\s*\d+:\s*', '', title).lower()
+        # Drop all https CDN links to prevent their timestamp digits from matching the card number
+        title_clean = re.sub(r'https?://[^\s()\]]+', '', title_clean)
+
+        is_num_match, n_hit, d_hit, n_reason = _title_number_match(title_clean, number_clean, number_padded)
+        if is_num_match:
+            filtered_by_number.append((title, pid, thumb))
+            if n_reason == "fraction_numerator":
+                _debug_log(f"  ✅ 符合分子編號 '{number_padded}' ({n_hit}/{d_hit}): [{pid}] {title}")
+            else:
+                _debug_log(f"  ✅ 符合編號 '{number_padded}' ({n_reason}): [{pid}] {title}")
+        else:
+            skipped.append((title, pid, thumb))
+            _debug_log(f"  ❌ 不含編號 '{number_padded}': [{pid}] {title}")
+
+    return search_url, unique_matches, filtered_by_number
+
+def _snkr_term_results(terms, search_term, fanout):
+    """
+    依優先順序產出 (step, term, search_term 結果)。
+
+    fanout=False：逐一查詢，未命中時間隔 1 秒 (舊行為)。
+    fanout=True ：所有查詢詞同時送到 "fanout" 池 (SNKRDUNK 請求數另受 SNKR_MAX_CONCURRENCY 限制)，但仍依原優先順序
+    交給呼叫端判斷；呼叫端命中後關閉 generator，尚未送出的查詢會被取消，進行中的結果直接丟棄。
+    """
+    if not fanout or len(terms) <= 1:
+        for step, term in enumerate(terms, start=1):
+            if step > 1:
+                time.sleep(1)
+            yield step, term, search_term(step, term)
+        return
+
+    cancelled = threading.Event()
+
+    def _guarded(step, term):
+        if cancelled.is_set():
+            return None
+        return search_term(step, term)
+
+    futures = []
+    try:
+        fanout = executors.get("fanout")
+        for step, term in enumerate(terms, start=1):
+            futures.append(fanout.submit(_guarded, step, term))
+        for step, (term, future) in enumerate(zip(terms, futures), start=1):
+            yield step, term, future.result()
+    finally:
+        cancelled.set()
+        for future in futures:
+            future.cancel()
+
+def search_snkrdunk(en_name, jp_name, number, set_code, target_grade, is_alt_art=False, card_language="JP", snkr_variant_kws=None, return_candidates=False, set_name="", jpy_rate=None, fanout=None):
     # Strip prefix like "No." (e.g. "No.025" -> "25"), then apply lstrip('0')
     if '-' in number and re.search(r'[A-Z]+\d+-\d+', number):
         number_clean = number.split('-')[-1].lstrip('0')
@@ -796,257 +1769,218 @@ def search_snkrdunk(en_name, jp_name, number, set_code, target_grade, is_alt_art
     
     _debug_log(f"SNKRDUNK: 共 {len(terms_to_try)} 種查詢方案: {terms_to_try}")
 
+    snkr_card_key = card_identity(en_name, number, set_code, is_alt_art, False, card_language,
+                                  list(snkr_variant_kws or []))
+    if not return_candidates:
+        resolved = _resolved_lookup("snkr", snkr_card_key)
+        if resolved and resolved["product_id"]:
+            _debug_step("SNKRDUNK", 1, "resolved-index", resolved["product_url"], "OK",
+                        selected_url=resolved["product_url"],
+                        reason=f"使用已解析商品，跳過搜尋 ({resolved['reason']}, score={resolved['score']})")
+            return _snkr_records_for_product(resolved["product_id"], resolved["img_url"], target_grade, jpy_rate)
+
+        if not is_alt_art and not snkr_variant_kws:
+            is_en_title = lambda t: any(m in str(t).lower() for m in ["英語版", "[en]", "【en】"])
+            hit = _catalog_resolve("snkr", number, [jp_name_query, en_name_query], set_code=set_code,
+                                   denominator=number_denominator,
+                                   title_filter=lambda t: is_en_title(t) == (card_language == "EN"))
+            if hit:
+                _debug_step("SNKRDUNK", 1, "card-catalog", hit["product_url"], "OK",
+                            selected_url=hit["product_url"], reason="本機卡片目錄唯一命中，跳過搜尋")
+                _resolved_store("snkr", snkr_card_key, hit["product_url"], product_id=hit["product_ref"],
+                                img_url=hit["img_url"], reason="Card catalog (unique match)")
+                return _snkr_records_for_product(hit["product_ref"], hit["img_url"], target_grade, jpy_rate)
+
     product_id = None
     img_url = ""
-    snkr_step = 0
-    snkr_session = _create_snkr_api_session()
-
-    for term in terms_to_try:
-        snkr_step += 1
-        q = urllib.parse.quote_plus(term)
-        search_url = f"https://snkrdunk.com/en/v1/search?keyword={q}&perPage=40&page=1"
-        _debug_log(f"SNKRDUNK Step {snkr_step}: 查詢={term!r}  URL={search_url}")
-        data = _snkr_api_get_json(snkr_session, search_url)
-
-        items = []
-        for key in ("streetwears", "products"):
-            arr = data.get(key, [])
-            if isinstance(arr, list):
-                items.extend(arr)
-
-        _debug_log(f"SNKRDUNK Step {snkr_step}: API 原始匹配 {len(items)} 筆")
-
-        seen = set()
-        unique_matches = []
-        for item in items:
-            pid = str(item.get("id", "")).strip()
-            if not pid:
-                continue
-            title = str(item.get("name", "")).strip()
-            if not title:
-                continue
-            # Keep only trading cards when the flag exists.
-            if item.get("isTradingCard") is False:
-                continue
-            thumb = item.get("thumbnailUrl") or item.get("imageUrl") or item.get("image") or ""
-            if pid not in seen:
-                seen.add(pid)
-                unique_matches.append((title, pid, thumb))
-
-        if not unique_matches:
-            _debug_step("SNKRDUNK", snkr_step, term, search_url,
-                        "NO_RESULTS", reason="搜尋頁面找不到任何商品連結，嘗試下一個查詢")
-            time.sleep(1)
-            continue
-                
-        filtered_by_number = []
-        skipped = []
-        for title, pid, thumb in unique_matches:
-            # Drop Jina image prefixes
-            title_clean = re.sub(r'(?i)image\s*\d+:\s*', '', title).lower()
-            # Drop all https CDN links to prevent their timestamp digits from matching the card number
-            title_clean = re.sub(r'https?://[^\s()\]]+', '', title_clean)
-
-            is_num_match, n_hit, d_hit, n_reason = _title_number_match(title_clean, number_clean, number_padded)
-            if is_num_match:
-                filtered_by_number.append((title, pid, thumb))
-                if n_reason == "fraction_numerator":
-                    _debug_log(f"  ✅ 符合分子編號 '{number_padded}' ({n_hit}/{d_hit}): [{pid}] {title}")
-                else:
-                    _debug_log(f"  ✅ 符合編號 '{number_padded}' ({n_reason}): [{pid}] {title}")
-            else:
-                skipped.append((title, pid, thumb))
-                _debug_log(f"  ❌ 不含編號 '{number_padded}': [{pid}] {title}")
-                
-        if not filtered_by_number:
-            _debug_step("SNKRDUNK", snkr_step, term, search_url,
-                        "NO_MATCH",
-                        candidate_urls=[f"https://snkrdunk.com/apparels/{pid} — {t}" for t, pid, _ in unique_matches],
-                        reason=f"找到 {len(unique_matches)} 筆商品但均不含卡片編號 '{number_padded}'，嘗試下一個查詢")
-            time.sleep(1)
-            continue # If no titles specifically have the card number, do not guess
-            
-        unique_matches = filtered_by_number
-
-        if unique_matches:
-            # Ranking: set_code > exact name > exact number > denominator.
-            ranked_matches = []
-            en_name_norm = re.sub(r'\(.*?\)', '', en_name).strip().lower()
-            jp_name_norm = re.sub(r'\(.*?\)', '', jp_name).strip().lower() if jp_name else ""
-
-            for title, pid, thumb in unique_matches:
-                title_l = str(title).lower()
-                title_norm = _normalize_alnum_dash(title_l)
-                title_compact = re.sub(r'[^a-z0-9]', '', title_l)
-
-                score = 0
-                reasons = []
-
-                if set_code_slug and set_code_slug in title_compact:
-                    score += 140
-                    reasons.append("set_code")
-
-                # Japanese name exact string gets highest name confidence.
-                if jp_name_norm and jp_name_norm in title_l:
-                    score += 90
-                    reasons.append("jp_name_exact")
-
-                # English name with token boundaries avoids Mew->Mewtwo false hit.
-                if en_name_norm:
-                    if _contains_token_boundary(title_norm, en_name_norm):
-                        score += 85
-                        reasons.append("en_name_exact")
-                    else:
-                        en_tokens = [t for t in _normalize_alnum_dash(en_name_norm).split('-') if t and len(t) >= 2]
-                        if en_tokens:
-                            token_hits = sum(1 for t in en_tokens if _contains_token_boundary(title_norm, t))
-                            if token_hits == len(en_tokens):
-                                score += 60
-                                reasons.append("en_tokens_all")
-                            elif token_hits > 0:
-                                score += 18
-                                reasons.append("en_tokens_partial")
-                        if en_name_norm in title_l and not _contains_token_boundary(title_norm, en_name_norm):
-                            score -= 35
-                            reasons.append("en_substring_penalty")
-
-                num_match, n_hit, d_hit, n_reason = _title_number_match(title_l, number_clean, number_padded)
-                if num_match:
-                    if n_reason == "fraction_numerator":
-                        score += 52
-                        reasons.append("number_fraction_numerator")
-                    elif n_reason == "standalone_padded":
-                        score += 45
-                        reasons.append("number_standalone_padded")
-                    elif n_reason == "standalone_clean":
-                        score += 40
-                        reasons.append("number_standalone_clean")
-
-                if number_denominator:
-                    den_trim = number_denominator.lstrip('0') or number_denominator
-                    if d_hit:
-                        if d_hit == den_trim:
-                            score += 35
-                            reasons.append("denominator_exact")
-                        else:
-                            score -= 55
-                            reasons.append("denominator_mismatch_penalty")
+    if fanout is None:
+        fanout = SNKR_FANOUT
 
-                ranked_matches.append((title, pid, thumb, score, reasons))
+    def _search_term(step, term):
+        return _snkr_search_term(step, term, number_clean, number_padded)
 
-            ranked_matches.sort(key=lambda x: x[3], reverse=True)
-            unique_matches = [(t, p, i) for t, p, i, _, _ in ranked_matches]
-            _debug_log(f"SNKRDUNK ranking top3: {[(t, p, s) for t, p, _, s, _ in ranked_matches[:3]]}")
+    with contextlib.closing(_snkr_term_results(terms_to_try, _search_term, fanout)) as term_results:
+        for snkr_step, term, (search_url, unique_matches, filtered_by_number) in term_results:
+            if not unique_matches:
+                _debug_step("SNKRDUNK", snkr_step, term, search_url,
+                            "NO_RESULTS", reason="搜尋頁面找不到任何商品連結，嘗試下一個查詢")
+                continue
 
-            if return_candidates:
-                # 只回傳 URL 列表 (加上標題方便 bot 顯示列表)
-                return [f"https://snkrdunk.com/apparels/{pid} — {title}" for title, pid, _ in unique_matches], None, None
+            _catalog_record(snkr_product_entry(pid, title, thumb) for title, pid, thumb in unique_matches)
+
+            if not filtered_by_number:
+                _debug_step("SNKRDUNK", snkr_step, term, search_url,
+                            "NO_MATCH",
+                            candidate_urls=[f"https://snkrdunk.com/apparels/{pid} — {t}" for t, pid, _ in unique_matches],
+                            reason=f"找到 {len(unique_matches)} 筆商品但均不含卡片編號 '{number_padded}'，嘗試下一個查詢")
+                continue # If no titles specifically have the card number, do not guess
+            
+            unique_matches = filtered_by_number
+
+            if unique_matches:
+                # Ranking: set_code > exact name > exact number > denominator.
+                ranked_matches = []
+                en_name_norm = re.sub(r'\(.*?\)', '', en_name).strip().lower()
+                jp_name_norm = re.sub(r'\(.*?\)', '', jp_name).strip().lower() if jp_name else ""
+
+                for title, pid, thumb in unique_matches:
+                    title_l = str(title).lower()
+                    title_norm = _normalize_alnum_dash(title_l)
+                    title_compact = re.sub(r'[^a-z0-9]', '', title_l)
+
+                    score = 0
+                    reasons = []
+
+                    if set_code_slug and set_code_slug in title_compact:
+                        score += 140
+                        reasons.append("set_code")
+
+                    # Japanese name exact string gets highest name confidence.
+                    if jp_name_norm and jp_name_norm in title_l:
+                        score += 90
+                        reasons.append("jp_name_exact")
+
+                    # English name with token boundaries avoids Mew->Mewtwo false hit.
+                    if en_name_norm:
+                        if _contains_token_boundary(title_norm, en_name_norm):
+                            score += 85
+                            reasons.append("en_name_exact")
+                        else:
+                            en_tokens = [t for t in _normalize_alnum_dash(en_name_norm).split('-') if t and len(t) >= 2]
+                            if en_tokens:
+                                token_hits = sum(1 for t in en_tokens if _contains_token_boundary(title_norm, t))
+                                if token_hits == len(en_tokens):
+                                    score += 60
+                                    reasons.append("en_tokens_all")
+                                elif token_hits > 0:
+                                    score += 18
+                                    reasons.append("en_tokens_partial")
+                            if en_name_norm in title_l and not _contains_token_boundary(title_norm, en_name_norm):
+                                score -= 35
+                                reasons.append("en_substring_penalty")
+
+                    num_match, n_hit, d_hit, n_reason = _title_number_match(title_l, number_clean, number_padded)
+                    if num_match:
+                        if n_reason == "fraction_numerator":
+                            score += 52
+                            reasons.append("number_fraction_numerator")
+                        elif n_reason == "standalone_padded":
+                            score += 45
+                            reasons.append("number_standalone_padded")
+                        elif n_reason == "standalone_clean":
+                            score += 40
+                            reasons.append("number_standalone_clean")
+
+                    if number_denominator:
+                        den_trim = number_denominator.lstrip('0') or number_denominator
+                        if d_hit:
+                            if d_hit == den_trim:
+                                score += 35
+                                reasons.append("denominator_exact")
+                            else:
+                                score -= 55
+                                reasons.append("denominator_mismatch_penalty")
+
+                    ranked_matches.append((title, pid, thumb, score, reasons))
+
+                ranked_matches.sort(key=lambda x: x[3], reverse=True)
+                unique_matches = [(t, p, i) for t, p, i, _, _ in ranked_matches]
+                _debug_log(f"SNKRDUNK ranking top3: {[(t, p, s) for t, p, _, s, _ in ranked_matches[:3]]}")
+
+                if return_candidates:
+                    # 只回傳 URL 列表 (加上標題方便 bot 顯示列表)
+                    return [f"https://snkrdunk.com/apparels/{pid} — {title}" for title, pid, _ in unique_matches], None, None
                 
-            product_id = unique_matches[0][1] # default to first result
-            img_url = unique_matches[0][2]
-            selection_reason = "Scored (Top rank)"
+                product_id = unique_matches[0][1] # default to first result
+                img_url = unique_matches[0][2]
+                selection_reason = "Scored (Top rank)"
             
-            # ─────────────────────────────────────────────────────────────────
-            # 三階段串聯過濾：Variant → Alt-Art/Normal → Language
-            # 每一階段在上一階段的結果裡繼續篩選，不覆蓋
-            # ─────────────────────────────────────────────────────────────────
-            en_markers = ["英語版", "[en]", "【en】"]
+                # ─────────────────────────────────────────────────────────────────
+                # 三階段串聯過濾：Variant → Alt-Art/Normal → Language
+                # 每一階段在上一階段的結果裡繼續篩選，不覆蓋
+                # ─────────────────────────────────────────────────────────────────
+                en_markers = ["英語版", "[en]", "【en】"]
             
-            # ── Stage 1: Variant-specific filter (features-based, 最高優先) ──
-            # snkr_variant_kws 由 process_single_image 從 features 解析並傳入
-            # 例: ["l-p"] for Leader Parallel, ["sr-p"] for SR Parallel, ["コミパラ"] for Manga, ["フラッグシップ","フラシ"] for Flagship
-            _variant_kws = snkr_variant_kws or []
+                # ── Stage 1: Variant-specific filter (features-based, 最高優先) ──
+                # snkr_variant_kws 由 process_single_image 從 features 解析並傳入
+                # 例: ["l-p"] for Leader Parallel, ["sr-p"] for SR Parallel, ["コミパラ"] for Manga, ["フラッグシップ","フラシ"] for Flagship
+                _variant_kws = snkr_variant_kws or []
             
-            stage1_candidates = [(t, p, i) for t, p, i in unique_matches
-                                 if any(kw in t.lower() for kw in _variant_kws)] if _variant_kws else []
-            if stage1_candidates:
-                _debug_log(f"  🎯 Variant Filter ({_variant_kws}) 命中 {len(stage1_candidates)} 筆")
-            working_set = stage1_candidates if stage1_candidates else unique_matches
+                stage1_candidates = [(t, p, i) for t, p, i in unique_matches
+                                     if any(kw in t.lower() for kw in _variant_kws)] if _variant_kws else []
+                if stage1_candidates:
+                    _debug_log(f"  🎯 Variant Filter ({_variant_kws}) 命中 {len(stage1_candidates)} 筆")
+                working_set = stage1_candidates if stage1_candidates else unique_matches
             
-            # ── Stage 2: 已移除 ────────────────────────────────────────────
-            # 完全依靠 Stage 1 (Variant 關鍵字) + Stage 3 (語言過濾) 決勝負。
-            # is_alt_art 的 alt-art 二次篩選已刪除，避免誤濾雜誌附錄等非標準命名的異圖版本。
-            if stage1_candidates:
-                selection_reason = f"Variant Filter ({_variant_kws})"
-            working_set2 = working_set
+                # ── Stage 2: 已移除 ────────────────────────────────────────────
+                # 完全依靠 Stage 1 (Variant 關鍵字) + Stage 3 (語言過濾) 決勝負。
+                # is_alt_art 的 alt-art 二次篩選已刪除，避免誤濾雜誌附錄等非標準命名的異圖版本。
+                if stage1_candidates:
+                    selection_reason = f"Variant Filter ({_variant_kws})"
+                working_set2 = working_set
             
-            # ── Stage 3: Language filter ───────────────────────────────────
-            if card_language == "EN":
-                stage3 = [(t, p, i) for t, p, i in working_set2
-                          if any(m in t.lower() for m in en_markers)]
-                if stage3:
-                    product_id = stage3[0][1]
-                    img_url = stage3[0][2]
-                    selection_reason += " + Language(EN)"
-                    _debug_log(f"  🌐 語言過濾選中英文版: [{product_id}]")
-                else:
-                    product_id = working_set2[0][1]
-                    img_url = working_set2[0][2]
-            else:  # JP (default)
-                stage3 = [(t, p, i) for t, p, i in working_set2
-                          if not any(m in t.lower() for m in en_markers)]
-                if stage3:
-                    product_id = stage3[0][1]
-                    img_url = stage3[0][2]
-                    selection_reason += " + Language(JP)"
-                    _debug_log(f"  🌐 語言過濾選中日文版: [{product_id}]")
-                else:
-                    product_id = working_set2[0][1]
-                    img_url = working_set2[0][2]
-                    _debug_log(f"  🌐 語言過濾: 未找到日文版，使用 working_set2 首筆")
-
-            _debug_step("SNKRDUNK", snkr_step, term, search_url,
-            "OK",
-            candidate_urls=[f"https://snkrdunk.com/apparels/{pid} — {t}" for t, pid, _ in unique_matches],
-            selected_url=f"https://snkrdunk.com/apparels/{product_id}",
-            reason=selection_reason,
-            extra={
-                "number_padded": number_padded,
-                "number_denominator": number_denominator,
-                "set_code_slug": set_code_slug,
-                "is_alt_art": is_alt_art,
-                "scored_top3": [(t, p, s) for t, p, _, s, _ in ranked_matches[:3]],
-            })
-            break
-        
-        time.sleep(1)
-        
+                # ── Stage 3: Language filter ───────────────────────────────────
+                if card_language == "EN":
+                    stage3 = [(t, p, i) for t, p, i in working_set2
+                              if any(m in t.lower() for m in en_markers)]
+                    if stage3:
+                        product_id = stage3[0][1]
+                        img_url = stage3[0][2]
+                        selection_reason += " + Language(EN)"
+                        _debug_log(f"  🌐 語言過濾選中英文版: [{product_id}]")
+                    else:
+                        product_id = working_set2[0][1]
+                        img_url = working_set2[0][2]
+                else:  # JP (default)
+                    stage3 = [(t, p, i) for t, p, i in working_set2
+                              if not any(m in t.lower() for m in en_markers)]
+                    if stage3:
+                        product_id = stage3[0][1]
+                        img_url = stage3[0][2]
+                        selection_reason += " + Language(JP)"
+                        _debug_log(f"  🌐 語言過濾選中日文版: [{product_id}]")
+                    else:
+                        product_id = working_set2[0][1]
+                        img_url = working_set2[0][2]
+                        _debug_log(f"  🌐 語言過濾: 未找到日文版，使用 working_set2 首筆")
+
+                selected_score = next((s for _, p, _, s, _ in ranked_matches if p == product_id), None)
+                _debug_step("SNKRDUNK", snkr_step, term, search_url,
+                "OK",
+                candidate_urls=[f"https://snkrdunk.com/apparels/{pid} — {t}" for t, pid, _ in unique_matches],
+                selected_url=f"https://snkrdunk.com/apparels/{product_id}",
+                reason=selection_reason,
+                extra={
+                    "number_padded": number_padded,
+                    "number_denominator": number_denominator,
+                    "set_code_slug": set_code_slug,
+                    "is_alt_art": is_alt_art,
+                    "scored_top3": [(t, p, s) for t, p, _, s, _ in ranked_matches[:3]],
+                })
+                break
+
     if not product_id:
         return None, None, None
-        
-    print(f"Found SNKRDUNK Product ID: {product_id}")
 
-    jpy_rate = get_exchange_rate()
-    hist_url = f"https://snkrdunk.com/en/v1/streetwears/{product_id}/trading-histories?perPage=100&page=1"
-    hist_data = _snkr_api_get_json(snkr_session, hist_url)
-    histories = hist_data.get("histories", []) if isinstance(hist_data, dict) else []
+    _resolved_store("snkr", snkr_card_key, f"https://snkrdunk.com/apparels/{product_id}",
+                    product_id=product_id, img_url=img_url, reason=selection_reason, score=selected_score)
+    _catalog_record([snkr_product_entry(product_id, "", img_url, selected=True, name=en_name_query,
+                                        jp_name=jp_name_query, set_code=set_code, number=number,
+                                        denominator=number_denominator)])
+    return _snkr_records_for_product(product_id, img_url, target_grade, jpy_rate)
 
-    records = []
-    for h in histories:
-        date_found = _snkr_traded_date(h.get("tradedAt", ""))
-        grade_found = str(h.get("condition", "")).strip() or "Unknown"
-        price_jpy = _snkr_history_to_jpy(h, jpy_rate)
-        if date_found and price_jpy > 0:
-            # 不過濾等級，直接收集所有成交紀錄（含實際等級）
-            # generate_report 的顯示邏輯會按需選取正確等級
-            # 航海王 BGS 卡需要同時看到 A/PSA10/BGS 等紀錄
-            records.append({
-                "date": date_found,
-                "price": price_jpy,
-                "grade": grade_found
-            })
-                
+def _snkr_records_for_product(product_id, img_url, target_grade, jpy_rate=None):
+    """抓取已選定 SNKRDUNK 商品的成交紀錄。Returns (records, img_url, resolved_url)."""
+    print(f"Found SNKRDUNK Product ID: {product_id}")
+
+    if jpy_rate is None:
+        jpy_rate = get_exchange_rate()
     resolved_url = f"https://snkrdunk.com/apparels/{product_id}" if product_id else None
+    records = _snkr_product_records(product_id, resolved_url, jpy_rate)
                 
     _debug_log(f"SNKRDUNK: 成功提取 {len(records)} 筆價格紀錄 (包含全等級)")
     
-    snkr_target = target_grade.replace(" ", "")
-    matched_records = []
-    for r in records:
-        r_grade = r.get('grade', '')
-        if r_grade == target_grade: matched_records.append(r)
-        elif target_grade == "Unknown" and r_grade in ("Ungraded", "裸卡", "A"): matched_records.append(r)
-        elif r_grade == snkr_target: matched_records.append(r)
+    matched_records = RecordSet(records).slice(target_grade, "snkr")
 
     _debug_log(f"SNKRDUNK: 其中符合 '{target_grade}' 的紀錄有 {len(matched_records)} 筆")
     for r in matched_records[:5]:
@@ -1056,6 +1990,32 @@ def search_snkrdunk(en_name, jp_name, number, set_code, target_grade, is_alt_art
                 
     return records, img_url, resolved_url
 
+@functools.lru_cache(maxsize=8)
+def _prepare_image_cached(image_path, mtime_ns, size):
+    mime, encoded, info = image_prep.prepare_card_image(image_path)
+    if info["saved_bytes"] > 0:
+        _debug_log(
+            f"🗜️ 影像前處理: {info['original_bytes'] / 1024:.0f} KB → {info['sent_bytes'] / 1024:.0f} KB "
+            f"(省下 {info['saved_bytes'] / info['original_bytes']:.0%}, 裁切={info['cropped']}, 轉正={info['angle']}°)"
+        )
+    return mime, encoded
+
+def _prepare_vision_image(image_path):
+    """
+    上傳前裁切 / 轉正 / 縮圖 (image_prep)。以 (路徑, mtime, 大小) 記憶結果，
+    hedge 時 OpenAI 與 MiniMax 共用同一份編碼。Returns (mime, base64)。
+    """
+    st = os.stat(image_path)
+    return _prepare_image_cached(image_path, st.st_mtime_ns, st.st_size)
+
+def get_image_prep_stats():
+    """本行程影像前處理累計的原始 / 實際上傳位元組數。"""
+    return image_prep.stats()
+
+def get_executor_stats():
+    """各工作負載執行緒池 (scrape / llm / image) 的 queue depth 與飽和指標。"""
+    return executors.stats()
+
 async def analyze_image_with_openai(image_path, api_key, lang="zh"):
     api_key = api_key.strip()
     url = "https://api.openai.com/v1/chat/completions"
@@ -1064,16 +2024,7 @@ async def analyze_image_with_openai(image_path, api_key, lang="zh"):
         "Content-Type": "application/json"
     }
     
-    # Determine MIME type
-    mime = "image/jpeg"
-    ext = image_path.lower().split(".")[-1]
-    if ext == "png":
-        mime = "image/png"
-    elif ext == "webp":
-        mime = "image/webp"
-
-    with open(image_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
+    mime, encoded_string = await executors.run("image", _prepare_vision_image, image_path)
 
     prompt = """請以純 JSON 格式回覆，不要包含任何 markdown 語法 (如 ```json 起始碼)，只需輸出 JSON 本體。
 你是一位於寶可夢卡牌 (Pokemon TCG) 領域專精的鑑定與估價專家。
@@ -1115,17 +2066,13 @@ async def analyze_image_with_openai(image_path, api_key, lang="zh"):
         "response_format": {"type": "json_object"}
     }
     
-    loop = asyncio.get_running_loop()
-    def _do_openai_post():
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
-            response.raise_for_status()
-            return response
-        except Exception as e:
-            print(f"⚠️ OpenAI API 錯誤: {e}")
-            return None
-
-    response = await loop.run_in_executor(None, _do_openai_post)
+    try:
+        response = await http_client.get_async_client().post(url, headers=headers, json=payload, timeout=60,
+                                                              retry=http_client.STATUS_ONLY_RETRY)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"⚠️ OpenAI API 錯誤: {e}")
+        response = None
     if response:
         try:
             res_json = response.json()
@@ -1135,20 +2082,13 @@ async def analyze_image_with_openai(image_path, api_key, lang="zh"):
             print(f"⚠️ OpenAI 解析失敗: {e}")
     return None
 
-async def analyze_image_with_minimax(image_path, api_key, lang="zh"):
+async def analyze_image_with_minimax(image_path, api_key, lang="zh", fallback=True):
+    """fallback=False 時失敗直接回傳 None，不再自行改用 OpenAI (由 analyze_card_image 決定備援)。"""
     # 清理 API Key，避免複製貼上時混入隱藏的換行或特殊字元 (\u2028 等) 導致 \u2028 latin-1 編碼錯誤
     api_key = api_key.strip().replace('\u2028', '').replace('\n', '').replace('\r', '')
-    # Determine MIME type
-    mime = "image/jpeg"
-    ext = image_path.lower().split(".")[-1]
-    if ext == "png":
-        mime = "image/png"
-    elif ext == "webp":
-        mime = "image/webp"
-
-    # Encode image
-    with open(image_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
+
+    # 裁切 / 縮圖後編碼
+    mime, encoded_string = await executors.run("image", _prepare_vision_image, image_path)
 
     url = "https://api.minimax.io/v1/coding_plan/vlm"
     headers = {
@@ -1187,27 +2127,20 @@ async def analyze_image_with_minimax(image_path, api_key, lang="zh"):
     print("--------------------------------------------------")
     print(f"👁️‍🗨️ [Minimax Vision AI] 正在解析卡片影像: {image_path}...")
     
-    # ⚠️ requests.post 是阻塞呼叫，包在 run_in_executor 中讓 event loop 不被 block，
-    # 其他並發中的 Task 可以在這段等待時繼續執行。
-    loop = asyncio.get_running_loop()
-    
-    def _do_minimax_post():
-        for attempt in range(3):
-            try:
-                response = requests.post(url, headers=headers, json=payload, timeout=60)
-                response.raise_for_status()
-                return response
-            except requests.exceptions.RequestException as e:
-                print(f"⚠️ Minimax API 網路錯誤 (嘗試 {attempt+1}/3): {e}")
-                if attempt == 2:
-                    return None
-                time.sleep(2)
-        return None
-
-    response = await loop.run_in_executor(None, _do_minimax_post)
+    # 共用的 AsyncHttpClient：等待回應時 event loop 可繼續執行其他 Task；
+    # 只有 429 / 5xx 會重試：連線錯誤或 timeout 時請求可能已被處理 (重送會重複計費)
+    try:
+        response = await http_client.get_async_client().post(url, headers=headers, json=payload,
+                                                              timeout=60, retry=http_client.STATUS_ONLY_RETRY)
+        response.raise_for_status()
+    except http_client.HTTP_ERRORS as e:
+        print(f"⚠️ Minimax API 網路錯誤: {e}")
+        response = None
 
     # 如果 Minimax API 全部嘗試失敗，則嘗試 OpenAI 作為備援
     if response is None:
+        if not fallback:
+            return None
         print(f"⚠️ Minimax API 請求失敗，嘗試切換至 GPT-4o-mini...")
         _push_notify("⚠️ Minimax API 無回應，切換至 GPT-4o-mini 備援重試...")
         openai_key = os.getenv("OPENAI_API_KEY")
@@ -1235,6 +2168,8 @@ async def analyze_image_with_minimax(image_path, api_key, lang="zh"):
         return result
     except Exception as e:
         print(f"❌ Minimax 解析失敗: {e}")
+        if not fallback:
+            return None
         print(f"⚠️ 嘗試切換至 GPT-4o-mini 進行備援...")
         _push_notify("⚠️ Minimax 解析失敗，切換至 GPT-4o-mini 備援重試...")
         openai_key = os.getenv("OPENAI_API_KEY")
@@ -1244,6 +2179,153 @@ async def analyze_image_with_minimax(image_path, api_key, lang="zh"):
             print("❌ 未設定 OPENAI_API_KEY，無法進行備援。")
             return None
 
+# Hedged 辨識：OpenAI 在 hedge delay 內沒有回應時同時送出 MiniMax，採用第一個通過驗證的結果，
+# 並取消另一個請求。delay 預設為近期 OpenAI 延遲的 p90 (樣本不足時用 OPENCLAW_VISION_HEDGE_S)，
+# 不低於 OPENCLAW_VISION_HEDGE_MIN_S。被取消的 OpenAI 請求以取消時已經過的時間記為樣本 (實際延遲的下限)，
+# 否則慢的請求永遠不會被記錄，p90 會越來越低。
+VISION_HEDGE = os.getenv("OPENCLAW_VISION_HEDGE", "1").strip().lower() not in ("0", "false", "off")
+VISION_HEDGE_DELAY = float(os.getenv("OPENCLAW_VISION_HEDGE_S", 8.0))
+VISION_HEDGE_MIN_DELAY = float(os.getenv("OPENCLAW_VISION_HEDGE_MIN_S", 2.0))
+VISION_HEDGE_MIN_SAMPLES = 10
+_vision_latencies = collections.deque(maxlen=100)
+_vision_latencies_lock = threading.Lock()
+
+def _valid_card_info(info):
+    """辨識結果至少要是含 name / number 的 JSON 物件，否則視為失敗。"""
+    return isinstance(info, dict) and bool(str(info.get("name") or "").strip()) \
+        and bool(str(info.get("number") or "").strip())
+
+def _vision_hedge_delay():
+    with _vision_latencies_lock:
+        samples = sorted(_vision_latencies)
+    if len(samples) < VISION_HEDGE_MIN_SAMPLES:
+        return VISION_HEDGE_DELAY
+    return max(VISION_HEDGE_MIN_DELAY, samples[min(len(samples) - 1, int(len(samples) * 0.9))])
+
+def _record_vision_latency(seconds):
+    with _vision_latencies_lock:
+        _vision_latencies.append(seconds)
+
+async def _timed_openai(image_path, openai_key, lang):
+    started = time.monotonic()
+    try:
+        info = await analyze_image_with_openai(image_path, openai_key, lang=lang)
+    except asyncio.CancelledError:
+        # hedge 由 MiniMax 勝出：實際延遲至少是已經過的時間
+        _record_vision_latency(time.monotonic() - started)
+        raise
+    if _valid_card_info(info):
+        _record_vision_latency(time.monotonic() - started)
+    return info
+
+def _init_vision_cache():
+    if os.getenv("OPENCLAW_VISION_CACHE", "1").strip().lower() in ("0", "false", "off"):
+        return None
+    try:
+        return VisionResultCache(
+            _cache_path("vision_cache.sqlite3"),
+            max_entries=int(os.getenv("OPENCLAW_VISION_CACHE_MAX", 5000)),
+            max_distance=int(os.getenv("OPENCLAW_VISION_CACHE_HAMMING", 2)),
+            max_age=float(os.getenv("OPENCLAW_VISION_CACHE_TTL", 30 * 86400)),
+        )
+    except Exception as e:
+        _original_print(f"⚠️ 辨識結果快取初始化失敗，改為不使用快取: {e}")
+        return None
+
+# 同一張卡片照片 (或重新壓縮 / 縮放的版本) 直接重用之前的辨識結果，不再呼叫 LLM
+_vision_cache = _init_vision_cache()
+
+def get_vision_cache_stats():
+    return _vision_cache.stats() if _vision_cache else {}
+
+async def analyze_card_image(image_path, api_key, lang="zh"):
+    """
+    卡片影像辨識：先查辨識結果快取 (內容 SHA-256 + dHash 近似比對)，未命中才呼叫 LLM，
+    成功的結果寫回快取。
+    """
+    if not _vision_cache:
+        return await _analyze_card_image_llm(image_path, api_key, lang)
+    try:
+        sha, image_dhash, aspect = await executors.run("image", image_fingerprint, image_path)
+        card_info, match = _vision_cache.get(sha, image_dhash, lang, aspect=aspect)
+    except (OSError, sqlite3.Error) as e:
+        _debug_log(f"辨識結果快取讀取失敗 (忽略): {e}")
+        return await _analyze_card_image_llm(image_path, api_key, lang)
+    if card_info:
+        print(f"♻️ 辨識結果快取命中 ({'相同圖片' if match == 'exact' else '近似圖片'})：{card_info.get('name')} #{card_info.get('number')}")
+        _debug_log(f"Step 1 OK (vision cache, {match}): {card_info.get('name')} #{card_info.get('number')}")
+        return card_info
+
+    card_info = await _analyze_card_image_llm(image_path, api_key, lang)
+    if _valid_card_info(card_info):
+        try:
+            _vision_cache.put(sha, image_dhash, card_info, lang, aspect=aspect)
+        except sqlite3.Error as e:
+            _debug_log(f"辨識結果快取寫入失敗 (忽略): {e}")
+    return card_info
+
+async def _analyze_card_image_llm(image_path, api_key, lang="zh"):
+    """
+    OpenAI 為主、MiniMax 為備援 (未設定 OPENAI_API_KEY 時只用 MiniMax)。
+    VISION_HEDGE 開啟時兩者可能同時進行 (見上方說明)；關閉時為依序備援。
+    """
+    openai_key = os.getenv("OPENAI_API_KEY")
+    if not openai_key:
+        print("⚠️ 未設定 OPENAI_API_KEY，直接使用 Minimax 辨識。")
+        return await analyze_image_with_minimax(image_path, api_key, lang=lang)
+    if not api_key:
+        info = await _timed_openai(image_path, openai_key, lang)
+        return info if _valid_card_info(info) else None
+
+    if not VISION_HEDGE:
+        info = await _timed_openai(image_path, openai_key, lang)
+        if _valid_card_info(info):
+            return info
+        _push_notify("⚠️ GPT-4o-mini 無回應，切換至 Minimax 備援重試...")
+        print("⚠️ GPT-4o-mini 辨識失敗，切換至 Minimax...")
+        info = await analyze_image_with_minimax(image_path, api_key, lang=lang, fallback=False)
+        return info if _valid_card_info(info) else None
+
+    delay = _vision_hedge_delay()
+    primary = asyncio.create_task(_timed_openai(image_path, openai_key, lang))
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done:
+            info = primary.result()
+            if _valid_card_info(info):
+                return info
+            print("⚠️ GPT-4o-mini 辨識失敗，切換至 Minimax...")
+            pending = set()
+        else:
+            _debug_log(f"Vision hedge: GPT-4o-mini 超過 {delay:.1f}s 未回應，同時送出 Minimax")
+        pending.add(asyncio.create_task(analyze_image_with_minimax(image_path, api_key, lang=lang, fallback=False)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                info = task.result() if not task.cancelled() and task.exception() is None else None
+                if _valid_card_info(info):
+                    _debug_log(f"Vision hedge: 採用 {'GPT-4o-mini' if task is primary else 'Minimax'} 的結果")
+                    return info
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+def _search_pricecharting_shared(name, number, set_code, grade, is_alt_art, category="Pokemon", is_flagship=False, return_candidates=False, card_language=""):
+    key = _card_flight_key("pc", name, number, set_code, grade, bool(is_alt_art), _flight_norm(category),
+                           bool(is_flagship), bool(return_candidates), _flight_norm(card_language))
+    return _card_flights.do(key, search_pricecharting, name, number, set_code, grade, is_alt_art,
+                            category, is_flagship, return_candidates, card_language=card_language)
+
+def _search_snkrdunk_shared(name, jp_name, number, set_code, grade, is_alt_art=False, card_language="JP",
+                            snkr_variant_kws=None, return_candidates=False, jpy_rate=None):
+    key = _card_flight_key("snkr", name, number, set_code, grade, bool(is_alt_art), _flight_norm(jp_name),
+                           _flight_norm(card_language), tuple(snkr_variant_kws or ()), bool(return_candidates),
+                           round(jpy_rate, 4) if jpy_rate else None)
+    return _card_flights.do(key, search_snkrdunk, name, jp_name, number, set_code, grade, is_alt_art,
+                            card_language, snkr_variant_kws, return_candidates, "", jpy_rate)
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--image_path", nargs='+', required=True, help="卡片圖片的本機路徑 (可傳入多張圖片)")
@@ -1252,11 +2334,17 @@ def main():
     parser.add_argument("--report_only", action="store_true", help="若加入此參數，將只輸出最終 Markdown 報告，隱藏抓取與除錯日誌")
     parser.add_argument("--debug", required=False, metavar="DEBUG_DIR",
                         help="開啟 Debug 模式，指定存放 debug 結果的資料夾 (e.g. ./debug)")
+    parser.add_argument("--pc_fast", action="store_true",
+                        help="PriceCharting 快速模式：高信心候選直接使用搜尋頁的指南價，不抓商品頁的成交紀錄")
     
     args = parser.parse_args()
     
-    global REPORT_ONLY, DEBUG_DIR
+    global REPORT_ONLY, DEBUG_DIR, PC_FAST_MODE, PC_FAST_PREFETCH
     REPORT_ONLY = args.report_only
+    if args.pc_fast:
+        PC_FAST_MODE = True
+    # CLI 執行完即結束，背景補抓會在寫入價格資料庫前被中斷，只會白白消耗 Jina 額度
+    PC_FAST_PREFETCH = False
 
     # 建立本次執行的 session 根目錄 (含時間戳)
     debug_session_root = None
@@ -1279,7 +2367,8 @@ def main():
         # Pass index and session root to process_single_image for proper debug directory isolation
         asyncio.run(process_single_image(img_path, api_key, args.out_dir, 
                                          debug_session_root=debug_session_root, 
-                                         batch_index=idx))
+                                         batch_index=idx,
+                                         jina_priority=PRIORITY_BATCH if total > 1 else None))
 
 async def process_single_image(
     image_path,
@@ -1291,6 +2380,7 @@ async def process_single_image(
     debug_session_root=None,
     batch_index=1,
     external_card_info=None,
+    jina_priority=None,
 ):
     if not external_card_info and (not image_path or not os.path.exists(image_path)):
         print(f"❌ Error: 找不到圖片檔案 -> {image_path}", force=True)
@@ -1309,25 +2399,20 @@ async def process_single_image(
         print(f"🔍 Debug 子資料夾: {per_image_dir}")
 
     _notify_msgs_var.set([])
+    if jina_priority is not None:
+        set_jina_priority(jina_priority)
+    # 本次請求的匯率快照：後續 SNKRDUNK 換算、報告、海報都使用同一個值
+    jpy_rate = get_exchange_rate()
 
     # 第一階段：取得卡片資訊（外部 JSON 或視覺辨識）
     if external_card_info:
         card_info = external_card_info
         print("📡 使用外部 card_info，跳過影像辨識。")
     else:
-        openai_key = os.getenv("OPENAI_API_KEY")
-        if openai_key:
-            card_info = await analyze_image_with_openai(image_path, openai_key, lang=lang)
-            if not card_info:
-                _push_notify("⚠️ GPT-4o-mini 無回應，切換至 Minimax 備援重試...")
-                print("⚠️ GPT-4o-mini 辨識失敗，切換至 Minimax...")
-                card_info = await analyze_image_with_minimax(image_path, api_key, lang=lang)
-        else:
-            print("⚠️ 未設定 OPENAI_API_KEY，直接使用 Minimax 辨識。")
-            card_info = await analyze_image_with_minimax(image_path, api_key, lang=lang)
+        card_info = await analyze_card_image(image_path, api_key, lang=lang)
 
         if not card_info:
-            if not openai_key:
+            if not os.getenv("OPENAI_API_KEY"):
                 err_msg = "❌ 卡片辨識失敗：未設定 OPENAI_API_KEY，且 Minimax API 亦無回應。請聯繫管理員設定 OpenAI 金鑰。"
             else:
                 err_msg = "❌ 卡片影像辨識失敗：GPT-4o-mini 及 Minimax 備援均無法解析此圖片，請確認圖片清晰度並重試。"
@@ -1395,10 +2480,12 @@ async def process_single_image(
     # 第二階段：抓取市場資料
     print("--------------------------------------------------")
     print(f"🌐 正在從網路(PC & SNKRDUNK)抓取市場行情 (異圖/特殊版: {is_alt_art})...")
-    loop = asyncio.get_running_loop()
+    # PriceCharting 搜尋刻意維持同步版 (在 "jina" 池中執行，限流時執行緒會等 token)：
+    # 搜尋流程 (resolved index / 目錄 / speculative 查詢 / 商品頁) 與 CLI 共用且以執行緒合併相同請求，
+    # 改成 fetch_jina_markdown_async 需要整份重寫；等待只佔用 "jina" 池，不影響其他工作負載
     pc_result, snkr_result = await asyncio.gather(
-        loop.run_in_executor(None, contextvars.copy_context().run, search_pricecharting, name, number, set_code, grade, is_alt_art, category, is_flagship),
-        loop.run_in_executor(None, contextvars.copy_context().run, search_snkrdunk, name, jp_name, number, set_code, grade, is_alt_art, card_language, snkr_variant_kws),
+        executors.run("jina", _search_pricecharting_shared, name, number, set_code, grade, is_alt_art, category, is_flagship, False, card_language),
+        executors.run("scrape", _search_snkrdunk_shared, name, jp_name, number, set_code, grade, is_alt_art, card_language, snkr_variant_kws, False, jpy_rate),
     )
 
     pc_records = pc_result[0] if pc_result else None
@@ -1420,8 +2507,8 @@ async def process_single_image(
 
     _debug_log(f"Step 2 PC: {len(pc_records) if pc_records else 0} 筆, url={pc_url}")
     _debug_log(f"Step 2 SNKR: {len(snkr_records) if snkr_records else 0} 筆, img={img_url}, url={snkr_url}")
-    _debug_save("step2_pc.json", json.dumps(pc_records or [], indent=2, ensure_ascii=False))
-    _debug_save("step2_snkr.json", json.dumps(snkr_records or [], indent=2, ensure_ascii=False))
+    _debug_save("step2_pc.json", json.dumps(as_dicts(pc_records or []), indent=2, ensure_ascii=False))
+    _debug_save("step2_snkr.json", json.dumps(as_dicts(snkr_records or []), indent=2, ensure_ascii=False))
     _debug_save("step2_meta.json", json.dumps({
         "pc_url": pc_url,
         "pc_records_count": len(pc_records) if pc_records else 0,
@@ -1430,7 +2517,6 @@ async def process_single_image(
         "snkr_img_url": img_url,
     }, indent=2, ensure_ascii=False))
 
-    jpy_rate = get_exchange_rate()
     return await finish_report_after_selection(
         card_info,
         pc_records,
@@ -1482,50 +2568,32 @@ async def finish_report_after_selection(
     ):
         img_url = pc_img_url
 
-    async def _parse_d(d_str):
-        d_str = str(d_str).strip()
-        if "前" in d_str or "ago" in d_str:
-            num_match = re.search(r'\d+', d_str)
-            if not num_match:
-                return datetime.now()
-            num = int(num_match.group(0))
-            if "分" in d_str or "minute" in d_str:
-                return datetime.now() - timedelta(minutes=num)
-            if "時間" in d_str or "hour" in d_str:
-                return datetime.now() - timedelta(hours=num)
-            if "日" in d_str or "day" in d_str:
-                return datetime.now() - timedelta(days=num)
-        for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%b %d, %Y"):
-            try:
-                return datetime.strptime(d_str, fmt)
-            except Exception:
-                pass
-        return datetime.now()
-
-    cutoff_12m = datetime.now() - timedelta(days=365)
+    pc_records = _price_store_sync("pc", pc_url, pc_records)
+    snkr_records = _price_store_sync("snkr", snkr_url, snkr_records, currency="JPY", jpy_rate=jpy_rate,
+                                     ingest=False)
 
     # 等級篩選：航海王 BGS 額外保留 PSA 10 供比對
+    pc_set = RecordSet(pc_records)
+    snkr_set = RecordSet(snkr_records)
     is_one_piece = (category.lower() == "one piece")
     is_bgs_grade = grade.upper().startswith("BGS")
     if is_one_piece and is_bgs_grade:
-        bgs_pc = [r for r in (pc_records or []) if "BGS 9.5" in r.get("grade", "").upper() or "BGS9.5" in r.get("grade", "").upper()]
-        psa_pc = [r for r in (pc_records or []) if "PSA 10" in r.get("grade", "").upper() or "PSA10" in r.get("grade", "").upper()]
-        report_pc_records = bgs_pc[:10] + psa_pc[:10]
-
-        bgs_snkr = [r for r in (snkr_records or []) if r.get("grade") in ("BGS 9.5", "BGS9.5", "BGS 10", "BGS10")]
-        psa_snkr = [r for r in (snkr_records or []) if r.get("grade") in ("S", "PSA 10", "PSA10")]
-        report_snkr_records = bgs_snkr[:10] + psa_snkr[:10]
+        report_pc_records = pc_set.grade("BGS 9.5")[:10] + pc_set.grade("PSA 10")[:10]
+        report_snkr_records = snkr_set.grade("BGS 9.5", "BGS 10")[:10] + snkr_set.grade("PSA 10")[:10]
+        # 混合等級且各取前 10 筆，統計只針對這份清單
+        pc_stats_12m = PriceArrays(report_pc_records).stats(window=365)
+        snkr_stats_12m = PriceArrays(report_snkr_records).stats(window=365)
     else:
-        report_pc_records = [r for r in (pc_records or []) if r.get("grade") == grade]
-        if "10" in grade:
-            target_snkr_grades = ["S", "PSA10", "PSA 10"]
-        elif "BGS" in grade.upper():
-            target_snkr_grades = [grade, grade.replace(" ", ""), "BGS9.5", "BGS 9.5", "BGS10", "BGS 10"]
-        elif grade.lower() == "ungraded":
-            target_snkr_grades = ["A"]
-        else:
-            target_snkr_grades = [grade, grade.replace(" ", "")]
-        report_snkr_records = [r for r in (snkr_records or []) if r.get("grade") in target_snkr_grades]
+        report_pc_records = pc_set.slice(grade, "pc")
+        report_snkr_records = snkr_set.slice(grade, "snkr")
+        # 近 12 個月統計：價格資料庫有該商品時讀彙總表，否則以 numpy 計算；
+        # 中位數無法由彙總得到，改由報告的等級切片計算
+        pc_stats_12m = report_stats(pc_set, _price_store, "pc", pc_url).stats(grade_slice(grade, "pc"), 365)
+        snkr_stats_12m = report_stats(snkr_set, _price_store, "snkr", snkr_url, currency="JPY",
+                                      jpy_rate=jpy_rate).stats(grade_slice(grade, "snkr"), 365)
+        for stats, records in ((pc_stats_12m, report_pc_records), (snkr_stats_12m, report_snkr_records)):
+            if stats["median"] is None:
+                stats["median"] = window_median(records, 365)
 
     c_name_display = c_name if c_name else jp_name if jp_name else name
     category_display = (
@@ -1563,19 +2631,13 @@ async def finish_report_after_selection(
         for r in report_pc_records[:10]:
             report_lines.append(f"📅 {r['date']}      💰 ${r['price']:.2f} USD      📝 狀態：{r['grade']}")
 
-        stats_pc_records = []
-        for r in report_pc_records:
-            parsed_date = await _parse_d(r.get("date", ""))
-            if parsed_date > cutoff_12m:
-                stats_pc_records.append(r)
-
-        if stats_pc_records:
-            prices = [r["price"] for r in stats_pc_records]
+        if pc_stats_12m["count"]:
             report_lines.append("📊 統計資料 (近 12 個月)")
-            report_lines.append(f"　💰 最高成交價：${max(prices):.2f} USD")
-            report_lines.append(f"　💰 最低成交價：${min(prices):.2f} USD")
-            report_lines.append(f"　💰 平均成交價：${sum(prices)/len(prices):.2f} USD")
-            report_lines.append(f"　📈 資料筆數：{len(prices)} 筆")
+            report_lines.append(f"　💰 最高成交價：${pc_stats_12m['max']:.2f} USD")
+            report_lines.append(f"　💰 最低成交價：${pc_stats_12m['min']:.2f} USD")
+            report_lines.append(f"　💰 平均成交價：${pc_stats_12m['mean']:.2f} USD")
+            report_lines.append(f"　💰 中位成交價：${pc_stats_12m['median']:.2f} USD")
+            report_lines.append(f"　📈 資料筆數：{pc_stats_12m['count']} 筆")
         else:
             report_lines.append("📊 統計資料 (近 12 個月無成交紀錄)")
     else:
@@ -1587,20 +2649,15 @@ async def finish_report_after_selection(
             usd_price = r["price"] / jpy_rate if jpy_rate else 0
             report_lines.append(f"📅 {r['date']}      💰 ¥{int(r['price']):,} (~${usd_price:.0f} USD)      📝 狀態：{r['grade']}")
 
-        stats_snkr_records = []
-        for r in report_snkr_records:
-            parsed_date = await _parse_d(r.get("date", ""))
-            if parsed_date > cutoff_12m:
-                stats_snkr_records.append(r)
-
-        if stats_snkr_records:
-            prices = [r["price"] for r in stats_snkr_records]
-            avg_price = sum(prices) / len(prices)
+        if snkr_stats_12m["count"]:
+            avg_price = snkr_stats_12m['mean']
+            median_price = snkr_stats_12m['median']
             report_lines.append("📊 統計資料 (近 12 個月)")
-            report_lines.append(f"　💰 最高成交價：¥{int(max(prices)):,} (~${max(prices)/jpy_rate:.0f} USD)")
-            report_lines.append(f"　💰 最低成交價：¥{int(min(prices)):,} (~${min(prices)/jpy_rate:.0f} USD)")
+            report_lines.append(f"　💰 最高成交價：¥{int(snkr_stats_12m['max']):,} (~${snkr_stats_12m['max']/jpy_rate:.0f} USD)")
+            report_lines.append(f"　💰 最低成交價：¥{int(snkr_stats_12m['min']):,} (~${snkr_stats_12m['min']/jpy_rate:.0f} USD)")
             report_lines.append(f"　💰 平均成交價：¥{int(avg_price):,} (~${avg_price/jpy_rate:.0f} USD)")
-            report_lines.append(f"　📈 資料筆數：{len(prices)} 筆")
+            report_lines.append(f"　💰 中位成交價：¥{int(median_price):,} (~${median_price/jpy_rate:.0f} USD)")
+            report_lines.append(f"　📈 資料筆數：{snkr_stats_12m['count']} 筆")
         else:
             report_lines.append("📊 統計資料 (近 12 個月無成交紀錄)")
     else:
@@ -1638,18 +2695,24 @@ async def finish_report_after_selection(
             final_report,
             {
                 "card_info": card_info_for_poster,
-                "snkr_records": snkr_records if snkr_records else [],
-                "pc_records": pc_records if pc_records else [],
+                "snkr_records": as_dicts(snkr_records) if snkr_records else [],
+                "pc_records": as_dicts(pc_records) if pc_records else [],
                 "out_dir": final_dest_dir,
                 "poster_version": poster_version,
+                "jpy_rate": jpy_rate,
+                "pc_url": pc_url,
+                "snkr_url": snkr_url,
             },
         )
 
     if REPORT_ONLY:
         report_data = {
             "card_info": card_info_for_poster,
-            "snkr_records": snkr_records if snkr_records else [],
-            "pc_records": pc_records if pc_records else [],
+            "snkr_records": as_dicts(snkr_records) if snkr_records else [],
+            "pc_records": as_dicts(pc_records) if pc_records else [],
+            "jpy_rate": jpy_rate,
+            "pc_url": pc_url,
+            "snkr_url": snkr_url,
         }
         with open(os.path.join(final_dest_dir, "report_data.json"), "w", encoding="utf-8") as f:
             json.dump(report_data, f, ensure_ascii=False, indent=2)
@@ -1660,6 +2723,9 @@ async def finish_report_after_selection(
             pc_records if pc_records else [],
             out_dir=final_dest_dir,
             template_version=poster_version,
+            jpy_rate=jpy_rate,
+            pc_url=pc_url,
+            snkr_url=snkr_url,
         )
         return (final_report, out_paths)
 
@@ -1675,6 +2741,9 @@ async def generate_posters(poster_data):
         poster_data["pc_records"],
         out_dir=poster_data["out_dir"],
         template_version=poster_data.get("poster_version", "v3"),
+        jpy_rate=poster_data.get("jpy_rate"),
+        pc_url=poster_data.get("pc_url"),
+        snkr_url=poster_data.get("snkr_url"),
     )
 
 async def process_image_for_candidates(image_path, api_key, lang="zh"):
@@ -1682,13 +2751,7 @@ async def process_image_for_candidates(image_path, api_key, lang="zh"):
     if not os.path.exists(image_path):
         return None, "找不到圖片檔案"
         
-    openai_key = os.getenv("OPENAI_API_KEY")
-    if openai_key:
-        card_info = await analyze_image_with_openai(image_path, openai_key, lang=lang)
-        if not card_info:
-            card_info = await analyze_image_with_minimax(image_path, api_key, lang=lang)
-    else:
-        card_info = await analyze_image_with_minimax(image_path, api_key, lang=lang)
+    card_info = await analyze_card_image(image_path, api_key, lang=lang)
     if not card_info:
         return None, "卡片影像辨識失敗"
     
@@ -1732,10 +2795,10 @@ async def process_image_for_candidates(image_path, api_key, lang="zh"):
         elif any(kw in features_lower for kw in ["パラレル", "sr parallel", "parallel art"]):
             snkr_variant_kws = ["パラレル", "-p"]
 
-    loop = asyncio.get_running_loop()
+    # 同 process_single_image：PriceCharting 搜尋刻意維持同步版，在 "jina" 池中執行
     pc_result, snkr_result = await asyncio.gather(
-        loop.run_in_executor(None, contextvars.copy_context().run, search_pricecharting, name, number, set_code, grade, is_alt_art, category, is_flagship, True),
-        loop.run_in_executor(None, contextvars.copy_context().run, search_snkrdunk, name, jp_name, number, set_code, grade, is_alt_art, card_language, snkr_variant_kws, True),
+        executors.run("jina", _search_pricecharting_shared, name, number, set_code, grade, is_alt_art, category, is_flagship, True),
+        executors.run("scrape", _search_snkrdunk_shared, name, jp_name, number, set_code, grade, is_alt_art, card_language, snkr_variant_kws, True),
     )
     
     pc_candidates = (pc_result[0] if pc_result else None) or []
@@ -1746,7 +2809,7 @@ async def process_image_for_candidates(image_path, api_key, lang="zh"):
         "snkr": snkr_candidates
     }
 
-def _fetch_snkr_prices_from_url_direct(product_url):
+def _fetch_snkr_prices_from_url_direct(product_url, jpy_rate=None):
     product_id_match = re.search(r'apparels/(\d+)', product_url)
     product_id = product_id_match.group(1) if product_id_match else None
     img_url = ""
@@ -1754,23 +2817,9 @@ def _fetch_snkr_prices_from_url_direct(product_url):
     if not product_id:
         return records, img_url
 
-    session = _create_snkr_api_session()
-    jpy_rate = get_exchange_rate()
-    hist_url = f"https://snkrdunk.com/en/v1/streetwears/{product_id}/trading-histories?perPage=100&page=1"
-    hist_data = _snkr_api_get_json(session, hist_url)
-    histories = hist_data.get("histories", []) if isinstance(hist_data, dict) else []
-
-    for h in histories:
-        date_found = _snkr_traded_date(h.get("tradedAt", ""))
-        grade_found = str(h.get("condition", "")).strip() or "Unknown"
-        price_jpy = _snkr_history_to_jpy(h, jpy_rate)
-        if date_found and grade_found and price_jpy:
-            records.append({
-                "date": date_found,
-                "price": price_jpy,
-                "grade": grade_found
-            })
-    
+    if jpy_rate is None:
+        jpy_rate = get_exchange_rate()
+    records = _snkr_product_records(product_id, product_url, jpy_rate)
     return records, img_url
 
 async def generate_report_from_selected(card_info, pc_url, snkr_url):
@@ -1788,21 +2837,27 @@ async def generate_report_from_selected(card_info, pc_url, snkr_url):
     jp_name = card_info.get("jp_name", "")
     c_name = card_info.get("c_name", "")
 
-    loop = asyncio.get_running_loop()
+    jpy_rate = get_exchange_rate()
     
     pc_records, pc_img_url = [], ""
     if pc_url:
-        res = await loop.run_in_executor(None, contextvars.copy_context().run, _fetch_pc_prices_from_url, pc_url, None, False, grade)
+        # 先以 async 路徑取得頁面 (限流等待不佔執行緒)，再交給 executor 解析
+        pc_parser = PcMarkdownParser(tail_lines=PC_STREAM_TAIL_LINES)
+        pc_md = await fetch_jina_markdown_async(pc_url, parser=pc_parser)
+        res = await executors.run("jina", _fetch_pc_prices_shared, pc_url, pc_md, False, grade, pc_parser)
         pc_records = res[0] if res else []
         pc_img_url = res[2] if res else ""
 
     snkr_records, img_url = [], ""
     if snkr_url:
-        res = await loop.run_in_executor(None, contextvars.copy_context().run, _fetch_snkr_prices_from_url_direct, snkr_url)
+        res = await executors.run("scrape", _fetch_snkr_prices_from_url_direct, snkr_url, jpy_rate)
         snkr_records = res[0] if res else []
         img_url = res[1] if res else ""
 
-    jpy_rate = get_exchange_rate()
+    pc_records = _price_store_sync("pc", pc_url, pc_records)
+    snkr_records = _price_store_sync("snkr", snkr_url, snkr_records, currency="JPY", jpy_rate=jpy_rate,
+                                     ingest=False)
+
     c_name_display = c_name if c_name else jp_name if jp_name else name
     
     report_lines = []
@@ -1826,7 +2881,7 @@ async def generate_report_from_selected(card_info, pc_url, snkr_url):
     
     report_lines.append("🏦 PriceCharting 成交紀錄")
     if pc_records:
-        filtered_pc = [r for r in pc_records if r.get('grade') == grade]
+        filtered_pc = RecordSet(pc_records).slice(grade, "pc")
         if filtered_pc:
             for r in filtered_pc[:10]:
                 report_lines.append(f"📅 {r.get('date','')}      💰 ${r.get('price','')} USD      📝 狀態：{r.get('grade','')}")
@@ -1838,22 +2893,14 @@ async def generate_report_from_selected(card_info, pc_url, snkr_url):
     
     report_lines.append("\n---\n🏰 SNKRDUNK 成交紀錄")
     if snkr_records:
-        valid_snkr_grades = []
-        if '10' in grade:
-            valid_snkr_grades = ['S', 'PSA10', 'PSA 10']
-        elif grade.lower() == 'ungraded':
-            valid_snkr_grades = ['A']
-        else:
-            valid_snkr_grades = [grade, grade.replace(' ', '')]
-            
-        filtered_snkr = [r for r in snkr_records if r.get('grade') in valid_snkr_grades]
+        filtered_snkr = RecordSet(snkr_records).slice(grade, "snkr")
         if not filtered_snkr: 
             filtered_snkr = snkr_records # fallback to all if none match exactly
             
         for r in filtered_snkr[:10]:
             p_val = r.get('price', 0)
             usd_str = f" (~${p_val/jpy_rate:.0f} USD)" if jpy_rate and p_val else ""
-            report_lines.append(f"📅 {r.get('date','')}      💰 ¥{p_val:,}{usd_str}      📝 狀態：{r.get('grade','')}")
+            report_lines.append(f"📅 {r.get('date','')}      💰 ¥{int(p_val):,}{usd_str}      📝 狀態：{r.get('grade','')}")
     else:
         report_lines.append("SNKRDUNK: 無此卡片資料")
         
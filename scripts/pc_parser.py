@@ -0,0 +1,202 @@
+import re
+from datetime import datetime
+
+from price_records import PriceRecord, sort_newest_first
+
+# 舊版 Markdown table：任一欄是日期的表格列 (日期取第一欄)
+_TABLE_DATE_RE = re.compile(r'\|\s*(\d{4}-\d{2}-\d{2}|[A-Z][a-z]{2}\s\d{1,2},\s\d{4})\s*\|')
+# Jina 新版 TSV：日期獨立一行，標題與價格在之後的行
+_TSV_DATE_RE = re.compile(r'^(\d{4}-\d{2}-\d{2}|[A-Z][a-z]{2}\s\d{1,2},\s\d{4})')
+_PRICE_RE = re.compile(r'\$([\d,]+\.\d{2})')
+# 摘要表："PSA 10 $123.45" (比對時去掉空白)
+_SUMMARY_RE = re.compile(r'^(Ungraded|PSA10|PSA9|BGS9\.5)\$([\d,]+\.\d{2})$')
+_SUMMARY_GRADES = {"Ungraded": "Ungraded", "PSA10": "PSA 10", "PSA9": "PSA 9", "BGS9.5": "BGS 9.5"}
+# 運費等非成交價
+_IGNORED_PRICES = ('6.00',)
+# 串流解析：最後一筆成交之後再連續這麼多行都沒有成交，視為成交區塊已結束
+STREAM_TAIL_LINES = 150
+
+_GRADE_10_RE = re.compile(r'(psa|cgc|bgs|grade|gem)10')
+_GRADE_BGS95_RE = re.compile(r'bgs\s*9\.5')
+_GRADE_9_RE = re.compile(r'(psa|cgc|bgs|grade|gem)9')
+_GRADE_8_RE = re.compile(r'(psa|cgc|bgs|grade|gem)8')
+_GRADED_RE = re.compile(r'(psa|bgs|cgc|grade|gem)')
+
+# 依優先順序：前面的樣式只要在頁面任何位置出現就優先採用
+_IMAGE_RES = tuple(re.compile(p) for p in (
+    r'!\[.*?\]\((https://storage\.googleapis\.com/images\.pricecharting\.com/[^/)]+/\d+\.jpg)\)',
+    r'!\[.*?\]\((https://product-images\.s3\.amazonaws\.com/[^\)]+)\)',
+    r'!\[.*?\]\((https://images\.pricecharting\.com/[^\)]+)\)',
+    r'!\[.*?\]\((https://[^)]+?pricecharting\.com/[^)]+?\.(?:jpg|png|webp)[^)]*)\)',
+    r'!\[.*?\]\((https://[^)]+?\.(?:jpg|png|webp)[^)]*)\)',
+))
+
+
+def detect_grade(line, with_psa8=True):
+    """成交標題 → 等級；有鑑定字樣但辨識不出等級時回傳 None (該筆略過)。"""
+    title = line.replace(" ", "").lower()
+    if _GRADE_10_RE.search(title) or ("psa" in title and "10" in title):
+        return "PSA 10"
+    if _GRADE_BGS95_RE.search(title):
+        return "BGS 9.5"
+    if _GRADE_9_RE.search(title) or ("psa" in title and "9" in title):
+        return "PSA 9"
+    if with_psa8 and (_GRADE_8_RE.search(title) or ("psa" in title and "8" in title)):
+        return "PSA 8"
+    if not _GRADED_RE.search(title):
+        return "Ungraded"
+    return None
+
+
+def _sale_price(line):
+    prices = [p for p in _PRICE_RE.findall(line) if p not in _IGNORED_PRICES]
+    return float(prices[-1].replace(',', '')) if prices else None
+
+
+class PcMarkdownParser:
+    """
+    PriceCharting 商品頁 (Jina markdown) 的單次掃描解析器。
+
+    feed() 可以分段餵入 (例如邊下載邊解析)，每一行只看一次，同時收集：
+    table 格式成交、TSV 格式成交、摘要價與卡圖 URL。close() 時套用原本的規則：
+    有 table 成交就用 table，否則用 TSV；摘要價只補成交中沒有的等級。
+
+    done 為 True 時 (已看到成交、摘要價與最高優先的卡圖，且成交區塊之後已過
+    tail_lines 行)，後面的內容不會再改變結果，串流下載可以提前關閉連線。
+    """
+
+    def __init__(self, tail_lines=STREAM_TAIL_LINES):
+        self.tail_lines = tail_lines
+        self._pending = ""
+        self._table = []
+        self._tsv = []
+        self._tsv_date = None
+        self._summary = []
+        self._images = [None] * len(_IMAGE_RES)
+        self._quiet = 0
+        self.lines = 0
+
+    def feed(self, chunk):
+        """餵入任意長度的片段；回傳 done。"""
+        text = self._pending + chunk
+        lines = text.split('\n')
+        self._pending = lines.pop()
+        for line in lines:
+            self.feed_line(line)
+        return self.done
+
+    def feed_line(self, line):
+        self.lines += 1
+        self._quiet += 1
+        if '|' in line and _TABLE_DATE_RE.search(line):
+            parts = line.split('|')
+            if len(parts) >= 5:
+                price = _sale_price(line)
+                if price is not None:
+                    grade = detect_grade(line)
+                    if grade:
+                        self._table.append((parts[1].strip(), price, grade))
+                        self._quiet = 0
+
+        stripped = line.strip()
+        m = _TSV_DATE_RE.match(stripped)
+        if m:
+            self._tsv_date = m.group(1)
+        elif '$' in line:
+            if self._tsv_date:
+                price = _sale_price(stripped)
+                if price is not None:
+                    grade = detect_grade(stripped, with_psa8=False)
+                    if grade:
+                        self._tsv.append((self._tsv_date, price, grade))
+                        self._quiet = 0
+            m = _SUMMARY_RE.match(line.replace(' ', ''))
+            if m:
+                self._summary.append((_SUMMARY_GRADES[m.group(1)], float(m.group(2).replace(',', ''))))
+
+        if self._images[0] is None and '![' in line:
+            for i, pattern in enumerate(_IMAGE_RES):
+                if self._images[i] is None:
+                    m = pattern.search(line)
+                    if m:
+                        self._images[i] = m.group(1)
+
+    @property
+    def sale_count(self):
+        return len(self._table) or len(self._tsv)
+
+    @property
+    def done(self):
+        return bool(self.sale_count and self._summary and self._images[0] is not None
+                    and self._quiet >= self.tail_lines)
+
+    def close(self):
+        """Returns (records, img_url)；records 含摘要價 (note="PC avg price")，由新到舊。"""
+        if self._pending:
+            line, self._pending = self._pending, ""
+            self.feed_line(line)
+        sales = self._table or self._tsv
+        records = [PriceRecord(d, price, grade) for d, price, grade in sales]
+        existing = {grade for _, _, grade in sales}
+        today_str = datetime.now().strftime('%Y-%m-%d')
+        for grade, price in self._summary:
+            if grade not in existing:
+                records.append(PriceRecord(today_str, price, grade, note="PC avg price"))
+        sort_newest_first(records)
+        img_url = next((url for url in self._images if url), None)
+        return records, img_url
+
+
+# ── 搜尋結果頁 ──────────────────────────────────────────────────────────────
+# 搜尋結果表格每列是一個商品，欄位為各等級的指南價 (表頭 "Ungraded | Grade 9 | PSA 10")
+_PRODUCT_URL_RE = re.compile(r'(https://www\.pricecharting\.com/game/[^/]+/[^" )\]]+)')
+_MD_LINK_RE = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+_CELL_PRICE_RE = re.compile(r'^\$([\d,]+\.\d{2})$')
+_SEARCH_COLUMNS = {"ungraded": "Ungraded", "grade9": "PSA 9", "psa9": "PSA 9", "psa10": "PSA 10", "bgs9.5": "BGS 9.5"}
+
+
+def _search_header(cells):
+    columns = {}
+    for i, cell in enumerate(cells):
+        label = re.sub(r'\s+', '', _MD_LINK_RE.sub(r'\1', cell)).lower()
+        if label in _SEARCH_COLUMNS:
+            columns[i] = _SEARCH_COLUMNS[label]
+    return columns
+
+
+def parse_pc_search_prices(md_content):
+    """
+    搜尋結果頁的各商品指南價：{product_url: (records, img_url)}，records 為
+    PriceRecord (note="PC avg price"，日期為今天)。依表頭對應欄位，沒有可辨識的
+    表頭時回傳空 dict (呼叫端改抓商品頁)。
+    """
+    today_str = datetime.now().strftime('%Y-%m-%d')
+    columns = {}
+    results = {}
+    for line in (md_content or "").split('\n'):
+        if '|' not in line:
+            continue
+        cells = [c.strip() for c in line.split('|')]
+        if '$' not in line:
+            header = _search_header(cells)
+            if header:
+                columns = header
+            continue
+        m = _PRODUCT_URL_RE.search(line)
+        if not (m and columns) or m.group(1) in results:
+            continue
+        records = []
+        for i, grade in columns.items():
+            pm = _CELL_PRICE_RE.match(cells[i]) if i < len(cells) else None
+            if pm:
+                records.append(PriceRecord(today_str, float(pm.group(1).replace(',', '')), grade, note="PC avg price"))
+        img_url = next((im.group(1) for im in (pattern.search(line) for pattern in _IMAGE_RES) if im), None)
+        results[m.group(1)] = (records, img_url)
+    return results
+
+
+def parse_pc_markdown(md_content):
+    """Returns (records, img_url)，見 PcMarkdownParser。"""
+    parser = PcMarkdownParser()
+    parser.feed(md_content or "")
+    return parser.close()
@@ -0,0 +1,284 @@
+import re
+from datetime import date, datetime, timedelta
+from enum import IntEnum
+
+# 成交日期統一轉成 epoch day (1970-01-01 起算的天數，int)，比較 / 排序 / 時間窗都用整數
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%b %d, %Y")
+_RELATIVE_UNITS = (
+    (("日前", "day"), "days"),
+    (("小時前", "時間前", "hour"), "hours"),
+    (("分前", "minute", "min"), "minutes"),
+)
+
+
+def epoch_day(d):
+    return d.toordinal() - _EPOCH_ORDINAL
+
+
+def today_epoch_day():
+    return epoch_day(date.today())
+
+
+def day_to_date(day):
+    return date.fromordinal(day + _EPOCH_ORDINAL)
+
+
+def day_to_iso(day):
+    return day_to_date(day).isoformat() if day is not None else ""
+
+
+def is_relative_date(text):
+    """"3日前" / "5時間前" / "3 days ago" 這類相對時間 (換算結果取決於解析的時刻)。"""
+    text = str(text or '')
+    return "前" in text or "ago" in text
+
+
+def parse_epoch_day(text, now=None):
+    """
+    "2026-01-20" / "2026/01/20" / "Jan 20, 2026" / "2026-01-20T10:00:00Z" /
+    "3日前" / "5時間前" / "10分前" / "3 days ago" -> epoch day；無法解析時回傳 None。
+    相對時間以 now (預設現在時刻) 換算。
+    """
+    text = str(text or '').strip()
+    if not text:
+        return None
+    if is_relative_date(text):
+        m = re.search(r'\d+', text)
+        if not m:
+            return None
+        now = now or datetime.now()
+        for markers, unit in _RELATIVE_UNITS:
+            if any(marker in text for marker in markers):
+                return epoch_day((now - timedelta(**{unit: int(m.group(0))})).date())
+        return epoch_day(now.date())
+    if "T" in text and re.match(r'\d{4}-\d{2}-\d{2}T', text):
+        text = text.split("T", 1)[0]
+    for fmt in _DATE_FORMATS:
+        try:
+            return epoch_day(datetime.strptime(text, fmt).date())
+        except ValueError:
+            continue
+    return None
+
+
+# SNKRDUNK / PriceCharting / 辨識結果的等級別名 → canonical 等級
+# (SNKRDUNK 的 S 對應 PSA 10、A 對應裸卡，與報告一直以來的比對方式相同)
+_GRADE_ALIASES = {
+    "S": "PSA 10",
+    "A": "Ungraded",
+    "裸卡": "Ungraded",
+    "UNGRADED": "Ungraded",
+    "RAW": "Ungraded",
+    "UNKNOWN": "Unknown",
+}
+_GRADED_RE = re.compile(r'^(PSA|BGS|CGC|SGC|ARS)(\d+(?:\.5)?)$')
+
+
+def canonical_grade(label):
+    """
+    "PSA10" / "PSA 10" / "S" -> "PSA 10"；"A" / "裸卡" / "ungraded" -> "Ungraded"；
+    "BGS9.5" -> "BGS 9.5"。其他標籤去空白後轉大寫 (例如 SNKRDUNK 的 "B")。
+    """
+    compact = re.sub(r'\s+', '', str(label or '')).upper()
+    if compact in _GRADE_ALIASES:
+        return _GRADE_ALIASES[compact]
+    m = _GRADED_RE.match(compact)
+    if m:
+        return f"{m.group(1)} {m.group(2)}"
+    return compact
+
+
+def grade_slice(target, source="pc"):
+    """報告目標等級在該來源要取的 canonical 等級 (tuple)。"""
+    canon = canonical_grade(target)
+    if canon == "Unknown":
+        return ("Unknown", "Ungraded")
+    if source == "snkr" and canon.startswith("BGS"):
+        # SNKRDUNK 的 BGS 成交稀少，9.5 / 10 合併看
+        return tuple(dict.fromkeys((canon, "BGS 9.5", "BGS 10")))
+    return (canon,)
+
+
+def grade_matcher(grades):
+    """原始等級標籤的 predicate：canonical_grade(label) 屬於 grades 時為 True (例如過濾原始 condition 字串)。"""
+    wanted = frozenset(grades)
+    return lambda label: canonical_grade(label) in wanted
+
+
+class Grade(IntEnum):
+    """canonical 等級的列舉；未列出的等級為 OTHER。"""
+    OTHER = 0
+    UNGRADED = 1
+    PSA_8 = 2
+    PSA_9 = 3
+    PSA_10 = 4
+    BGS_9_5 = 5
+    BGS_10 = 6
+    SNKR_B = 7
+    SNKR_C = 8
+    SNKR_D = 9
+    UNKNOWN = 10
+
+
+_GRADE_CODES = {
+    "Ungraded": Grade.UNGRADED,
+    "PSA 8": Grade.PSA_8,
+    "PSA 9": Grade.PSA_9,
+    "PSA 10": Grade.PSA_10,
+    "BGS 9.5": Grade.BGS_9_5,
+    "BGS 10": Grade.BGS_10,
+    "B": Grade.SNKR_B,
+    "C": Grade.SNKR_C,
+    "D": Grade.SNKR_D,
+    "Unknown": Grade.UNKNOWN,
+}
+
+
+def grade_code(label):
+    return _GRADE_CODES.get(canonical_grade(label), Grade.OTHER)
+
+
+class PriceRecord:
+    """
+    一筆成交 (或 PriceCharting 摘要價，note 不為 None)。
+
+    日期與等級只在建立時解析一次：day 為 epoch day (無法解析時 None)，
+    canonical 為 canonical_grade()，grade_code 為對應的 Grade。
+    date / grade 保留原始字串供報告顯示。
+    仍支援 r['date'] / r.get('grade') 的讀取方式；寫成 JSON 時用 as_dicts()。
+    """
+
+    __slots__ = ("date", "day", "price", "grade", "canonical", "grade_code", "note")
+
+    _KEYS = ("date", "price", "grade", "note")
+
+    def __init__(self, date_text, price, grade, note=None, day=None, now=None):
+        self.date = str(date_text or '')
+        self.day = parse_epoch_day(self.date, now) if day is None else day
+        self.price = float(price)
+        self.grade = str(grade or '')
+        self.canonical = canonical_grade(self.grade)
+        self.grade_code = _GRADE_CODES.get(self.canonical, Grade.OTHER)
+        self.note = note
+
+    @classmethod
+    def from_dict(cls, d, now=None):
+        return cls(d.get("date"), d.get("price", 0), d.get("grade", ""), note=d.get("note"), now=now)
+
+    def to_dict(self):
+        d = {"date": self.date, "price": self.price, "grade": self.grade}
+        if self.note is not None:
+            d["note"] = self.note
+        return d
+
+    def keys(self):
+        return [k for k in self._KEYS if k != "note" or self.note is not None]
+
+    def __getitem__(self, key):
+        if key not in self._KEYS or (key == "note" and self.note is None):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __eq__(self, other):
+        if not isinstance(other, PriceRecord):
+            return NotImplemented
+        return (self.day, self.price, self.grade, self.date, self.note) == \
+            (other.day, other.price, other.grade, other.date, other.note)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"PriceRecord({self.date!r}, {self.price!r}, {self.grade!r}" + \
+            (f", note={self.note!r})" if self.note is not None else ")")
+
+
+def to_records(items, now=None):
+    """dict / PriceRecord 混合的 list -> list[PriceRecord]；價格無法轉成數字的項目略過。None 原樣回傳。"""
+    if items is None:
+        return None
+    now = now or datetime.now()
+    records = []
+    for item in items:
+        if isinstance(item, PriceRecord):
+            records.append(item)
+            continue
+        try:
+            records.append(PriceRecord.from_dict(item, now))
+        except (TypeError, ValueError, AttributeError):
+            continue
+    return records
+
+
+def as_dicts(records):
+    """寫入 JSON / 回傳給外部呼叫端時使用。"""
+    if records is None:
+        return None
+    return [r.to_dict() if isinstance(r, PriceRecord) else dict(r) for r in records]
+
+
+def sort_newest_first(records):
+    """依 epoch day 由新到舊排序 (in place, stable)；無法解析日期的排最後。"""
+    records.sort(key=lambda r: -1 if r.day is None else r.day, reverse=True)
+    return records
+
+
+class RecordSet:
+    """
+    成交紀錄依 canonical 等級分桶 (建立時一次)。各消費端用 grade() / slice()
+    直接取桶，不再各自掃描整份 list；切片維持原本順序 (通常由新到舊)。
+    回傳的 list 與 RecordSet 共用，呼叫端不應修改。
+    """
+
+    __slots__ = ("records", "_buckets", "_merged")
+
+    def __init__(self, records=None):
+        self.records = to_records(records) or []
+        self._buckets = {}
+        self._merged = {}
+        for r in self.records:
+            self._buckets.setdefault(r.canonical, []).append(r)
+
+    @classmethod
+    def of(cls, records):
+        return records if isinstance(records, cls) else cls(records)
+
+    def grade(self, *grades):
+        """指定 canonical 等級的紀錄；多個等級時依原順序合併 (結果快取)。"""
+        if len(grades) == 1:
+            return self._buckets.get(grades[0], [])
+        key = ("in", frozenset(grades))
+        if key not in self._merged:
+            self._merged[key] = [r for r in self.records if r.canonical in key[1]]
+        return self._merged[key]
+
+    def excluding(self, *grades):
+        key = ("not", frozenset(grades))
+        if key not in self._merged:
+            self._merged[key] = [r for r in self.records if r.canonical not in key[1]]
+        return self._merged[key]
+
+    def slice(self, target, source="pc"):
+        """報告目標等級在該來源的紀錄 (見 grade_slice)。"""
+        return self.grade(*grade_slice(target, source))
+
+    def grades(self):
+        return list(self._buckets)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __bool__(self):
+        return bool(self.records)
@@ -0,0 +1,207 @@
+import sqlite3
+
+import numpy as np
+
+import price_store
+from price_records import RecordSet, today_epoch_day
+
+# 報告用的時間窗 (天)；0 代表全部歷史。N 天窗 = 含今天在內的最近 N 天
+STAT_WINDOWS = (30, 60, 365, 0)
+
+# 裸卡送鑑定的成本估算：約 1100 TWD (~$35 USD) 鑑定費 + 成交價 10% 的加價
+GRADING_FEE_USD = 35.0
+GRADING_UPCHARGE = 0.10
+
+
+def empty_stats():
+    return {"count": 0, "sum": 0.0, "mean": 0.0, "median": 0.0, "min": None, "max": None,
+            "first_day": None, "last_day": None}
+
+
+def _stats_from(prices, days):
+    if not len(prices):
+        return empty_stats()
+    return {
+        "count": int(len(prices)),
+        "sum": float(prices.sum()),
+        "mean": float(prices.mean()),
+        "median": float(np.median(prices)),
+        "min": float(prices.min()),
+        "max": float(prices.max()),
+        "first_day": int(days.min()),
+        "last_day": int(days.max()),
+    }
+
+
+class PriceArrays:
+    """
+    一個來源的成交紀錄轉成 numpy 陣列：day (epoch day)、price (乘上 scale，
+    例如 JPY -> USD 時傳 1/jpy_rate)、grade (canonical 等級的代碼)。
+    陣列依 (grade, price) 排序一次，之後的各等級 / 時間窗統計都是向量運算。
+    無法解析日期的紀錄視為今天成交。
+    """
+
+    __slots__ = ("grades", "days", "prices", "codes", "today", "_code_of")
+
+    def __init__(self, records=None, scale=1.0, today=None):
+        records = RecordSet.of(records).records
+        self.today = today_epoch_day() if today is None else today
+        self._code_of = {}
+        n = len(records)
+        codes = np.fromiter((self._code_of.setdefault(r.canonical, len(self._code_of)) for r in records),
+                            dtype=np.int32, count=n)
+        days = np.fromiter((self.today if r.day is None else r.day for r in records), dtype=np.int32, count=n)
+        prices = np.fromiter((r.price for r in records), dtype=np.float64, count=n) * scale
+        order = np.lexsort((prices, codes))
+        self.codes, self.days, self.prices = codes[order], days[order], prices[order]
+        self.grades = list(self._code_of)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def mask(self, grades=None, window=0, exclude=None):
+        """grades / exclude 為 canonical 等級的 iterable；window 為天數 (0 = 全部)。"""
+        m = np.ones(len(self.prices), dtype=bool)
+        if grades is not None:
+            m &= np.isin(self.codes, [self._code_of[g] for g in grades if g in self._code_of])
+        if exclude is not None:
+            m &= ~np.isin(self.codes, [self._code_of[g] for g in exclude if g in self._code_of])
+        if window:
+            m &= self.days > self.today - window
+        return m
+
+    def stats(self, grades=None, window=0, exclude=None):
+        """count / sum / mean / median / min / max / first_day / last_day。"""
+        m = self.mask(grades, window, exclude)
+        return _stats_from(self.prices[m], self.days[m])
+
+    def summary(self, windows=STAT_WINDOWS):
+        """
+        {canonical 等級: {window: stats}}。每個時間窗一次 bincount 算出所有等級的
+        count / sum，已排序的陣列直接取各段頭尾與中間位置得到 min / max / median。
+        """
+        n_grades = len(self.grades)
+        result = {g: {} for g in self.grades}
+        for window in windows:
+            m = self.mask(window=window)
+            codes, prices, days = self.codes[m], self.prices[m], self.days[m]
+            count = np.bincount(codes, minlength=n_grades)
+            total = np.bincount(codes, weights=prices, minlength=n_grades)
+            starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+            has = count > 0
+            first = np.full(n_grades, -1)
+            last = np.full(n_grades, -1)
+            if has.any():
+                first[has] = np.minimum.reduceat(days, starts[has])
+                last[has] = np.maximum.reduceat(days, starts[has])
+            lo = starts + (count - 1) // 2
+            hi = starts + count // 2
+            for code, grade in enumerate(self.grades):
+                if not has[code]:
+                    result[grade][window] = empty_stats()
+                    continue
+                result[grade][window] = {
+                    "count": int(count[code]),
+                    "sum": float(total[code]),
+                    "mean": float(total[code] / count[code]),
+                    "median": float((prices[lo[code]] + prices[hi[code]]) / 2),
+                    "min": float(prices[starts[code]]),
+                    "max": float(prices[starts[code] + count[code] - 1]),
+                    "first_day": int(first[code]),
+                    "last_day": int(last[code]),
+                }
+        return result
+
+    def daily(self, grades=None, exclude=None):
+        """每日均價與成交量：(days, mean, count)，依日期排序。"""
+        m = self.mask(grades, 0, exclude)
+        days, prices = self.days[m], self.prices[m]
+        unique_days, inverse = np.unique(days, return_inverse=True)
+        count = np.bincount(inverse)
+        mean = np.bincount(inverse, weights=prices) / np.maximum(count, 1) if len(count) else np.zeros(0)
+        return unique_days, mean, count
+
+
+def merge_stats(parts):
+    """
+    合併多份 stats (例如跨來源，各自應已是同一幣別)：count / sum / min / max / 日期範圍直接合併，
+    mean 重新計算；median 無法合併，只有一份非空時保留。
+    """
+    parts = [p for p in parts if p and p["count"]]
+    if len(parts) == 1:
+        return dict(parts[0])
+    total = empty_stats()
+    for part in parts:
+        total["count"] += part["count"]
+        total["sum"] += part["sum"]
+        for key, pick in (("min", min), ("max", max), ("first_day", min), ("last_day", max)):
+            total[key] = part[key] if total[key] is None else pick(total[key], part[key])
+    if total["count"]:
+        total["mean"] = total["sum"] / total["count"]
+        total["median"] = None
+    return total
+
+
+def window_median(records, window=0, scale=1.0, today=None):
+    """records (通常是報告的等級切片) 在時間窗內的中位價；沒有紀錄時為 0.0。"""
+    return PriceArrays(records, scale=scale, today=today).stats(window=window)["median"]
+
+
+class StoredStats:
+    """
+    與 PriceArrays.stats() 相同的介面，但 price store 內的成交直接讀彙總表
+    (price_store.combine_aggregates，O(等級數))，只有不寫入 store 的紀錄 (摘要價、相對日期)
+    在記憶體中計算後合併。median 無法由彙總得到：只有 store 外的紀錄時才有值，否則為 None。
+    """
+
+    __slots__ = ("aggregates", "extras", "currency", "jpy_rate")
+
+    def __init__(self, aggregates, extras=None, scale=1.0, currency=None, jpy_rate=None, today=None):
+        self.aggregates = aggregates
+        self.extras = PriceArrays(extras, scale=scale, today=today)
+        self.currency = currency
+        self.jpy_rate = jpy_rate
+
+    def stats(self, grades=None, window=0, exclude=None):
+        stored = price_store.combine_aggregates(self.aggregates, grades, window, exclude,
+                                                currency=self.currency, jpy_rate=self.jpy_rate)
+        return merge_stats([stored, self.extras.stats(grades, window, exclude)])
+
+
+def report_stats(records, store=None, source=None, product_url=None, currency="USD", jpy_rate=None, scale=1.0):
+    """
+    報告統計的來源。商品在 price store 中有成交時回傳 StoredStats (彙總表查詢)，
+    否則 (store 不可用、沒有商品 URL、查詢失敗) 回傳由 records 建立的 PriceArrays。
+    records 為報告使用的紀錄 (store 內的成交 + 本次的摘要價等)，價格乘上 scale 後為 currency。
+    """
+    if store is not None and product_url:
+        try:
+            aggregates = store.aggregates(source, product_url)
+        except sqlite3.Error:
+            aggregates = None
+        if aggregates:
+            extras = [r for r in RecordSet.of(records) if not price_store.is_storable(r)]
+            return StoredStats(aggregates, extras, scale=scale, currency=currency, jpy_rate=jpy_rate)
+    return PriceArrays(records, scale=scale)
+
+
+def grading_profit(max_10, avg_raw):
+    """
+    裸卡買入、送鑑定後以 PSA 10 最高成交價賣出的預估利潤。
+    可傳純量或陣列 (例如一次掃描整個收藏的所有卡片)。
+    """
+    max_10 = np.asarray(max_10, dtype=np.float64)
+    avg_raw = np.asarray(avg_raw, dtype=np.float64)
+    cost = GRADING_FEE_USD + max_10 * GRADING_UPCHARGE
+    profit = np.where((max_10 > 0) & (avg_raw > 0), max_10 - (avg_raw + cost), 0.0)
+    return float(profit) if profit.ndim == 0 else profit
+
+
+def arbitrage_stats(pc_stats):
+    """PriceCharting 全部歷史的 (avg_10, avg_9, avg_raw, profit, max_10)；pc_stats 為 PriceArrays 或 StoredStats。"""
+    stats_10 = pc_stats.stats(("PSA 10",))
+    stats_9 = pc_stats.stats(("PSA 9",))
+    stats_raw = pc_stats.stats(("Ungraded",))
+    max_10 = stats_10["max"] or 0
+    avg_10, avg_9, avg_raw = stats_10["mean"], stats_9["mean"], stats_raw["mean"]
+    return avg_10, avg_9, avg_raw, grading_profit(max_10, avg_raw), max_10
@@ -0,0 +1,412 @@
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+
+from price_records import (PriceRecord, canonical_grade, day_to_iso, epoch_day, is_relative_date, parse_epoch_day,
+                           to_records, today_epoch_day)
+
+# 彙總表的時間窗 (天)；0 代表全部歷史。N 天窗 = 含今天在內的最近 N 天 (traded_date > 今天 - N 天)，
+# 與 price_stats.STAT_WINDOWS 的定義一致。
+AGGREGATE_WINDOWS = (30, 60, 365, 0)
+
+
+def normalize_traded_date(text):
+    """"2026/01/20" / "2026-01-20" / "Jan 20, 2026" / "3日前" -> "YYYY-MM-DD"；無法解析時回傳 ""。"""
+    return day_to_iso(parse_epoch_day(text))
+
+
+def currency_factor(currency, to_currency, jpy_rate=None):
+    """currency 的價格乘上此係數即為 to_currency；to_currency 為空或幣別相同時為 1。"""
+    if not to_currency or currency == to_currency:
+        return 1.0
+    if not jpy_rate:
+        raise ValueError(f"需要 jpy_rate 才能把 {currency} 換算成 {to_currency}")
+    if (currency, to_currency) == ("USD", "JPY"):
+        return float(jpy_rate)
+    if (currency, to_currency) == ("JPY", "USD"):
+        return 1.0 / jpy_rate
+    raise ValueError(f"不支援的幣別換算: {currency} -> {to_currency}")
+
+
+def convert_price(price, currency, to_currency, jpy_rate=None):
+    """USD <-> JPY 換算 (JPY 取整數，與報告顯示一致)；幣別相同時原樣回傳。"""
+    factor = currency_factor(currency, to_currency, jpy_rate)
+    if factor == 1.0:
+        return price
+    if to_currency == "JPY":
+        return int(round(price * factor))
+    return price * factor
+
+
+def is_storable(record):
+    """會寫入 store 的紀錄：有絕對成交日期的成交 (摘要價與相對日期的紀錄只存在於本次抓取的結果)。"""
+    return not record.note and record.day is not None and not is_relative_date(record.date)
+
+
+def empty_aggregate():
+    return {"count": 0, "sum": 0.0, "min": None, "max": None,
+            "first_date": None, "last_traded_at": None, "last_price": None}
+
+
+def _fold_trade(agg, traded_at, traded_date, price):
+    agg["count"] += 1
+    agg["sum"] += price
+    agg["min"] = price if agg["min"] is None else min(agg["min"], price)
+    agg["max"] = price if agg["max"] is None else max(agg["max"], price)
+    if agg["first_date"] is None or traded_date < agg["first_date"]:
+        agg["first_date"] = traded_date
+    if agg["last_traded_at"] is None or traded_at >= agg["last_traded_at"]:
+        agg["last_traded_at"] = traded_at
+        agg["last_price"] = price
+
+
+def combine_aggregates(aggregates, grades=None, window=0, exclude=None, currency=None, jpy_rate=None):
+    """
+    把 PriceStore.aggregates() 中符合條件的 (等級, 幣別) 合併成一份統計 (O(等級數 × 幣別數))，
+    格式同 price_stats.empty_stats()；median 無法由彙總得到，為 None。
+    grades / exclude 為 canonical 等級的 iterable，currency 有值時換算成該幣別。
+    """
+    wanted = None if grades is None else frozenset(grades)
+    skipped = frozenset(exclude or ())
+    total = empty_aggregate()
+    for (grade, agg_currency, agg_window), agg in (aggregates or {}).items():
+        if agg_window != window or not agg["count"]:
+            continue
+        if (wanted is not None and grade not in wanted) or grade in skipped:
+            continue
+        factor = currency_factor(agg_currency, currency, jpy_rate)
+        total["count"] += agg["count"]
+        total["sum"] += agg["sum"] * factor
+        for key, pick in (("min", min), ("max", max)):
+            value = agg[key] * factor
+            total[key] = value if total[key] is None else pick(total[key], value)
+        if total["first_date"] is None or agg["first_date"] < total["first_date"]:
+            total["first_date"] = agg["first_date"]
+        if total["last_traded_at"] is None or agg["last_traded_at"] >= total["last_traded_at"]:
+            total["last_traded_at"] = agg["last_traded_at"]
+    count = total["count"]
+    return {
+        "count": count,
+        "sum": total["sum"],
+        "mean": total["sum"] / count if count else 0.0,
+        "median": None,
+        "min": total["min"],
+        "max": total["max"],
+        "first_day": parse_epoch_day(total["first_date"]) if count else None,
+        "last_day": parse_epoch_day(total["last_traded_at"]) if count else None,
+    }
+
+
+def product_key(url):
+    """商品 URL 去掉 query / 結尾斜線，作為 store 的 product key。"""
+    return str(url or '').split('?')[0].split('#')[0].rstrip('/')
+
+
+class PriceStore:
+    """
+    Append-only local time series of sold prices.
+
+    每筆成交以原始價格與幣別儲存 (SNKRDUNK 的美元成交不先換成日圓)，讀取時才依當下匯率換算，
+    所以匯率變動不會讓同一筆成交被當成新資料再寫入一次。
+    以 (source, product, traded_at, grade, price, currency, seq) 去重：traded_at 為絕對成交時間
+    (SNKRDUNK 的 tradedAt；只有日期的來源為 "YYYY-MM-DD")。同一時間同等級同價的多筆成交以 seq
+    (同一批資料中的第幾筆) 區分，重複抓取時同樣的 seq 會被忽略。
+    date_text 保留第一次看到的原始日期字串，讀出時維持報告原本的顯示格式。
+    不寫入：PriceCharting 的摘要價 (帶 note 的 "PC avg price" 等) 與相對日期 ("3日前") 的紀錄
+    (換算出的日期取決於抓取當天，無法跨日去重)。
+
+    trade_aggregates 為每個 (商品, canonical 等級, 原始幣別, 時間窗) 的 count / sum / min / max /
+    最早日期 / 最後一筆成交，ingest 時只把新成交加進去；as_of 之後跨日時窗內資料會滑出，
+    該商品第一次被讀取或寫入時從 trades 重算一次。報告的統計因此是一次彙總表查詢，不必掃描全部成交。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS trades ("
+                " source TEXT NOT NULL, product TEXT NOT NULL, traded_at TEXT NOT NULL, traded_date TEXT NOT NULL,"
+                " grade TEXT NOT NULL, price REAL NOT NULL, currency TEXT NOT NULL, seq INTEGER NOT NULL DEFAULT 0,"
+                " date_text TEXT NOT NULL, ingested_at REAL NOT NULL,"
+                " PRIMARY KEY (source, product, traded_at, grade, price, currency, seq))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_date ON trades (source, product, traded_date)")
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'price_records'").fetchone():
+                # 舊版資料表：SNKRDUNK 的價格是以當時匯率換算後的日圓、只有日期，無法與原始成交對應，
+                # 捨棄後由 snkr_history 的原始歷史重新寫入；其他來源直接搬移
+                conn.execute(
+                    "INSERT OR IGNORE INTO trades"
+                    " SELECT source, product, traded_date, traded_date, grade, price, currency, seq,"
+                    " date_text, ingested_at FROM price_records WHERE source != 'snkr'"
+                )
+                conn.execute("DROP TABLE price_records")
+            # 舊版的彙總表 (以原始等級標籤為 key、不分幣別)，由 trade_aggregates 取代
+            conn.execute("DROP TABLE IF EXISTS price_aggregates")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS trade_aggregates ("
+                " source TEXT NOT NULL, product TEXT NOT NULL, grade TEXT NOT NULL, currency TEXT NOT NULL,"
+                " window_days INTEGER NOT NULL, count INTEGER NOT NULL, sum REAL NOT NULL,"
+                " min REAL NOT NULL, max REAL NOT NULL, first_date TEXT NOT NULL,"
+                " last_traded_at TEXT NOT NULL, last_price REAL NOT NULL, as_of TEXT NOT NULL,"
+                " PRIMARY KEY (source, product, grade, currency, window_days))"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def ingest(self, source, product_url, records, currency="USD"):
+        """
+        Delta ingestion：只插入尚未存在的成交 (records 的價格皆為 currency)。
+        成交日期只有日期精度，traded_at 即為該日。Returns rows added.
+        """
+        trades = []
+        for r in to_records(records) or []:
+            if not is_storable(r):
+                continue
+            trades.append({"traded_at": day_to_iso(r.day), "grade": r.grade, "price": r.price,
+                           "currency": currency, "date": r.date})
+        return self.ingest_trades(source, product_url, trades)
+
+    def ingest_trades(self, source, product_url, trades):
+        """
+        寫入帶有絕對成交時間與原始幣別的成交：
+        trades 為 {"traded_at", "grade", "price", "currency", "date"} 的 iterable，
+        traded_at 為 ISO 日期或時間 ("2026-01-20T10:15:00Z")，date 為顯示用的日期字串。
+        Returns rows added.
+        """
+        product = product_key(product_url)
+        if not product:
+            return 0
+        now = time.time()
+        rows = []
+        occurrences = {}
+        for t in trades or []:
+            traded_at = str(t.get("traded_at") or "")
+            traded_date = day_to_iso(parse_epoch_day(traded_at))
+            try:
+                price = float(t.get("price"))
+            except (TypeError, ValueError):
+                continue
+            if not traded_date or price <= 0:
+                continue
+            grade, currency = str(t.get("grade") or ""), str(t.get("currency") or "USD")
+            key = (traded_at, grade, price, currency)
+            seq = occurrences.get(key, 0)
+            occurrences[key] = seq + 1
+            rows.append((source, product, traded_at, traded_date, grade, price, currency, seq,
+                         str(t.get("date") or traded_date), now))
+        if not rows:
+            return 0
+        with self._lock, self._connect() as conn:
+            added = [row for row in rows
+                     if conn.execute("INSERT OR IGNORE INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row).rowcount]
+            if added:
+                self._refresh_aggregates(conn, source, product,
+                                         [(r[2], r[3], r[4], r[5], r[6]) for r in added])
+            return len(added)
+
+    @staticmethod
+    def _load_aggregates(conn, source, product):
+        """Returns ({(grade, currency, window): aggregate}, 是否為今天的彙總)."""
+        rows = conn.execute(
+            "SELECT grade, currency, window_days, count, sum, min, max, first_date, last_traded_at, last_price, as_of"
+            " FROM trade_aggregates WHERE source = ? AND product = ?", (source, product)
+        ).fetchall()
+        aggregates = {(g, c, w): {"count": n, "sum": total, "min": lo, "max": hi, "first_date": first,
+                                  "last_traded_at": last_at, "last_price": last_price}
+                      for g, c, w, n, total, lo, hi, first, last_at, last_price, _ in rows}
+        today = date.today().isoformat()
+        return aggregates, bool(rows) and all(row[-1] == today for row in rows)
+
+    def _refresh_aggregates(self, conn, source, product, new_trades=()):
+        """
+        new_trades ((traded_at, traded_date, grade, price, currency)) 加進彙總；
+        彙總不存在或 as_of 不是今天時改為從 trades 重算整個商品。Returns {(grade, currency, window): aggregate}.
+        """
+        today = date.today().isoformat()
+        today_day = today_epoch_day()
+        aggregates, fresh = self._load_aggregates(conn, source, product)
+        if not fresh:
+            aggregates = {}
+            new_trades = conn.execute(
+                "SELECT traded_at, traded_date, grade, price, currency FROM trades WHERE source = ? AND product = ?",
+                (source, product),
+            ).fetchall()
+        elif not new_trades:
+            return aggregates
+        for traded_at, traded_date, grade, price, currency in new_trades:
+            day = epoch_day(date.fromisoformat(traded_date))
+            canon = canonical_grade(grade)
+            for window in AGGREGATE_WINDOWS:
+                if window and day <= today_day - window:
+                    continue
+                agg = aggregates.setdefault((canon, currency, window), empty_aggregate())
+                _fold_trade(agg, traded_at, traded_date, price)
+        conn.execute("DELETE FROM trade_aggregates WHERE source = ? AND product = ?", (source, product))
+        conn.executemany(
+            "INSERT INTO trade_aggregates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(source, product, g, c, w, a["count"], a["sum"], a["min"], a["max"], a["first_date"],
+              a["last_traded_at"], a["last_price"], today)
+             for (g, c, w), a in aggregates.items()],
+        )
+        return aggregates
+
+    def aggregates(self, source, product_url):
+        """
+        商品的彙總：{(canonical 等級, 原始幣別, window): aggregate}，window 為 AGGREGATE_WINDOWS 之一。
+        通常是一次主鍵查詢；跨日後第一次讀取時先重算該商品。商品不在 store 時回傳 {}。
+        配合 combine_aggregates() 取得指定等級 / 時間窗 / 幣別的統計。
+        """
+        product = product_key(product_url)
+        if not product:
+            return {}
+        with self._lock, self._connect() as conn:
+            aggregates, fresh = self._load_aggregates(conn, source, product)
+            if fresh:
+                return aggregates
+            if not conn.execute("SELECT 1 FROM trades WHERE source = ? AND product = ? LIMIT 1",
+                                (source, product)).fetchone():
+                return {}
+            # 重算是先讀後寫：先取得寫入鎖，避免與其他行程互相等待
+            conn.execute("BEGIN IMMEDIATE")
+            return self._refresh_aggregates(conn, source, product)
+
+    def has_product(self, source, product_url):
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT 1 FROM trades WHERE source = ? AND product = ? LIMIT 1",
+                                (source, product_key(product_url))).fetchone() is not None
+
+    def records(self, source, product_url, grade=None, since=None, currency=None, jpy_rate=None):
+        """
+        儲存的成交 (PriceRecord)，由新到舊，date 保留原始日期字串。
+        since 為 "YYYY-MM-DD" 時只回傳該日 (含) 之後的紀錄。
+        currency 有值時把價格換算成該幣別 (USD <-> JPY 需要 jpy_rate)，否則為原始價格。
+        """
+        sql = ("SELECT date_text, traded_date, price, currency, grade FROM trades"
+               " WHERE source = ? AND product = ?")
+        params = [source, product_key(product_url)]
+        if grade is not None:
+            sql += " AND grade = ?"
+            params.append(grade)
+        if since:
+            sql += " AND traded_date >= ?"
+            params.append(since)
+        sql += " ORDER BY traded_at DESC, rowid DESC"
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            PriceRecord(d, convert_price(p, c, currency, jpy_rate), g, day=epoch_day(date.fromisoformat(t)))
+            for d, t, p, c, g in rows
+        ]
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT source, COUNT(DISTINCT product), COUNT(*), MIN(traded_date), MAX(traded_date)"
+                " FROM trades GROUP BY source"
+            ).fetchall()
+        return {
+            source: {"products": products, "records": count, "first": first, "last": last}
+            for source, products, count, first, last in rows
+        }
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def _default_cache_dir():
+    return os.getenv("OPENCLAW_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "openclaw")
+
+
+def default_store():
+    """快取目錄下的共用 PriceStore (price_store.sqlite3)；無法開啟時回傳 None。"""
+    global _default_store
+    if os.getenv("OPENCLAW_PRICE_STORE", "1").strip().lower() in ("0", "false", "off"):
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            try:
+                _default_store = PriceStore(os.path.join(_default_cache_dir(), "price_store.sqlite3"))
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️ 價格資料庫初始化失敗: {e}")
+                return None
+        return _default_store
+
+
+# ── 匯入既有的 debug_run / report_data.json ─────────────────────────────────
+
+def _load_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def import_artifact_dir(store, directory):
+    """
+    匯入單一目錄的 PriceCharting 成交：report_data.json (含 pc_url 時) 與
+    step2_pc.json (商品 URL 取自 step2_meta.json)。Returns rows added.
+
+    SNKRDUNK 的產物只有換算後的日圓價與日期，無法與原始成交 (tradedAt + 原幣別) 對應，
+    不匯入；SNKRDUNK 成交由 snkr_history 同步時寫入。
+    """
+    meta = _load_json(os.path.join(directory, "step2_meta.json")) or {}
+    added = 0
+
+    report = _load_json(os.path.join(directory, "report_data.json"))
+    if isinstance(report, dict):
+        pc_url = report.get("pc_url") or meta.get("pc_url")
+        if pc_url:
+            added += store.ingest("pc", pc_url, report.get("pc_records"))
+
+    records = _load_json(os.path.join(directory, "step2_pc.json"))
+    if isinstance(records, list) and meta.get("pc_url"):
+        added += store.ingest("pc", meta["pc_url"], records)
+    return added
+
+
+def import_artifacts(store, roots):
+    """遞迴匯入多個根目錄。Returns rows added."""
+    added = 0
+    for root in roots:
+        for dirpath, _, files in os.walk(root):
+            if {"report_data.json", "step2_pc.json"} & set(files):
+                added += import_artifact_dir(store, dirpath)
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenClaw 本機價格資料庫 (import / stats)")
+    parser.add_argument("--db", default=os.path.join(_default_cache_dir(), "price_store.sqlite3"),
+                        help="SQLite 路徑 (預設為快取目錄下的 price_store.sqlite3)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="匯入 debug_run / report_data.json 產物")
+    imp.add_argument("paths", nargs="+", help="要遞迴搜尋的目錄")
+    sub.add_parser("stats", help="顯示資料庫統計")
+    args = parser.parse_args()
+
+    store = PriceStore(args.db)
+    if args.command == "import":
+        added = import_artifacts(store, args.paths)
+        print(f"✅ 新增 {added} 筆成交紀錄")
+    print(json.dumps(store.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+def card_identity(name, number, set_code, is_alt_art=False, is_flagship=False, card_language="", *extra):
+    """
+    正規化的卡片識別 key (JSON 字串)。grade 不在 key 內：同一個商品頁包含所有等級的價格。
+    extra 用於來源特有、會影響選品的條件 (例如 SNKRDUNK 的 variant 關鍵字)。
+    """
+    def _norm(value):
+        return re.sub(r'\s+', ' ', str(value or '')).strip().lower()
+
+    parts = [_norm(name), _norm(number), _norm(set_code), bool(is_alt_art), bool(is_flagship), _norm(card_language)]
+    parts.extend(extra)
+    return json.dumps(parts, ensure_ascii=False)
+
+
+class ResolvedProductIndex:
+    """
+    Persistent card identity → product mapping (PriceCharting product URL /
+    SNKRDUNK product id)，讓之後的查詢跳過搜尋頁與候選評分，直接抓價格。
+
+    每筆記錄保存選品理由 (reason) 與分數 (score) 以便稽核；hits / last_hit_at
+    記錄被重用的次數。max_age 秒後的記錄視為過期，重新搜尋。
+    """
+
+    def __init__(self, path, max_age=30 * 86400):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resolved_products ("
+                " source TEXT NOT NULL, card_key TEXT NOT NULL,"
+                " product_url TEXT NOT NULL, product_id TEXT, img_url TEXT,"
+                " reason TEXT, score REAL, resolved_at REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0, last_hit_at REAL,"
+                " PRIMARY KEY (source, card_key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_resolved_products_url ON resolved_products (product_url)"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, source, card_key):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM resolved_products WHERE source = ? AND card_key = ?", (source, card_key)
+            ).fetchone()
+            if not row:
+                return None
+            if self.max_age and now - row["resolved_at"] > self.max_age:
+                conn.execute(
+                    "DELETE FROM resolved_products WHERE source = ? AND card_key = ?", (source, card_key)
+                )
+                return None
+            conn.execute(
+                "UPDATE resolved_products SET hits = hits + 1, last_hit_at = ?"
+                " WHERE source = ? AND card_key = ?", (now, source, card_key)
+            )
+        return dict(row)
+
+    def put(self, source, card_key, product_url, product_id=None, img_url=None, reason="", score=None):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO resolved_products"
+                " (source, card_key, product_url, product_id, img_url, reason, score, resolved_at, hits, last_hit_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, NULL)",
+                (source, card_key, product_url, None if product_id is None else str(product_id),
+                 img_url or "", reason or "", score, time.time()),
+            )
+
+    def invalidate(self, source=None, card_key=None, product_url=None):
+        """
+        刪除符合條件的記錄 (條件皆為 None 時清空)。Returns rows removed.
+        例: invalidate(product_url=...) 移除所有指向某個已下架 / 選錯商品的對應。
+        """
+        clauses, params = [], []
+        for column, value in (("source", source), ("card_key", card_key), ("product_url", product_url)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "DELETE FROM resolved_products"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock, self._connect() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def entries(self, source=None, limit=100):
+        """最近解析的記錄 (稽核用)。"""
+        sql = "SELECT * FROM resolved_products"
+        params = []
+        if source:
+            sql += " WHERE source = ?"
+            params.append(source)
+        sql += " ORDER BY resolved_at DESC LIMIT ?"
+        params.append(int(limit))
+        with self._lock, self._connect() as conn:
+            return [dict(r) for r in conn.execute(sql, params).fetchall()]
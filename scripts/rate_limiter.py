@@ -0,0 +1,331 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+
+class SharedTokenBucket:
+    """
+    Token bucket whose state lives in a SQLite file, so every OpenClaw process
+    on the host (bot workers, CLI runs) draws from the same budget.
+
+    capacity 個 token，每 period 秒補滿一次 (連續補充)。path=None 時退化為
+    單一行程內的記憶體 bucket。
+
+    bucket_waiters 記錄各行程 (PriorityDispatcher) 目前最優先的等待者，見 try_acquire_ranked()。
+    超過 waiter_ttl 秒沒有更新的紀錄 (例如行程已結束) 視為不存在。
+    """
+
+    waiter_ttl = 5.0
+
+    def __init__(self, path, name, capacity, period):
+        self.path = path
+        self.name = name
+        self.capacity = float(capacity)
+        self.period = float(period)
+        self.rate = self.capacity / self.period
+        self._lock = threading.Lock()
+        self._mem_state = (self.capacity, time.time())
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS token_buckets ("
+                    " name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    (self.name, self.capacity, time.time()),
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS bucket_waiters ("
+                    " name TEXT NOT NULL, owner TEXT NOT NULL, priority INTEGER NOT NULL, updated REAL NOT NULL,"
+                    " PRIMARY KEY (name, owner))"
+                )
+            finally:
+                conn.close()
+
+    def _connect(self):
+        # isolation_level=None: we issue BEGIN IMMEDIATE ourselves to hold the
+        # write lock across read-modify-write.
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _refilled(self, tokens, updated, now):
+        return min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+    def _transact(self, fn):
+        """
+        Runs fn(tokens_now, now, conn) -> (new_tokens, result) atomically.
+        conn is the open SQLite connection (None for the in-memory bucket).
+        """
+        with self._lock:
+            now = time.time()
+            if not self.path:
+                tokens, updated = self._mem_state
+                new_tokens, result = fn(self._refilled(tokens, updated, now), now, None)
+                self._mem_state = (new_tokens, now)
+                return result
+
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT tokens, updated FROM token_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                tokens, updated = row if row else (self.capacity, now)
+                new_tokens, result = fn(self._refilled(tokens, updated, now), now, conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    (self.name, new_tokens, now),
+                )
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def try_acquire(self, tokens=1):
+        """Takes tokens if available. Returns 0.0 on success, else seconds to wait."""
+        def _take(available, now, conn):
+            if available >= tokens:
+                return available - tokens, 0.0
+            return available, (tokens - available) / self.rate
+        return self._transact(_take)
+
+    def try_acquire_ranked(self, owner, priority, retry_after, tokens=1):
+        """
+        try_acquire() on behalf of a process-local priority queue whose head
+        waiter has the given priority (smaller = more urgent).
+
+        同一個 transaction 內先登記 owner 的等待者，若有其他行程登記了更優先
+        (priority 較小) 且仍在更新的等待者，本次讓出 (不取 token，回傳 retry_after)，
+        讓 CLI 批次等低優先的行程不會搶在 Discord 即時查詢之前。取得 token 後移除 owner 的紀錄。
+        """
+        def _take(available, now, conn):
+            if conn is not None:
+                conn.execute("DELETE FROM bucket_waiters WHERE updated < ?", (now - self.waiter_ttl,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO bucket_waiters (name, owner, priority, updated) VALUES (?, ?, ?, ?)",
+                    (self.name, owner, int(priority), now),
+                )
+                ahead = conn.execute(
+                    "SELECT 1 FROM bucket_waiters WHERE name = ? AND owner != ? AND priority < ? AND updated >= ?"
+                    " LIMIT 1", (self.name, owner, int(priority), now - self.waiter_ttl),
+                ).fetchone()
+                if ahead:
+                    return available, max(retry_after, 1e-3)
+            if available >= tokens:
+                if conn is not None:
+                    conn.execute("DELETE FROM bucket_waiters WHERE name = ? AND owner = ?", (self.name, owner))
+                return available - tokens, 0.0
+            return available, (tokens - available) / self.rate
+        return self._transact(_take)
+
+    async def try_acquire_ranked_async(self, owner, priority, retry_after, tokens=1):
+        """try_acquire_ranked() for coroutines (the SQLite transaction runs in a worker thread)."""
+        if not self.path:
+            return self.try_acquire_ranked(owner, priority, retry_after, tokens)
+        return await asyncio.to_thread(self.try_acquire_ranked, owner, priority, retry_after, tokens)
+
+    def withdraw(self, owner):
+        """移除 owner 的等待者紀錄 (該行程已沒有人在等)。"""
+        def _remove(available, now, conn):
+            if conn is not None:
+                conn.execute("DELETE FROM bucket_waiters WHERE name = ? AND owner = ?", (self.name, owner))
+            return available, None
+        self._transact(_remove)
+
+    async def try_acquire_async(self, tokens=1):
+        """
+        try_acquire() for coroutines. The SQLite transaction can wait up to the
+        30s busy timeout on another process's write lock, so it runs in a worker
+        thread instead of on the event loop.
+        """
+        if not self.path:
+            return self.try_acquire(tokens)
+        return await asyncio.to_thread(self.try_acquire, tokens)
+
+    def acquire(self, tokens=1, on_wait=None):
+        """Blocks the calling thread until tokens are taken. Returns total seconds waited."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            if on_wait:
+                on_wait(wait)
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens=1, on_wait=None):
+        """
+        Awaitable version of acquire(): waiting is an asyncio.sleep, so it holds
+        no executor thread and can be cancelled by the caller.
+        """
+        waited = 0.0
+        while True:
+            wait = await self.try_acquire_async(tokens)
+            if wait <= 0:
+                return waited
+            if on_wait:
+                on_wait(wait)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def drain(self):
+        """Empties the bucket, e.g. after the upstream answered 429."""
+        self._transact(lambda available, now, conn: (0.0, None))
+
+    def available(self):
+        """Current token count (without consuming)."""
+        return self._transact(lambda available, now, conn: (available, available))
+
+    def budget(self):
+        available = self.available()
+        return {
+            "available": int(available),
+            "capacity": int(self.capacity),
+            "period": self.period,
+            "next_token_in": 0.0 if available >= 1 else (1 - available) / self.rate,
+        }
+
+
+# Jina 請求的優先等級 (數字越小越優先)
+PRIORITY_INTERACTIVE = 0   # Discord 使用者即時查詢
+PRIORITY_BATCH = 1         # CLI 多張圖片批次處理
+PRIORITY_PREFETCH = 2      # 背景更新 / 預取
+
+
+class _Ticket:
+    __slots__ = ("priority", "enqueued_at", "seq")
+
+    def __init__(self, priority, enqueued_at, seq):
+        self.priority = priority
+        self.enqueued_at = enqueued_at
+        self.seq = seq
+
+
+class PriorityDispatcher:
+    """
+    Priority-aware front door for a SharedTokenBucket.
+
+    只有排在最前面的等待者可以向 bucket 取 token，因此高優先請求會插隊到
+    低優先請求之前。每等待 starvation_bound 秒，等待者的優先等級提升一級，
+    避免低優先請求永遠等不到 (PREFETCH 最多等 2 個 bound 就會與 INTERACTIVE 同級，
+    同級時依排隊先後)。
+
+    跨行程：各行程的隊首等待者把自己的 (提升後) 優先等級登記在 bucket 的共用檔案中，
+    其他行程有更優先的等待者時先讓出 (見 SharedTokenBucket.try_acquire_ranked)，所以
+    CLI 批次 (BATCH) 或背景更新 (PREFETCH) 的行程不會讓 Discord bot 的即時查詢排在後面。
+    同等級的行程之間不保證順序。
+    """
+
+    def __init__(self, bucket, starvation_bound=90.0, poll_interval=0.5):
+        self.bucket = bucket
+        self.starvation_bound = float(starvation_bound)
+        self.poll_interval = float(poll_interval)
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = 0
+
+    def _effective_key(self, ticket, now):
+        promoted = int((now - ticket.enqueued_at) // self.starvation_bound) if self.starvation_bound > 0 else 0
+        return (max(PRIORITY_INTERACTIVE, ticket.priority - promoted), ticket.enqueued_at, ticket.seq)
+
+    def _enqueue(self, priority):
+        with self._cond:
+            self._seq += 1
+            ticket = _Ticket(priority, time.monotonic(), self._seq)
+            self._waiters.append(ticket)
+            return ticket
+
+    def _dequeue(self, ticket):
+        """Returns True when no one in this process is waiting any more."""
+        with self._cond:
+            self._waiters.remove(ticket)
+            self._cond.notify_all()
+            return not self._waiters
+
+    @property
+    def _owner(self):
+        # bucket_waiters 中代表本行程這個 dispatcher 的 key (fork 後 pid 不同)
+        return f"{os.getpid()}:{id(self)}"
+
+    def _head_priority(self, ticket):
+        """ticket 是本行程的隊首時回傳它提升後的優先等級，否則 None。"""
+        with self._cond:
+            now = time.monotonic()
+            head = min(self._waiters, key=lambda t: self._effective_key(t, now))
+            return self._effective_key(head, now)[0] if head is ticket else None
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._waiters)
+
+    def _poll(self, ticket, state, on_wait):
+        """Returns 0.0 once a token is taken, else the seconds to wait before polling again."""
+        priority = self._head_priority(ticket)
+        if priority is None:
+            wait = self.poll_interval
+        else:
+            wait = self.bucket.try_acquire_ranked(self._owner, priority, self.poll_interval)
+        return self._next_wait(wait, state, on_wait)
+
+    async def _poll_async(self, ticket, state, on_wait):
+        priority = self._head_priority(ticket)
+        if priority is None:
+            wait = self.poll_interval
+        else:
+            wait = await self.bucket.try_acquire_ranked_async(self._owner, priority, self.poll_interval)
+        return self._next_wait(wait, state, on_wait)
+
+    def _next_wait(self, wait, state, on_wait):
+        if wait <= 0:
+            return 0.0
+        if on_wait and not state["notified"]:
+            state["notified"] = True
+            on_wait(wait)
+        return min(wait, self.poll_interval)
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, on_wait=None, cancel=None):
+        """
+        Blocks until a token is taken and returns True. cancel (threading.Event)
+        可選：等待中被設定時放棄排隊並回傳 False (不消耗 token)。
+        """
+        ticket = self._enqueue(priority)
+        state = {"notified": False}
+        try:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    return False
+                wait = self._poll(ticket, state, on_wait)
+                if wait <= 0:
+                    state["acquired"] = True
+                    return True
+                with self._cond:
+                    self._cond.wait(timeout=wait)
+        finally:
+            # 取得 token 時 try_acquire_ranked 已移除紀錄；放棄等待時由最後一位離開的人移除
+            if self._dequeue(ticket) and not state.get("acquired"):
+                self.bucket.withdraw(self._owner)
+
+    async def acquire_async(self, priority=PRIORITY_INTERACTIVE, on_wait=None):
+        ticket = self._enqueue(priority)
+        state = {"notified": False}
+        try:
+            while True:
+                wait = await self._poll_async(ticket, state, on_wait)
+                if wait <= 0:
+                    state["acquired"] = True
+                    return
+                await asyncio.sleep(wait)
+        finally:
+            if self._dequeue(ticket) and not state.get("acquired"):
+                # 不在 event loop 上寫 SQLite (也不 await，取消時同樣能執行)
+                asyncio.get_running_loop().run_in_executor(None, self.bucket.withdraw, self._owner)
@@ -0,0 +1,130 @@
+import asyncio
+import copy
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Request coalescing: 同一個 key 同時只會有一次實際執行，其他並行呼叫端等待
+    並共用其結果 (或例外)。只合併「進行中」的呼叫，不做結果快取。
+
+    跟隨者拿到的是結果的 deepcopy，避免多個呼叫端修改同一份 records。
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        else:
+            # 先在領頭者回傳前複製一份給跟隨者，之後領頭者怎麼改 result 都不影響它們
+            with self._lock:
+                self._calls.pop(key, None)
+                has_waiters = call.waiters > 0
+            if has_waiters:
+                call.result = copy.deepcopy(result)
+            return result
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight 的 asyncio 版：同一個 event loop 內，同一個 key 的並行 coroutine
+    只執行一次 fn，其他呼叫端 await 同一個結果 (deepcopy)。不佔用執行緒。
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        future = self._calls.get(call_key)
+        if future is not None:
+            self.coalesced += 1
+            return copy.deepcopy(await asyncio.shield(future))
+
+        self.executed += 1
+        future = loop.create_future()
+        self._calls[call_key] = future
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # 沒有跟隨者時避免 "exception was never retrieved"
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._calls.pop(call_key, None)
+
+    def in_flight(self):
+        return len(self._calls)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
@@ -0,0 +1,226 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+
+SNKR_HISTORY_URL = "https://snkrdunk.com/en/v1/streetwears/{product_id}/trading-histories?perPage={per_page}&page={page}"
+
+
+class SnkrHistoryStore:
+    """
+    SQLite store of raw SNKRDUNK trading histories plus per-product sync state.
+
+    snkr_histories 以 (product_id, tradedAt, condition, price, priceFormat) 去重，exported 標記
+    已交給價格資料庫的成交 (見 export_new)；
+    snkr_sync_state 記錄已儲存的最新 tradedAt (newest_traded_at：這之前的成交都已取得)、
+    尚未補齊的增量同步進度 (gap_page / pending_traded_at，見 sync_trading_histories) 與背景回補進度。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snkr_histories ("
+                " product_id TEXT NOT NULL, traded_at TEXT NOT NULL, condition TEXT NOT NULL,"
+                " price REAL NOT NULL, price_format TEXT NOT NULL, exported INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (product_id, traded_at, condition, price, price_format))"
+            )
+            if "exported" not in {row[1] for row in conn.execute("PRAGMA table_info(snkr_histories)")}:
+                conn.execute("ALTER TABLE snkr_histories ADD COLUMN exported INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS snkr_histories_unexported ON snkr_histories (product_id)"
+                " WHERE exported = 0"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snkr_sync_state ("
+                " product_id TEXT PRIMARY KEY, newest_traded_at TEXT, synced_at REAL,"
+                " backfill_page INTEGER NOT NULL DEFAULT 2, backfill_done INTEGER NOT NULL DEFAULT 0,"
+                " gap_page INTEGER, pending_traded_at TEXT)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(snkr_sync_state)")}
+            if "gap_page" not in columns:
+                conn.execute("ALTER TABLE snkr_sync_state ADD COLUMN gap_page INTEGER")
+                conn.execute("ALTER TABLE snkr_sync_state ADD COLUMN pending_traded_at TEXT")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def state(self, product_id):
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT newest_traded_at, synced_at, backfill_page, backfill_done, gap_page, pending_traded_at"
+                " FROM snkr_sync_state WHERE product_id = ?", (str(product_id),)
+            ).fetchone()
+        if not row:
+            return {"newest_traded_at": None, "synced_at": None, "backfill_page": 2, "backfill_done": False,
+                    "gap_page": None, "pending_traded_at": None}
+        return {
+            "newest_traded_at": row[0],
+            "synced_at": row[1],
+            "backfill_page": row[2],
+            "backfill_done": bool(row[3]),
+            "gap_page": row[4],
+            "pending_traded_at": row[5],
+        }
+
+    def update_state(self, product_id, **fields):
+        current = self.state(product_id)
+        current.update(fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snkr_sync_state"
+                " (product_id, newest_traded_at, synced_at, backfill_page, backfill_done, gap_page, pending_traded_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(product_id), current["newest_traded_at"], current["synced_at"],
+                 int(current["backfill_page"]), int(bool(current["backfill_done"])),
+                 current["gap_page"], current["pending_traded_at"]),
+            )
+
+    def add(self, product_id, histories):
+        """Inserts raw API history rows. Returns the number of rows not seen before."""
+        rows = []
+        for h in histories or []:
+            traded_at = str(h.get("tradedAt", "") or "")
+            if not traded_at:
+                continue
+            try:
+                price = float(h.get("price", 0))
+            except (TypeError, ValueError):
+                continue
+            rows.append((str(product_id), traded_at, str(h.get("condition", "") or ""),
+                         price, str(h.get("priceFormat", "") or "")))
+        if not rows:
+            return 0
+        with self._lock, self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO snkr_histories (product_id, traded_at, condition, price, price_format)"
+                " VALUES (?, ?, ?, ?, ?)", rows
+            )
+            return conn.total_changes - before
+
+    def histories(self, product_id):
+        """All stored rows for a product, newest first, in the API's field names."""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT traded_at, condition, price, price_format FROM snkr_histories"
+                " WHERE product_id = ? ORDER BY traded_at DESC", (str(product_id),)
+            ).fetchall()
+        return [{"tradedAt": t, "condition": c, "price": p, "priceFormat": f} for t, c, p, f in rows]
+
+    def export_new(self, product_id, consume, everything=False):
+        """
+        把尚未匯出的成交 (同步與背景回補寫入的新成交) 交給 consume(histories)，成功後標記為已匯出；
+        consume raise 時不標記，下次再交出。everything=True 時交出全部成交 (例如對方還沒有這個商品)。
+        Returns the number of rows handed over.
+        """
+        sql = "SELECT rowid, traded_at, condition, price, price_format FROM snkr_histories WHERE product_id = ?"
+        if not everything:
+            sql += " AND exported = 0"
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(sql, (str(product_id),)).fetchall()
+            if not rows:
+                return 0
+            consume([{"tradedAt": t, "condition": c, "price": p, "priceFormat": f} for _, t, c, p, f in rows])
+            conn.executemany("UPDATE snkr_histories SET exported = 1 WHERE rowid = ?", [(r[0],) for r in rows])
+            return len(rows)
+
+
+def _page(get_json, product_id, per_page, page):
+    """
+    一頁成交歷史。請求失敗 (get_json 重試後回傳 {} 等沒有 histories 的回應) 時回傳 None，
+    與真正的空頁 ([]) 區分：失敗不能當成「已經沒有更多頁」。
+    """
+    data = get_json(SNKR_HISTORY_URL.format(product_id=product_id, per_page=per_page, page=page))
+    histories = data.get("histories") if isinstance(data, dict) else None
+    return histories if isinstance(histories, list) else None
+
+
+def _newest_traded_at(histories, current=None):
+    newest = max((str(h.get("tradedAt", "") or "") for h in histories), default="")
+    return newest if not current or newest > current else current
+
+
+def sync_trading_histories(store, product_id, get_json, first_per_page=100, incremental_per_page=20, max_pages=10):
+    """
+    Incremental sync: 首次同步抓一頁 first_per_page 筆；之後每次只用小頁
+    (incremental_per_page) 從第 1 頁往後翻，直到遇到已儲存的 tradedAt 或最後一頁 (短頁) 為止。
+
+    newest_traded_at 只在確實接上已儲存的成交後才往前移。請求失敗或達到 max_pages 時，
+    記下接續的頁碼 (gap_page) 與這一輪看到的最新 tradedAt (pending_traded_at)，下次從該頁繼續往後翻
+    (新成交只會讓舊成交往後面的頁移動，從同一頁碼接續只會重讀、不會漏掉)；接上之後
+    newest_traded_at 才更新為 pending_traded_at，之後比它更新的成交由下一輪從第 1 頁取得。
+    Returns all stored histories for the product (newest first).
+    """
+    state = store.state(product_id)
+    newest = state["newest_traded_at"]
+
+    if not newest:
+        # 首次同步只抓第一頁，更深的頁面交給 backfill。
+        histories = _page(get_json, product_id, first_per_page, 1)
+        if histories:
+            store.add(product_id, histories)
+            store.update_state(product_id, newest_traded_at=_newest_traded_at(histories), synced_at=time.time())
+        return store.histories(product_id)
+
+    per_page = incremental_per_page
+    start = state["gap_page"] or 1
+    pending = state["pending_traded_at"] if state["gap_page"] else None
+    reached = False
+    page = start
+    while page < start + max_pages:
+        histories = _page(get_json, product_id, per_page, page)
+        if histories is None:
+            break
+        store.add(product_id, histories)
+        pending = _newest_traded_at(histories, pending)
+        if len(histories) < per_page or any(str(h.get("tradedAt", "") or "") <= newest for h in histories):
+            reached = True
+            break
+        page += 1
+
+    if reached:
+        store.update_state(product_id, newest_traded_at=max(newest, pending or newest), synced_at=time.time(),
+                           gap_page=None, pending_traded_at=None)
+    else:
+        # 失敗的頁 (或超過上限後的下一頁) 下次接續
+        store.update_state(product_id, synced_at=time.time(), gap_page=page, pending_traded_at=pending)
+    return store.histories(product_id)
+
+
+def backfill_trading_histories(store, product_id, get_json, per_page=100, max_pages=2):
+    """
+    往更舊的頁面回補 (每頁 per_page 筆，從 state.backfill_page 接續)。
+    新成交會讓頁面位移，重疊的資料由去重處理。Returns rows added.
+    """
+    state = store.state(product_id)
+    if state["backfill_done"]:
+        return 0
+    page = state["backfill_page"]
+    added = 0
+    done = False
+    for _ in range(max_pages):
+        histories = _page(get_json, product_id, per_page, page)
+        if histories is None:
+            # 請求失敗：保留目前頁碼，下次再試
+            break
+        if not histories:
+            done = True
+            break
+        added += store.add(product_id, histories)
+        page += 1
+        if len(histories) < per_page:
+            done = True
+            break
+    store.update_state(product_id, backfill_page=page, backfill_done=done)
+    return added
@@ -0,0 +1,188 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from price_records import canonical_grade
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # 沒有 Pillow 時只做完全相同內容 (SHA-256) 的比對
+    Image = None
+
+
+def _to_signed64(value):
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned64(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def dhash(image, size=8):
+    """64-bit difference hash：灰階縮成 (size+1) x size，比較每列相鄰像素的亮度。"""
+    gray = ImageOps.exif_transpose(image).convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def image_fingerprint(image_path):
+    """
+    Returns (sha256 hex, dhash, aspect)；aspect 為轉正後的寬 / 高。
+    無法解碼圖片或沒有 Pillow 時 dhash 與 aspect 為 None。
+    """
+    with open(image_path, "rb") as f:
+        data = f.read()
+    sha = hashlib.sha256(data).hexdigest()
+    if Image is None:
+        return sha, None, None
+    try:
+        with Image.open(image_path) as image:
+            oriented = ImageOps.exif_transpose(image)
+            return sha, dhash(oriented), oriented.width / oriented.height
+    except Exception:
+        return sha, None, None
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _is_graded(card_info):
+    return canonical_grade(card_info.get("grade")) not in ("Ungraded", "Unknown", "")
+
+
+class VisionResultCache:
+    """
+    卡片影像辨識結果 (card_info) 的磁碟快取 (SQLite)。
+
+    - 先以內容 SHA-256 比對完全相同的圖片，再以 dHash 的 Hamming 距離
+      (<= max_distance) 且長寬比相同 (差距 <= aspect_tolerance) 找近似圖片
+      (重新壓縮、縮放的同一張照片)。
+    - 鑑定卡的等級標籤在 dHash 中幾乎看不出差異 (同一張卡的 PSA 10 與 PSA 8 距離為 0)，
+      因此結果為鑑定卡 (grade 不是 Ungraded) 的項目只接受完全相同的圖片。
+    - 超過 max_entries 筆時依 last_access 做 LRU 淘汰；超過 max_age 秒的結果視為過期。
+    - hits / near_hits / misses / evictions 計數僅統計本行程。
+    """
+
+    def __init__(self, path, max_entries=5000, max_distance=2, max_age=30 * 86400, aspect_tolerance=0.01):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.aspect_tolerance = aspect_tolerance
+        self.max_age = max_age
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS vision_cache ("
+                " sha TEXT NOT NULL, lang TEXT NOT NULL, dhash INTEGER,"
+                " card_info TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0, aspect REAL,"
+                " PRIMARY KEY (sha, lang))"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(vision_cache)")}
+            if "aspect" not in columns:
+                # 舊版快取沒有長寬比：既有項目只做完全相同圖片的比對
+                conn.execute("ALTER TABLE vision_cache ADD COLUMN aspect REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_vision_cache_access ON vision_cache(last_access)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, sha, image_dhash, lang="zh", aspect=None):
+        """Returns (card_info, match) where match is "exact", "near" or None (miss)."""
+        now = time.time()
+        min_created = now - self.max_age if self.max_age else 0
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT sha, card_info FROM vision_cache WHERE sha = ? AND lang = ? AND created_at >= ?",
+                (sha, lang, min_created),
+            ).fetchone()
+            match = "exact"
+            if row is None and image_dhash is not None and aspect is not None:
+                near = []
+                for cand_sha, cand_hash, cand_info in conn.execute(
+                    "SELECT sha, dhash, card_info FROM vision_cache"
+                    " WHERE lang = ? AND dhash IS NOT NULL AND aspect BETWEEN ? AND ? AND created_at >= ?",
+                    (lang, aspect - self.aspect_tolerance, aspect + self.aspect_tolerance, min_created),
+                ):
+                    distance = hamming(image_dhash, _to_unsigned64(cand_hash))
+                    if distance <= self.max_distance:
+                        near.append((distance, cand_sha, cand_info))
+                for _, cand_sha, cand_info in sorted(near):
+                    if not _is_graded(json.loads(cand_info)):
+                        row, match = (cand_sha, cand_info), "near"
+                        break
+            if row is None:
+                self.misses += 1
+                return None, None
+            conn.execute(
+                "UPDATE vision_cache SET hits = hits + 1, last_access = ? WHERE sha = ? AND lang = ?",
+                (now, row[0], lang),
+            )
+        if match == "exact":
+            self.hits += 1
+        else:
+            self.near_hits += 1
+        return json.loads(row[1]), match
+
+    def put(self, sha, image_dhash, card_info, lang="zh", aspect=None):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO vision_cache"
+                " (sha, lang, dhash, card_info, created_at, last_access, hits, aspect)"
+                " VALUES (?, ?, ?, ?, ?, ?, 0, ?)",
+                (sha, lang, None if image_dhash is None else _to_signed64(image_dhash),
+                 json.dumps(card_info, ensure_ascii=False), now, now, aspect),
+            )
+            self._evict(conn)
+
+    def invalidate(self, sha):
+        """移除某張圖片的結果 (例如使用者回報辨識錯誤)。Returns rows removed."""
+        with self._lock, self._connect() as conn:
+            return conn.execute("DELETE FROM vision_cache WHERE sha = ?", (sha,)).rowcount
+
+    def _evict(self, conn):
+        count = conn.execute("SELECT COUNT(*) FROM vision_cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        conn.execute(
+            "DELETE FROM vision_cache WHERE rowid IN"
+            " (SELECT rowid FROM vision_cache ORDER BY last_access ASC LIMIT ?)", (excess,)
+        )
+        self.evictions += excess
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM vision_cache").fetchone()[0]
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            "entries": entries,
+        }